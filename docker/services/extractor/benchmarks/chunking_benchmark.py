@@ -0,0 +1,119 @@
+"""Chunk count and embedder truncation rate: character vs token mode.
+
+Generates mixed Japanese/English markdown documents (deterministic, no
+fixtures on disk), chunks each one in both modes and measures every
+chunk with the embedding model's tokenizer exactly as embeddings_service
+sees it ("passage: " prefix, specials included). A chunk is "truncated"
+when that count exceeds EMBEDDING_MAX_TOKENS — the embedder silently
+drops its tail.
+
+Run inside the extractor container (the e5 tokenizer is baked in):
+  docker cp docker/services/extractor/benchmarks monadic-chat-extractor-container:/app/
+  docker exec -it monadic-chat-extractor-container python /app/benchmarks/chunking_benchmark.py
+
+Pass --tokenizer /path/to/tokenizer.json to measure with another file.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import chunking  # noqa: E402
+
+EN_SENTENCES = [
+    "The extractor converts each PDF into layout-aware markdown before chunking.",
+    "Retrieval quality depends on chunks that fit the embedding window.",
+    "Tables and figure captions are preserved as structured markdown.",
+    "Sparse English prose packs far fewer tokens per character than CJK text.",
+    "Each chunk is embedded with a passage prefix and stored in Qdrant.",
+]
+JA_SENTENCES = [
+    "抽出サービスは各PDFをレイアウトを考慮したマークダウンに変換します。",
+    "検索品質は埋め込みモデルの入力長に収まるチャンクに依存します。",
+    "表や図のキャプションは構造化されたマークダウンとして保持されます。",
+    "日本語の文章は英語に比べて一文字あたりのトークン数が多くなります。",
+    "各チャンクはパッセージ接頭辞を付けて埋め込まれ、Qdrantに保存されます。",
+]
+
+# (label, share of Japanese paragraphs)
+DOCUMENT_MIXES = [
+    ("english", 0.0),
+    ("mostly-english", 0.25),
+    ("mixed", 0.5),
+    ("mostly-japanese", 0.75),
+    ("japanese", 1.0),
+]
+
+
+def make_document(ja_share: float, paragraphs: int, seed: int) -> str:
+    rng = random.Random(seed)
+    parts = []
+    for i in range(paragraphs):
+        if i % 8 == 0:
+            parts.append(f"## Section {i // 8 + 1}")
+        pool = JA_SENTENCES if rng.random() < ja_share else EN_SENTENCES
+        sep = "" if pool is JA_SENTENCES else " "
+        parts.append(sep.join(rng.choice(pool) for _ in range(rng.randint(3, 9))))
+    return "\n\n".join(parts)
+
+
+def measure(chunks: list[dict], tokenizer, limit: int) -> dict:
+    counts = [chunking.count_embedding_tokens(tokenizer, c["text"]) for c in chunks]
+    truncated = sum(1 for n in counts if n > limit)
+    return {
+        "chunks": len(chunks),
+        "mean_tokens": round(statistics.mean(counts), 1) if counts else 0,
+        "max_tokens": max(counts, default=0),
+        "truncation_rate": round(truncated / len(counts), 3) if counts else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokenizer", help="tokenizer.json path or HF id (default: the baked e5 tokenizer)")
+    parser.add_argument("--budget", type=int, help="token budget for token mode")
+    parser.add_argument("--paragraphs", type=int, default=120)
+    parser.add_argument("--json", action="store_true", help="emit JSON instead of a table")
+    args = parser.parse_args()
+
+    if args.tokenizer:
+        chunking.EMBEDDING_TOKENIZER = args.tokenizer
+    tokenizer = chunking.load_tokenizer()
+    if tokenizer is None:
+        print("tokenizer unavailable; pass --tokenizer", file=sys.stderr)
+        return 1
+    budget = args.budget or chunking.CHUNK_TOKENS
+    limit = chunking.EMBEDDING_MAX_TOKENS
+
+    rows = []
+    for seed, (label, ja_share) in enumerate(DOCUMENT_MIXES):
+        doc = make_document(ja_share, args.paragraphs, seed)
+        before = measure(chunking.safe_chunks(doc, mode="character"), tokenizer, limit)
+        after = measure(chunking.safe_chunks(doc, mode="token", token_budget=budget), tokenizer, limit)
+        rows.append({"document": label, "chars": len(doc), "character": before, "token": after})
+
+    if args.json:
+        print(json.dumps({"budget": budget, "limit": limit, "results": rows}, indent=2))
+        return 0
+
+    print(f"token budget={budget}  embedder limit={limit}")
+    print(f"{'document':<16}{'chars':>8}  {'mode':<10}{'chunks':>7}{'mean':>8}{'max':>6}{'trunc%':>8}")
+    for row in rows:
+        for mode in ("character", "token"):
+            m = row[mode]
+            print(
+                f"{row['document'] if mode == 'character' else '':<16}"
+                f"{row['chars'] if mode == 'character' else '':>8}  {mode:<10}"
+                f"{m['chunks']:>7}{m['mean_tokens']:>8}{m['max_tokens']:>6}{m['truncation_rate'] * 100:>7.1f}%"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
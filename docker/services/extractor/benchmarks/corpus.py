@@ -0,0 +1,232 @@
+"""Deterministic PDF corpus for extract_benchmark.py.
+
+Writes one PDF per document class the extractor sees in practice, with
+no PDF authoring library: the files are assembled object by object.
+
+  born_digital  running English text, Helvetica
+  table_heavy   ruled numeric tables with a caption per page
+  scanned       image-only pages (text rendered to a JPEG, no text layer)
+  cjk           Japanese running text (Type0 CID font, UniJIS-UCS2-H,
+                not embedded; the text layer is what matters)
+  long          born-digital text, several hundred pages
+
+Run on its own to inspect the files:
+  python benchmarks/corpus.py /tmp/corpus
+"""
+from __future__ import annotations
+
+import io
+import random
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+PAGE_W, PAGE_H = 612, 792
+
+EN_SENTENCES = [
+    "The extractor converts each PDF into layout-aware markdown before chunking.",
+    "Retrieval quality depends on chunks that fit the embedding window.",
+    "Tables and figure captions are preserved as structured markdown.",
+    "A born-digital report carries a clean text layer on every page.",
+    "Each chunk is embedded with a passage prefix and stored in Qdrant.",
+    "Scanned pages have no text layer and must go through optical recognition.",
+    "Long documents stress memory growth across hundreds of pages.",
+]
+JA_SENTENCES = [
+    "抽出サービスは各PDFをレイアウトを考慮したマークダウンに変換します。",
+    "検索品質は埋め込みモデルの入力長に収まるチャンクに依存します。",
+    "表や図のキャプションは構造化されたマークダウンとして保持されます。",
+    "日本語の文章は英語に比べて一文字あたりのトークン数が多くなります。",
+    "各チャンクはパッセージ接頭辞を付けて埋め込まれ、保存されます。",
+]
+
+
+@dataclass
+class Document:
+    doc_class: str
+    path: Path
+    pages: int
+
+
+class PdfWriter:
+    """Just enough PDF: pages with a content stream, Helvetica (/F1), a
+    Japanese CID font (/F2) and DCT (JPEG) image XObjects."""
+
+    def __init__(self) -> None:
+        self.objects: list[bytes] = []
+        self.pages: list[int] = []
+        self.catalog = self.add(b"")  # filled in by save()
+        self.page_tree = self.add(b"")
+        self.helvetica = self.add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        descriptor = self.add(
+            b"<< /Type /FontDescriptor /FontName /KozMinPr6N-Regular /Flags 4 /FontBBox [0 -200 1000 900]"
+            b" /ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 700 /StemV 80 >>"
+        )
+        cid_font = self.add(
+            b"<< /Type /Font /Subtype /CIDFontType0 /BaseFont /KozMinPr6N-Regular /DW 1000"
+            b" /CIDSystemInfo << /Registry (Adobe) /Ordering (Japan1) /Supplement 6 >>"
+            b" /FontDescriptor %d 0 R >>" % descriptor
+        )
+        self.cjk = self.add(
+            b"<< /Type /Font /Subtype /Type0 /BaseFont /KozMinPr6N-Regular /Encoding /UniJIS-UCS2-H"
+            b" /DescendantFonts [%d 0 R] >>" % cid_font
+        )
+
+    def add(self, body: bytes) -> int:
+        self.objects.append(body)
+        return len(self.objects)
+
+    def _stream(self, dictionary: bytes, data: bytes) -> int:
+        return self.add(b"<< %s /Length %d >>\nstream\n%s\nendstream" % (dictionary, len(data), data))
+
+    def image(self, jpeg: bytes, width: int, height: int) -> int:
+        return self._stream(
+            b"/Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray"
+            b" /BitsPerComponent 8 /Filter /DCTDecode" % (width, height),
+            jpeg,
+        )
+
+    def page(self, content: bytes, images: dict[str, int] | None = None) -> None:
+        xobjects = b" ".join(b"/%s %d 0 R" % (name.encode(), obj) for name, obj in (images or {}).items())
+        contents = self._stream(b"", content)
+        self.pages.append(self.add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R"
+            b" /Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> /XObject << %s >> >> >>"
+            % (self.page_tree, PAGE_W, PAGE_H, contents, self.helvetica, self.cjk, xobjects)
+        ))
+
+    def save(self, path: Path) -> None:
+        self.objects[self.catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % self.page_tree
+        kids = b" ".join(b"%d 0 R" % p for p in self.pages)
+        self.objects[self.page_tree - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.pages))
+        out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for i, body in enumerate(self.objects, start=1):
+            offsets.append(len(out))
+            out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+        xref = len(out)
+        out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.objects) + 1)
+        out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+        out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+            len(self.objects) + 1, self.catalog, xref,
+        )
+        path.write_bytes(bytes(out))
+
+
+def _escape(text: str) -> bytes:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1")
+
+
+def _wrap(words: list[str], width: int) -> list[str]:
+    lines, line = [], ""
+    for w in words:
+        if line and len(line) + 1 + len(w) > width:
+            lines.append(line)
+            line = w
+        else:
+            line = f"{line} {w}" if line else w
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _english_lines(rng: random.Random, count: int) -> list[str]:
+    lines: list[str] = []
+    while len(lines) < count:
+        para = " ".join(rng.choice(EN_SENTENCES) for _ in range(rng.randint(3, 7)))
+        lines.extend(_wrap(para.split(), 88))
+        lines.append("")
+    return lines[:count]
+
+
+def _text_content(lines: list[str], heading: str | None = None) -> bytes:
+    ops = [b"BT /F1 10 Tf 13 TL 60 740 Td"]
+    if heading:
+        ops.append(b"/F1 16 Tf (%s) Tj T* T* /F1 10 Tf" % _escape(heading))
+    ops += [b"(%s) Tj T*" % _escape(ln) if ln else b"T*" for ln in lines]
+    ops.append(b"ET")
+    return b"\n".join(ops)
+
+
+def _born_digital(writer: PdfWriter, rng: random.Random, pages: int) -> None:
+    for n in range(pages):
+        heading = f"Section {n // 4 + 1}" if n % 4 == 0 else None
+        writer.page(_text_content(_english_lines(rng, 50), heading))
+
+
+def _table_heavy(writer: PdfWriter, rng: random.Random, pages: int) -> None:
+    cols, rows, x0, y0, cw, rh = 6, 24, 60, 700, 82, 22
+    for n in range(pages):
+        ops = [b"BT /F1 12 Tf 60 740 Td (%s) Tj ET" % _escape(f"Table {n + 1}. Quarterly figures by region")]
+        for r in range(rows + 1):
+            y = y0 - r * rh
+            ops.append(b"%d %d m %d %d l S" % (x0, y, x0 + cols * cw, y))
+        for c in range(cols + 1):
+            x = x0 + c * cw
+            ops.append(b"%d %d m %d %d l S" % (x, y0, x, y0 - rows * rh))
+        for r in range(rows):
+            for c in range(cols):
+                cell = f"Region {r + 1}" if c == 0 else f"{rng.uniform(0, 10000):,.1f}"
+                ops.append(b"BT /F1 9 Tf %d %d Td (%s) Tj ET" % (x0 + c * cw + 4, y0 - (r + 1) * rh + 7, _escape(cell)))
+        writer.page(b"\n".join(ops))
+
+
+def _scanned(writer: PdfWriter, rng: random.Random, pages: int) -> None:
+    from PIL import Image, ImageDraw, ImageFont
+
+    width, height = 1275, 1650  # 150 dpi
+    try:
+        font = ImageFont.load_default(size=22)
+    except TypeError:  # Pillow < 10.1
+        font = ImageFont.load_default()
+    for _ in range(pages):
+        img = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(img)
+        for i, line in enumerate(_english_lines(rng, 48)):
+            draw.text((110, 110 + i * 30), line, fill=0, font=font)
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=70)
+        obj = writer.image(buf.getvalue(), width, height)
+        writer.page(b"q %d 0 0 %d 0 0 cm /Im0 Do Q" % (PAGE_W, PAGE_H), images={"Im0": obj})
+
+
+def _cjk(writer: PdfWriter, rng: random.Random, pages: int) -> None:
+    per_line = 38
+    for _ in range(pages):
+        text = "".join(rng.choice(JA_SENTENCES) for _ in range(40))
+        lines = [text[i:i + per_line] for i in range(0, per_line * 42, per_line)]
+        ops = [b"BT /F2 12 Tf 16 TL 60 740 Td"]
+        ops += [b"<%s> Tj T*" % ln.encode("utf-16-be").hex().upper().encode() for ln in lines]
+        ops.append(b"ET")
+        writer.page(b"\n".join(ops))
+
+
+CLASSES = {
+    "born_digital": (_born_digital, 20),
+    "table_heavy": (_table_heavy, 10),
+    "scanned": (_scanned, 5),
+    "cjk": (_cjk, 20),
+    "long": (_born_digital, 400),
+}
+
+
+def generate(out_dir: str | Path, classes: list[str] | None = None, scale: float = 1.0) -> list[Document]:
+    """Write the corpus into out_dir; `scale` multiplies every page count."""
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    docs = []
+    for seed, (name, (build, pages)) in enumerate(CLASSES.items()):
+        if classes and name not in classes:
+            continue
+        pages = max(1, round(pages * scale))
+        writer = PdfWriter()
+        build(writer, random.Random(seed), pages)
+        path = out / f"{name}.pdf"
+        writer.save(path)
+        docs.append(Document(name, path, pages))
+    return docs
+
+
+if __name__ == "__main__":
+    for doc in generate(sys.argv[1] if len(sys.argv) > 1 else "corpus"):
+        print(f"{doc.doc_class:<14}{doc.pages:>5} pages  {doc.path}")
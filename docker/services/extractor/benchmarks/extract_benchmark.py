@@ -0,0 +1,201 @@
+"""Extraction throughput/memory benchmark with a regression baseline.
+
+Generates the corpus in corpus.py (born-digital, table-heavy, scanned,
+CJK, long), runs every document through the real /v1/extract code path
+in-process (TestClient, worker isolation off, so the converter and the
+peak-RSS reset live in this process) and records per document class:
+
+  pages/sec        page_count over conversion wall time
+  peak RSS         the conversion's own high-water mark (VmHWM reset
+                   before each document)
+  chunk stats      count, mean/p95/max characters
+  routes           pages taken by the text fast path vs Docling
+
+Model initialisation is done once up front and reported separately, so
+it is not charged to the first document.
+
+Compare against a baseline and fail (exit 1) when a class gets slower or
+hungrier than the threshold allows, or its chunk count changes:
+
+  python benchmarks/extract_benchmark.py                    # compare
+  python benchmarks/extract_benchmark.py --update-baseline  # record
+
+The baseline stores the environment it was recorded in (Python,
+platform, CPUs, Docling, pypdfium2, Chonkie and tokenizers versions).
+Pages/sec and RSS only compare in the same environment; chunk counts
+compare anywhere, and are what moves when the extraction output itself
+changes. Comparing without a baseline fails at once, before any
+document runs. --update-baseline merges into a baseline from the same
+environment and replaces one from another. To record or compare inside
+the extractor container:
+  docker cp docker/services/extractor/benchmarks monadic-chat-extractor-container:/app/
+  docker exec -it monadic-chat-extractor-container python /app/benchmarks/extract_benchmark.py
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.metadata
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+os.environ.setdefault("EXTRACTOR_WORKER_ISOLATION", "0")
+
+import components  # noqa: E402
+import corpus  # noqa: E402
+import server  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+DEFAULT_BASELINE = HERE / "extract_baseline.json"
+DEFAULT_THRESHOLD = 0.20
+
+
+def _p95(values: list[int]) -> int:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+def run_document(client: TestClient, doc: corpus.Document, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        r = client.post("/v1/extract", json={"path": str(doc.path)})
+        wall_ms = int((time.perf_counter() - started) * 1000)
+        if r.status_code != 200:
+            return {"pages": doc.pages, "error": f"{r.status_code}: {r.text[:200]}"}
+        body = r.json()
+        runs.append((wall_ms, body))
+    # Median run by wall time; its numbers are reported together.
+    wall_ms, body = sorted(runs, key=lambda x: x[0])[len(runs) // 2]
+    meta = body["extractor_meta"]
+    sizes = [len(c["text"]) for c in body["chunks"]]
+    return {
+        "pages": body["page_count"],
+        "wall_ms": wall_ms,
+        "pages_per_second": meta.get("pages_per_second"),
+        "peak_rss_mb": meta.get("peak_rss_mb"),
+        "ocr_pages": meta.get("ocr_pages"),
+        "routes": meta.get("routes", {}),
+        "chunks": {
+            "count": len(sizes),
+            "mean_chars": round(statistics.mean(sizes), 1) if sizes else 0,
+            "p95_chars": _p95(sizes),
+            "max_chars": max(sizes, default=0),
+        },
+        "stage_timings_ms": meta.get("stage_timings_ms", {}),
+    }
+
+
+def environment() -> dict:
+    def version(dist: str) -> str | None:
+        try:
+            return importlib.metadata.version(dist)
+        except importlib.metadata.PackageNotFoundError:
+            return None
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        **{dist: version(dist) for dist in ("docling", "pypdfium2", "chonkie", "tokenizers")},
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, same_env: bool = True) -> list[str]:
+    """Regressions: slower or larger than the baseline by more than
+    `threshold` (only when `same_env`). A changed chunk count is
+    reported too; it means the extraction output itself changed."""
+    problems = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base or "error" in base:
+            continue
+        if "error" in cur:
+            problems.append(f"{name}: failed ({cur['error']})")
+            continue
+        if same_env and base.get("pages_per_second") and cur.get("pages_per_second") is not None:
+            floor = base["pages_per_second"] * (1 - threshold)
+            if cur["pages_per_second"] < floor:
+                problems.append(
+                    f"{name}: pages/sec {cur['pages_per_second']} < {floor:.2f} (baseline {base['pages_per_second']})"
+                )
+        if same_env and base.get("peak_rss_mb") and cur.get("peak_rss_mb") is not None:
+            ceiling = base["peak_rss_mb"] * (1 + threshold)
+            if cur["peak_rss_mb"] > ceiling:
+                problems.append(f"{name}: peak RSS {cur['peak_rss_mb']} MB > {ceiling:.0f} MB (baseline {base['peak_rss_mb']})")
+        if base["chunks"]["count"] != cur["chunks"]["count"]:
+            problems.append(f"{name}: chunk count {cur['chunks']['count']} != baseline {base['chunks']['count']}")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--classes", nargs="*", choices=list(corpus.CLASSES), help="document classes (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every class's page count")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per document; the median is kept")
+    parser.add_argument("--corpus-dir", help="write the corpus here instead of a temp dir")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed relative regression")
+    parser.add_argument("--update-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--json", action="store_true", help="emit JSON instead of a table")
+    args = parser.parse_args()
+    if not args.update_baseline and not args.baseline.exists():
+        parser.error(f"no baseline at {args.baseline}; record one with --update-baseline first")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = corpus.generate(args.corpus_dir or tmp, args.classes, args.scale)
+        init = components.warm(["docling_converter", "chunker"])
+        client = TestClient(server.app)
+        results = {doc.doc_class: run_document(client, doc, args.repeat) for doc in docs}
+
+    env = environment()
+    recorded = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    baseline = recorded.get("results", {})
+    same_env = recorded.get("environment") == env
+    problems = [] if args.update_baseline else compare(results, baseline, args.threshold, same_env)
+    report = {
+        "environment": env, "init": init, "threshold": args.threshold, "results": results, "regressions": problems,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print("init: " + ", ".join(f"{k} {v['init_ms']} ms" for k, v in init.items()))
+        print(f"{'class':<14}{'pages':>6}{'pages/s':>9}{'rss MB':>9}{'chunks':>8}{'p95':>6}  routes")
+        for name, r in results.items():
+            if "error" in r:
+                print(f"{name:<14}{r['pages']:>6}  error: {r['error']}")
+                continue
+            routes = " ".join(f"{k}={v}" for k, v in sorted(r["routes"].items()))
+            print(
+                f"{name:<14}{r['pages']:>6}{r['pages_per_second'] or 0:>9.2f}{r['peak_rss_mb'] or 0:>9.0f}"
+                f"{r['chunks']['count']:>8}{r['chunks']['p95_chars']:>6}  {routes}"
+            )
+        if recorded and not same_env:
+            print(f"baseline environment differs, comparing chunk counts only: {json.dumps(recorded.get('environment'))}")
+        for p in problems:
+            print(f"REGRESSION {p}")
+
+    if args.update_baseline:
+        # Failed classes are left out, so a later run can fill them in.
+        merged = {**(baseline if same_env else {}), **{k: v for k, v in results.items() if "error" not in v}}
+        recorded = {"environment": env, "threshold": args.threshold, "results": merged}
+        args.baseline.write_text(json.dumps(recorded, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
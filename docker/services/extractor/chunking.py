@@ -0,0 +1,325 @@
+"""Markdown chunking for the extractor service.
+
+Two modes, selected per request (`chunk_mode`) or by
+EXTRACTOR_CHUNK_MODE_RUNTIME:
+
+  character — Chonkie RecursiveChunker sized in characters. Needs no
+              tokenizer, but 1500 CJK characters is far beyond e5's
+              512-token window while sparse English under-fills it.
+  token     — the same recursive chunker sized with the embedding
+              model's own tokenizer (baked into the image at build
+              time), packing each chunk up to a token budget that fits
+              the embedder once the "passage: " prefix is added.
+
+Both modes fall back to a sliding window (characters or tokens) when
+Chonkie is unavailable or raises, and every path emits the same chunk
+schema: {"text", "metadata": {"index", "start", "end", "token_count"}}.
+
+Chunks can then be stamped with a content hash and summarised in a
+Merkle-style manifest (`build_manifest`); a later re-import passes that
+manifest back so `diff_against` can mark which chunks need re-embedding.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from collections import Counter
+from functools import lru_cache
+from typing import Any
+
+import components
+
+LOG = logging.getLogger("extractor.chunking")
+
+CHUNK_MODES = ("character", "token")
+DEFAULT_CHUNK_MODE = os.environ.get("EXTRACTOR_CHUNK_MODE_RUNTIME", "character")
+
+# Character mode. These sizes track ~250-400 tokens of English prose
+# per chunk, comfortably within the e5-base context — but see the
+# module docstring for why they misfit CJK text.
+CHUNK_SIZE_CHARS = 1500
+CHUNK_OVERLAP_CHARS = 200
+
+# Token mode. The tokenizer must be the one embeddings_service feeds
+# (MODEL_NAME there); the Dockerfile pre-fetches it so HF_HUB_OFFLINE
+# holds. A path to a tokenizer.json is also accepted. The default
+# budget leaves room for the "passage: " prefix and the CLS/SEP
+# specials inside EMBEDDING_MAX_TOKENS. It is also the largest budget
+# accepted: a bigger one would have the embedder cut the chunk tail.
+EMBEDDING_TOKENIZER = os.environ.get("EXTRACTOR_EMBEDDING_TOKENIZER", "intfloat/multilingual-e5-base")
+EMBEDDING_MAX_TOKENS = 512
+EMBEDDING_PREFIX = "passage: "
+MAX_CHUNK_TOKENS = 480
+CHUNK_TOKENS = min(int(os.environ.get("EXTRACTOR_CHUNK_TOKENS_RUNTIME", "480")), MAX_CHUNK_TOKENS)
+CHUNK_OVERLAP_TOKENS = 48
+
+MANIFEST_VERSION = 1
+HASH_ALGORITHM = "sha256"
+
+
+def _build_chunker():
+    """Recursive character chunker with overlap. A failure in chonkie
+    must not block the converter from serving, so errors degrade to the
+    character-window fallback.
+    """
+    try:
+        from chonkie import RecursiveChunker
+        return RecursiveChunker(
+            tokenizer="character",
+            chunk_size=CHUNK_SIZE_CHARS,
+            min_characters_per_chunk=200,
+        )
+    except Exception as exc:  # noqa: BLE001
+        LOG.warning("chonkie not available, will fall back to character split: %s", exc)
+        return None
+
+
+def _load_tokenizer():
+    try:
+        from tokenizers import Tokenizer
+        if os.path.isfile(EMBEDDING_TOKENIZER):
+            tokenizer = Tokenizer.from_file(EMBEDDING_TOKENIZER)
+        else:
+            tokenizer = Tokenizer.from_pretrained(EMBEDDING_TOKENIZER)
+    except Exception as exc:  # noqa: BLE001
+        LOG.warning("tokenizer %s not available, token chunking disabled: %s", EMBEDDING_TOKENIZER, exc)
+        return None
+    return tokenizer
+
+
+# Built on first use (components.py); the Chonkie import alone is slow.
+CHUNKER = components.register("chunker", _build_chunker)
+TOKENIZER = components.register("tokenizer", _load_tokenizer)
+
+
+def load_tokenizer():
+    """The embedding model's tokenizer, or None when it cannot be loaded
+    (token mode then degrades to character mode)."""
+    return TOKENIZER.get()
+
+
+@lru_cache(maxsize=8)
+def _token_chunker(budget: int):
+    tokenizer = load_tokenizer()
+    if tokenizer is None:
+        return None
+    try:
+        from chonkie import RecursiveChunker
+        return RecursiveChunker(tokenizer=tokenizer, chunk_size=budget, min_characters_per_chunk=24)
+    except Exception as exc:  # noqa: BLE001
+        LOG.warning("chonkie token chunker unavailable, will fall back to token window: %s", exc)
+        return None
+
+
+def resolve_mode(mode: str | None) -> str:
+    """Effective chunk mode: token mode needs the tokenizer to load."""
+    mode = mode or DEFAULT_CHUNK_MODE
+    if mode == "token" and load_tokenizer() is None:
+        return "character"
+    return mode if mode in CHUNK_MODES else "character"
+
+
+def count_embedding_tokens(tokenizer: Any, text: str) -> int:
+    """Tokens the embedder actually sees for a passage, specials included."""
+    return len(tokenizer.encode(EMBEDDING_PREFIX + text).ids)
+
+
+def safe_chunks(markdown: str, mode: str = "character", token_budget: int | None = None) -> list[dict]:
+    """Chunk the markdown blob. Returns [] for empty input — the importer
+    side falls back to its own splitter in that case.
+    """
+    return chunk_markdown(markdown, mode, token_budget)[0]
+
+
+def chunk_markdown(
+    markdown: str, mode: str = "character", token_budget: int | None = None,
+) -> tuple[list[dict], str | None]:
+    """safe_chunks(), plus the name of the chunker that actually produced
+    the chunks (extractor_meta.chunker): a fallback's name when Chonkie
+    was unavailable or failed, None for empty input."""
+    if not markdown or not markdown.strip():
+        return [], None
+    if mode == "token":
+        return _token_chunks(markdown, token_budget or CHUNK_TOKENS)
+    chunker = CHUNKER.get()
+    if chunker is None:
+        return character_window_chunks(markdown), "character-window"
+    try:
+        chunks = chunker.chunk(markdown)
+    except Exception as exc:  # noqa: BLE001
+        LOG.warning("chunker failed, falling back to char window: %s", exc)
+        return character_window_chunks(markdown), "character-window"
+    return _from_chonkie(chunks), "chonkie-recursive"
+
+
+def _token_chunks(markdown: str, budget: int) -> tuple[list[dict], str]:
+    tokenizer = load_tokenizer()
+    if tokenizer is None:
+        return chunk_markdown(markdown, mode="character")
+    chunker = _token_chunker(budget)
+    if chunker is None:
+        return token_window_chunks(markdown, tokenizer, budget), "token-window"
+    try:
+        chunks = chunker.chunk(markdown)
+    except Exception as exc:  # noqa: BLE001
+        LOG.warning("token chunker failed, falling back to token window: %s", exc)
+        return token_window_chunks(markdown, tokenizer, budget), "token-window"
+    return _from_chonkie(chunks), "chonkie-recursive-token"
+
+
+def _from_chonkie(chunks: Any) -> list[dict]:
+    out: list[dict] = []
+    for i, c in enumerate(chunks):
+        text = getattr(c, "text", "") or ""
+        if not text.strip():
+            continue
+        out.append({
+            "text": text,
+            "metadata": {
+                "index": i,
+                "start": int(getattr(c, "start_index", 0) or 0),
+                "end": int(getattr(c, "end_index", 0) or 0),
+                "token_count": int(getattr(c, "token_count", 0) or 0),
+            },
+        })
+    return out
+
+
+def character_window_chunks(markdown: str) -> list[dict]:
+    """Lightweight fallback: sliding character window with overlap.
+    Used when chonkie is unavailable or raises. Keeps the response
+    schema stable so the importer never has to special-case empties.
+    """
+    out: list[dict] = []
+    if not markdown:
+        return out
+    cursor = 0
+    idx = 0
+    n = len(markdown)
+    while cursor < n:
+        end = min(cursor + CHUNK_SIZE_CHARS, n)
+        text = markdown[cursor:end]
+        if text.strip():
+            out.append({
+                "text": text,
+                "metadata": {
+                    "index": idx,
+                    "start": cursor,
+                    "end": end,
+                    "token_count": len(text),
+                },
+            })
+            idx += 1
+        if end >= n:
+            break
+        cursor = end - CHUNK_OVERLAP_CHARS
+        if cursor < 0:
+            cursor = 0
+    return out
+
+
+def token_window_chunks(
+    markdown: str,
+    tokenizer: Any,
+    budget: int,
+    overlap: int = CHUNK_OVERLAP_TOKENS,
+) -> list[dict]:
+    """Token-mode fallback: sliding window of `budget` tokens with
+    `overlap` tokens shared between neighbours. The text is tokenized
+    once; windows map back to character spans through the tokenizer's
+    offsets, so start/end stay character offsets as in every other mode.
+    """
+    out: list[dict] = []
+    offsets = [o for o in tokenizer.encode(markdown, add_special_tokens=False).offsets if o[1] > o[0]]
+    if not offsets:
+        return out
+    step = max(1, budget - max(0, min(overlap, budget - 1)))
+    n = len(offsets)
+    cursor = 0
+    idx = 0
+    while cursor < n:
+        last = min(cursor + budget, n) - 1
+        start = offsets[cursor][0] if cursor > 0 else 0
+        end = offsets[last][1] if last < n - 1 else len(markdown)
+        text = markdown[start:end]
+        if text.strip():
+            out.append({
+                "text": text,
+                "metadata": {
+                    "index": idx,
+                    "start": start,
+                    "end": end,
+                    "token_count": last - cursor + 1,
+                },
+            })
+            idx += 1
+        if last >= n - 1:
+            break
+        cursor += step
+    return out
+
+
+def content_hash(text: str) -> str:
+    """Stable chunk identity: sha256 of the UTF-8 text with newlines
+    normalised, so a CRLF round-trip does not force a re-embed."""
+    normalised = text.replace("\r\n", "\n").replace("\r", "\n")
+    return hashlib.sha256(normalised.encode("utf-8")).hexdigest()
+
+
+def merkle_root(hashes: list[str]) -> str:
+    """Root of a binary hash tree over the chunk hashes, in order. An
+    odd node out is paired with itself, as in Bitcoin-style trees."""
+    level = [bytes.fromhex(h) for h in hashes]
+    if not level:
+        return hashlib.sha256(b"").hexdigest()
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [hashlib.sha256(level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+def build_manifest(chunks: list[dict]) -> dict:
+    """Stamp each chunk's metadata with `content_hash` and return the
+    document manifest the caller stores for its next re-import."""
+    hashes = []
+    for c in chunks:
+        h = content_hash(c["text"])
+        c["metadata"]["content_hash"] = h
+        hashes.append(h)
+    return {
+        "version": MANIFEST_VERSION,
+        "algorithm": HASH_ALGORITHM,
+        "root": merkle_root(hashes),
+        "chunks": hashes,
+    }
+
+
+def diff_against(chunks: list[dict], manifest: dict, previous: dict) -> dict:
+    """Mark each (already hashed) chunk `unchanged` or `added` relative to
+    a previous manifest and list the hashes that disappeared. Hashes are
+    compared as a multiset, so a paragraph repeated twice only counts as
+    unchanged as many times as it existed before.
+    """
+    if previous.get("root") == manifest["root"] and previous.get("chunks") == manifest["chunks"]:
+        for c in chunks:
+            c["metadata"]["status"] = "unchanged"
+        return {"unchanged": len(chunks), "added": 0, "removed": []}
+
+    remaining = Counter(previous.get("chunks") or [])
+    unchanged = 0
+    for c in chunks:
+        h = c["metadata"]["content_hash"]
+        if remaining[h] > 0:
+            remaining[h] -= 1
+            c["metadata"]["status"] = "unchanged"
+            unchanged += 1
+        else:
+            c["metadata"]["status"] = "added"
+    removed: list[str] = []
+    for h in previous.get("chunks") or []:
+        if remaining[h] > 0:
+            remaining[h] -= 1
+            removed.append(h)
+    return {"unchanged": unchanged, "added": len(chunks) - unchanged, "removed": removed}
@@ -0,0 +1,82 @@
+"""Lazily built, shared heavyweight objects (converter, chunker, tokenizer).
+
+Everything that loads models used to be built at import time, so the
+service answered nothing, not even /v1/info, until every layout, OCR and
+table model was up. A Component builds its object on the first get(),
+exactly once even when several request threads ask at the same moment,
+and records how long that took so cold-start regressions show up in
+/v1/info, /v1/ready and /v1/metrics.
+
+A factory that raises leaves the component "failed"; the next get()
+tries again, so a transient error does not poison the process.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+LOG = logging.getLogger("extractor.components")
+
+COLD, LOADING, READY, FAILED = "cold", "loading", "ready", "failed"
+
+
+class Component:
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value: Any = None
+        self.state = COLD
+        self.init_ms: int | None = None
+        self.error: str | None = None
+
+    def get(self) -> Any:
+        if self.state == READY:
+            return self._value
+        with self._lock:
+            if self.state == READY:
+                return self._value
+            self.state = LOADING
+            started = time.perf_counter()
+            try:
+                value = self._factory()
+            except Exception as exc:
+                self.init_ms = int((time.perf_counter() - started) * 1000)
+                self.state, self.error = FAILED, f"{type(exc).__name__}: {exc}"
+                raise
+            self.init_ms = int((time.perf_counter() - started) * 1000)
+            self._value, self.state, self.error = value, READY, None
+        LOG.info("%s initialised in %d ms", self.name, self.init_ms)
+        for listener in LISTENERS:
+            listener(self.name, self.init_ms)
+        return self._value
+
+    def status(self) -> dict[str, Any]:
+        return {"state": self.state, "init_ms": self.init_ms, "error": self.error}
+
+
+REGISTRY: dict[str, Component] = {}
+# Called as listener(name, init_ms) after each successful build.
+LISTENERS: list[Callable[[str, int], None]] = []
+
+
+def register(name: str, factory: Callable[[], Any]) -> Component:
+    component = REGISTRY[name] = Component(name, factory)
+    return component
+
+
+def statuses() -> dict[str, dict[str, Any]]:
+    return {name: c.status() for name, c in REGISTRY.items()}
+
+
+def warm(names: list[str] | None = None) -> dict[str, dict[str, Any]]:
+    """Build the named components (default: all registered) now. Errors
+    are recorded in the statuses, not raised."""
+    for name in names or list(REGISTRY):
+        try:
+            REGISTRY[name].get()
+        except Exception as exc:  # noqa: BLE001
+            LOG.warning("warm-up of %s failed: %s", name, exc)
+    return {name: REGISTRY[name].status() for name in names or list(REGISTRY)}
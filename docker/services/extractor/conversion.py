@@ -0,0 +1,254 @@
+"""Docling conversion, shared by the server and its worker processes.
+
+convert_file() turns a path into plain data (markdown + metadata +
+per-stage timings) so the result can cross a process boundary; the
+DoclingDocument itself never leaves the process that built it.
+
+PDF pages are routed first (routing.py): runs of clean born-digital
+pages are read straight from the text layer, the remaining runs go
+through Docling with a page range, and the pieces are joined in page
+order.
+
+Docling is imported and its converter built on first use (DOCLING, a
+components.Component), so importing this module is cheap and a
+document the fast path fully covers never loads the models.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from pathlib import Path
+from typing import Any
+
+import components
+import routing
+
+LOG = logging.getLogger("extractor.conversion")
+
+# The OCR stage visits every page but returns almost instantly when a
+# page has no bitmap regions; a page counts as OCR'd when it took longer.
+OCR_PAGE_THRESHOLD_S = 0.01
+
+
+class ConversionError(Exception):
+    pass
+
+
+def build_converter() -> Any:
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions
+    from docling.datamodel.settings import settings
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+
+    # Docling's own per-stage profiling (layout, ocr, table_structure,
+    # page_parse, doc_assemble, ...). Process-global; the cost is a clock
+    # read per stage call.
+    settings.debug.profile_pipeline_timings = True
+
+    # Keep in sync with the warm-up conversion in the Dockerfile.
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.do_ocr = True
+    pipeline_options.do_table_structure = True
+
+    return DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options),
+        },
+    )
+
+
+def safe_export_markdown(doc: Any) -> str:
+    try:
+        return doc.export_to_markdown() or ""
+    except Exception as exc:  # noqa: BLE001
+        LOG.warning("export_to_markdown failed: %s", exc)
+        return ""
+
+
+def safe_metadata(doc: Any, result: Any) -> tuple[str, str, int]:
+    title = ""
+    author = ""
+    page_count = 0
+    try:
+        if getattr(doc, "name", None):
+            title = str(doc.name)
+    except Exception:
+        pass
+    try:
+        meta = getattr(doc, "metadata", None) or {}
+        if isinstance(meta, dict):
+            title = title or str(meta.get("title", ""))
+            author = str(meta.get("author", ""))
+    except Exception:
+        pass
+    try:
+        pages_obj = getattr(result, "pages", None) or getattr(doc, "pages", None)
+        if pages_obj is not None and hasattr(pages_obj, "__len__"):
+            page_count = len(pages_obj)
+    except Exception:
+        pass
+    return title, author, page_count
+
+
+def stage_timings(result: Any) -> tuple[dict[str, int], int]:
+    """Total milliseconds per Docling profiling key, and the number of
+    pages the OCR stage actually worked on."""
+    timings: dict[str, int] = {}
+    ocr_pages = 0
+    try:
+        for key, item in (getattr(result, "timings", None) or {}).items():
+            times = list(getattr(item, "times", None) or [])
+            timings[str(key)] = int(sum(times) * 1000)
+            if key == "ocr":
+                ocr_pages = sum(1 for t in times if t >= OCR_PAGE_THRESHOLD_S)
+    except Exception as exc:  # noqa: BLE001
+        LOG.warning("reading pipeline timings failed: %s", exc)
+    return timings, ocr_pages
+
+
+# Page batches per route when a time budget is set: the budget is
+# checked between batches, so a Docling batch is the overshoot bound.
+BUDGET_BATCH_PAGES = {routing.ROUTE_DOCLING: 2, routing.ROUTE_TEXT: 50}
+
+
+def _add_timings(total: dict[str, int], more: dict[str, int]) -> None:
+    for key, ms in more.items():
+        total[key] = total.get(key, 0) + ms
+
+
+def _docling(converter: Any, path: Path, page_range: tuple[int, int] | None = None) -> dict[str, Any]:
+    started = time.perf_counter()
+    if page_range is None:
+        result = converter.convert(path)
+    else:
+        result = converter.convert(path, page_range=page_range)
+    convert_ms = int((time.perf_counter() - started) * 1000)
+    doc = getattr(result, "document", None)
+    if doc is None:
+        raise ConversionError("no document returned")
+    title, author, page_count = safe_metadata(doc, result)
+    timings, ocr_pages = stage_timings(result)
+    timings.setdefault("pipeline_total", convert_ms)
+    started = time.perf_counter()
+    markdown = safe_export_markdown(doc)
+    timings["markdown_export"] = int((time.perf_counter() - started) * 1000)
+    return {
+        "markdown": markdown,
+        "title": title,
+        "author": author,
+        "page_count": page_count,
+        "stage_timings_ms": timings,
+        "ocr_pages": ocr_pages,
+    }
+
+
+def convert_file(
+    converter: Any,
+    path: str | Path,
+    pages: list[tuple[int, int]] | None = None,
+    max_pages: int | None = None,
+    time_budget_ms: int | None = None,
+) -> dict[str, Any]:
+    """Convert a document. `pages` (1-based inclusive ranges) and
+    `max_pages` limit which PDF pages are converted; with
+    `time_budget_ms` conversion stops between page batches once the
+    budget is spent (the first batch always runs). A result that covers
+    fewer than all pages says so in `truncated`/`truncated_reason`.
+    Other formats are converted whole; the server refuses the options
+    for them."""
+    path = Path(path)
+    limited = bool(pages or max_pages or time_budget_ms) and path.suffix.lower() == ".pdf"
+    deadline = time.perf_counter() + time_budget_ms / 1000 if time_budget_ms else None
+    routes = None
+    started = time.perf_counter()
+    if path.suffix.lower() == ".pdf":
+        if routing.FAST_PATH:
+            routes = routing.classify(path)
+        elif limited:
+            routes = routing.docling_only(path)
+    routing_ms = int((time.perf_counter() - started) * 1000)
+
+    if not routes or (not limited and all(r.route == routing.ROUTE_DOCLING for r in routes)):
+        out = _docling(converter, path)
+        out["truncated"] = False
+        if routes:
+            out["stage_timings_ms"]["routing"] = routing_ms
+            out["page_routes"] = [r.as_dict() for r in routes]
+        return out
+
+    selected = routing.select(routes, pages, max_pages)
+    truncated_reason = None
+    if len(selected) < len(routes):
+        truncated_reason = "max_pages" if max_pages and len(selected) == max_pages else "pages"
+    parts: list[str] = []
+    converted: list[routing.PageRoute] = []
+    timings: dict[str, int] = {"routing": routing_ms, "text_layer": 0}
+    ocr_pages = 0
+    docling_s = docling_pages = 0.0
+    title, author = path.stem, ""
+    batch = BUDGET_BATCH_PAGES if deadline else None
+    for route, first, last in routing.runs(selected, max_len=batch):
+        n = last - first + 1
+        if deadline and converted:
+            # Stop before a batch that will not fit: Docling batches are
+            # estimated from the Docling pages done so far.
+            per_page = docling_s / docling_pages if docling_pages else 0.0
+            expected = per_page * n if route == routing.ROUTE_DOCLING else 0.0
+            if time.perf_counter() + expected > deadline:
+                truncated_reason = "time_budget"
+                break
+        started = time.perf_counter()
+        if route == routing.ROUTE_TEXT:
+            parts.append(routing.extract_text_pages(path, first, last))
+            timings["text_layer"] += int((time.perf_counter() - started) * 1000)
+        else:
+            out = _docling(converter, path, page_range=(first, last))
+            parts.append(out["markdown"])
+            _add_timings(timings, out["stage_timings_ms"])
+            ocr_pages += out["ocr_pages"]
+            author = author or out["author"]
+            docling_s += time.perf_counter() - started
+            docling_pages += n
+        converted.extend(r for r in selected if first <= r.page <= last)
+    if not author:
+        author = routing.pdf_author(path)
+    return {
+        "markdown": "\n\n".join(p for p in parts if p),
+        "title": title,
+        "author": author,
+        "page_count": len(routes),
+        "stage_timings_ms": timings,
+        "ocr_pages": ocr_pages,
+        "page_routes": [r.as_dict() for r in converted],
+        "pages_converted": len(converted),
+        "truncated": truncated_reason is not None,
+        "truncated_reason": truncated_reason,
+    }
+
+
+class LazyConverter:
+    """Stands in for a DocumentConverter; the real one is built by the
+    first convert() that actually needs Docling."""
+
+    def __init__(self, component: components.Component):
+        self.component = component
+
+    def convert(self, *args: Any, **kwargs: Any) -> Any:
+        return self.component.get().convert(*args, **kwargs)
+
+
+# One slot per pipeline variant. Only the default PDF pipeline exists
+# today; a variant with other options registers its own component.
+DOCLING = components.register("docling_converter", build_converter)
+CONVERTER = LazyConverter(DOCLING)
+
+
+def convert_path(path: str, **options: Any) -> dict[str, Any]:
+    """Worker-process entry point: one converter per process."""
+    return convert_file(CONVERTER, path, **options)
+
+
+def warm() -> dict[str, Any]:
+    """Worker-process warm-up: build the converter before the first job
+    and report how long it took."""
+    return components.warm(["docling_converter"])
@@ -0,0 +1,92 @@
+"""Prometheus metrics for GET /v1/metrics.
+
+Fed from the same numbers /v1/extract returns in extractor_meta, so a
+dashboard and a single response never disagree. Conversions run in
+worker processes, but the numbers are recorded here in the server
+process from each job's result, so the default (single-process)
+registry is enough.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+_SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+_MB = 1024 * 1024
+
+REQUESTS = Counter(
+    "extractor_requests_total", "Extraction requests by endpoint and outcome", ["endpoint", "outcome"],
+)
+DOCUMENT_SECONDS = Histogram(
+    "extractor_document_seconds", "Wall time per extracted document", buckets=_SECONDS_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "extractor_stage_seconds",
+    "Time per pipeline stage per document (Docling profiling keys, markdown_export, chunking)",
+    ["stage"],
+    buckets=_SECONDS_BUCKETS,
+)
+PAGES = Histogram(
+    "extractor_document_pages", "Pages per extracted document", buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+PAGES_PER_SECOND = Histogram(
+    "extractor_pages_per_second", "Conversion throughput per document",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50),
+)
+COALESCED = Counter(
+    "extractor_coalesced_requests_total", "Requests answered by another request's in-flight conversion",
+)
+COMPONENT_INIT_SECONDS = Histogram(
+    "extractor_component_init_seconds",
+    "Cold-start time per lazily built component (and per worker spawn + warm-up)",
+    ["component"],
+    buckets=_SECONDS_BUCKETS,
+)
+OCR_PAGES = Counter("extractor_ocr_pages_total", "Pages on which the OCR stage did work")
+PEAK_RSS = Histogram(
+    "extractor_peak_rss_bytes", "Peak RSS of the converting process per document",
+    buckets=tuple(mb * _MB for mb in (256, 512, 1024, 1536, 2048, 3072, 4096, 6144, 8192, 12288, 16384)),
+)
+
+
+def observe_extraction(endpoint: str, meta: dict[str, Any], page_count: int, coalesced: bool = False) -> None:
+    """Record one successful extraction from its extractor_meta. A
+    coalesced request only counts as a request; its conversion was
+    recorded by the request that ran it."""
+    REQUESTS.labels(endpoint=endpoint, outcome="ok").inc()
+    if coalesced:
+        COALESCED.inc()
+        return
+    DOCUMENT_SECONDS.observe(meta.get("duration_ms", 0) / 1000)
+    for stage, ms in (meta.get("stage_timings_ms") or {}).items():
+        STAGE_SECONDS.labels(stage=stage).observe(ms / 1000)
+    if page_count:
+        PAGES.observe(page_count)
+    if meta.get("pages_per_second"):
+        PAGES_PER_SECOND.observe(meta["pages_per_second"])
+    OCR_PAGES.inc(meta.get("ocr_pages") or 0)
+    if meta.get("peak_rss_mb"):
+        PEAK_RSS.observe(meta["peak_rss_mb"] * _MB)
+
+
+def observe_ingest(stats: dict[str, Any]) -> None:
+    """Record the embed/upsert stages of a /v1/ingest run (busy time)."""
+    for stage in ("embed", "upsert"):
+        busy_ms = (stats.get("stages") or {}).get(stage, {}).get("busy_ms")
+        if busy_ms is not None:
+            STAGE_SECONDS.labels(stage=f"ingest_{stage}").observe(busy_ms / 1000)
+
+
+def observe_component_init(component: str, init_ms: int) -> None:
+    COMPONENT_INIT_SECONDS.labels(component=component).observe(init_ms / 1000)
+
+
+def observe_failure(endpoint: str, outcome: str) -> None:
+    REQUESTS.labels(endpoint=endpoint, outcome=outcome).inc()
+
+
+def render() -> bytes:
+    return generate_latest()
@@ -0,0 +1,287 @@
+"""Fused chunk → embed → upsert stage runner for POST /v1/ingest.
+
+A Library import used to be three sequential round trips driven from
+Ruby (extract, then embeddings in 64-text slices, then Qdrant), so
+nothing overlapped. Here the stages run concurrently and hand work over
+through bounded queues:
+
+  feeder ──q_chunks──▶ embedder ──q_vectors──▶ upserter
+  (thread)             (thread)                (caller's thread)
+
+The queues hold at most `queue_batches` batches each, so a slow Qdrant
+stalls the embedder instead of piling vectors up in memory. Only the
+vectors are bounded this way: /v1/ingest converts and chunks the whole
+document first (the manifest diff and the point ids need every chunk),
+so the feeder walks a list whose texts are already in memory. The stage
+callables are injected, which keeps run_pipeline() free of HTTP and lets
+tests drive it with local stand-ins; the service-backed callables live
+at the bottom of this module and use only the stdlib.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+LOG = logging.getLogger("extractor.pipeline")
+
+EMBEDDINGS_URL = os.environ.get("EXTRACTOR_EMBEDDINGS_URL", "http://embeddings_service:8000").rstrip("/")
+QDRANT_URL = os.environ.get("EXTRACTOR_QDRANT_URL", "http://qdrant_service:6333").rstrip("/")
+# Mirrors Monadic::Embeddings::Client::DEFAULT_BATCH_SIZE.
+EMBED_BATCH_SIZE = 64
+QUEUE_BATCHES = 4
+HTTP_TIMEOUT = 120  # seconds per embed/upsert call
+
+# Namespace for deterministic point ids: the same chunk of the same
+# document always lands on the same Qdrant point, so a re-import can
+# delete removed chunks by id without a lookup.
+POINT_NAMESPACE = uuid.UUID("5f0c2b8e-6a1d-4f7e-9c3b-2d8a1e4b7c90")
+
+_DONE = object()
+_POLL = 0.1
+
+
+class PipelineError(Exception):
+    """A stage failed; `stage` names which one."""
+
+    def __init__(self, stage: str, message: str):
+        super().__init__(f"{stage}: {message}")
+        self.stage = stage
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    batches: int = 0
+    busy_s: float = 0.0
+    blocked_s: float = 0.0
+    max_queue: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "busy_ms": int(self.busy_s * 1000),
+            "blocked_ms": int(self.blocked_s * 1000),
+            "items_per_sec": round(self.items / self.busy_s, 1) if self.busy_s > 0 else None,
+            "max_queue_depth": self.max_queue,
+        }
+
+
+def point_id(document_id: str, content_hash: str, occurrence: int = 0) -> str:
+    return str(uuid.uuid5(POINT_NAMESPACE, f"{document_id}/{content_hash}/{occurrence}"))
+
+
+def removed_point_ids(document_id: str, previous_hashes: list[str], current_hashes: list[str]) -> list[str]:
+    """Ids of points a re-import leaves orphaned. Repeated hashes are
+    numbered by occurrence, so when a hash now appears fewer times the
+    trailing occurrences are the ones that go."""
+    before = Counter(previous_hashes)
+    after = Counter(current_hashes)
+    return [
+        point_id(document_id, h, n)
+        for h, count in before.items()
+        for n in range(after.get(h, 0), count)
+    ]
+
+
+def make_point_factory(
+    document_id: str,
+    payload: dict[str, Any],
+    all_chunks: list[dict],
+    vector_name: str | None = None,
+) -> Callable[[dict, list[float]], dict]:
+    """Build Qdrant points from (chunk, vector). Occurrence numbers come
+    from the chunk's rank among equal hashes in the whole document
+    (`all_chunks`), so skipping unchanged chunks does not renumber ids."""
+    occurrences: dict[int, int] = {}
+    seen: Counter = Counter()
+    for c in all_chunks:
+        h = c["metadata"]["content_hash"]
+        occurrences[c["metadata"]["index"]] = seen[h]
+        seen[h] += 1
+
+    def make(chunk: dict, vector: list[float]) -> dict:
+        meta = chunk["metadata"]
+        h = meta["content_hash"]
+        return {
+            "id": point_id(document_id, h, occurrences.get(meta["index"], 0)),
+            "vector": {vector_name: vector} if vector_name else vector,
+            "payload": {
+                **payload,
+                "document_id": document_id,
+                "text": chunk["text"],
+                "chunk_index": meta["index"],
+                "start": meta.get("start"),
+                "end": meta.get("end"),
+                "token_count": meta.get("token_count"),
+                "content_hash": h,
+            },
+        }
+
+    return make
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event, stats: StageStats) -> bool:
+    started = time.perf_counter()
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL)
+            stats.blocked_s += time.perf_counter() - started
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event) -> Any:
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def run_pipeline(
+    chunks: Iterable[dict],
+    embed: Callable[[list[str]], list[list[float]]],
+    upsert: Callable[[list[dict]], Any],
+    make_point: Callable[[dict, list[float]], dict],
+    batch_size: int = EMBED_BATCH_SIZE,
+    queue_batches: int = QUEUE_BATCHES,
+) -> dict[str, Any]:
+    """Stream `chunks` through embed and upsert. Returns per-stage stats;
+    raises PipelineError for the first stage that fails (the others are
+    stopped, nothing further is upserted)."""
+    q_chunks: queue.Queue = queue.Queue(maxsize=batch_size * queue_batches)
+    q_vectors: queue.Queue = queue.Queue(maxsize=queue_batches)
+    stop = threading.Event()
+    errors: list[PipelineError] = []
+    feed = StageStats("chunk")
+    emb = StageStats("embed")
+    ups = StageStats("upsert")
+
+    def fail(stage: str, exc: Exception) -> None:
+        errors.append(exc if isinstance(exc, PipelineError) else PipelineError(stage, str(exc)))
+        stop.set()
+
+    def feeder() -> None:
+        try:
+            it = iter(chunks)
+            while True:
+                t0 = time.perf_counter()
+                chunk = next(it, _DONE)
+                feed.busy_s += time.perf_counter() - t0
+                if chunk is _DONE:
+                    break
+                if not _put(q_chunks, chunk, stop, feed):
+                    return
+                feed.items += 1
+                feed.max_queue = max(feed.max_queue, q_chunks.qsize())
+        except Exception as exc:  # noqa: BLE001
+            fail("chunk", exc)
+            return
+        _put(q_chunks, _DONE, stop, feed)
+
+    def embedder() -> None:
+        batch: list[dict] = []
+        try:
+            while True:
+                item = _get(q_chunks, stop)
+                if stop.is_set():
+                    return
+                if item is not _DONE:
+                    batch.append(item)
+                if batch and (item is _DONE or len(batch) >= batch_size):
+                    t0 = time.perf_counter()
+                    vectors = embed([c["text"] for c in batch])
+                    emb.busy_s += time.perf_counter() - t0
+                    if len(vectors) != len(batch):
+                        raise PipelineError("embed", f"{len(vectors)} vectors for batch of {len(batch)}")
+                    emb.items += len(batch)
+                    emb.batches += 1
+                    if not _put(q_vectors, list(zip(batch, vectors)), stop, emb):
+                        return
+                    emb.max_queue = max(emb.max_queue, q_vectors.qsize())
+                    batch = []
+                if item is _DONE:
+                    break
+        except Exception as exc:  # noqa: BLE001
+            fail("embed", exc)
+            return
+        _put(q_vectors, _DONE, stop, emb)
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=feeder, name="ingest-feeder", daemon=True),
+        threading.Thread(target=embedder, name="ingest-embedder", daemon=True),
+    ]
+    for t in threads:
+        t.start()
+    try:
+        while True:
+            item = _get(q_vectors, stop)
+            if item is _DONE:
+                break
+            t0 = time.perf_counter()
+            upsert([make_point(c, v) for c, v in item])
+            ups.busy_s += time.perf_counter() - t0
+            ups.items += len(item)
+            ups.batches += 1
+    except Exception as exc:  # noqa: BLE001
+        fail("upsert", exc)
+    finally:
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
+
+    wall_s = time.perf_counter() - started
+    return {
+        "wall_ms": int(wall_s * 1000),
+        "items_per_sec": round(ups.items / wall_s, 1) if wall_s > 0 else None,
+        "batch_size": batch_size,
+        "queue_batches": queue_batches,
+        "stages": {s.name: s.as_dict() for s in (feed, emb, ups)},
+    }
+
+
+def _request(method: str, url: str, body: dict) -> dict:
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method=method,
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=HTTP_TIMEOUT) as resp:
+            return json.loads(resp.read() or b"{}")
+    except urllib.error.HTTPError as exc:
+        detail = exc.read()[:200].decode("utf-8", "replace")
+        raise RuntimeError(f"{method} {url} -> {exc.code} {detail}") from exc
+
+
+def embed_via_service(texts: list[str]) -> list[list[float]]:
+    return _request("POST", f"{EMBEDDINGS_URL}/v1/embed", {"texts": texts, "task": "passage"})["vectors"]
+
+
+def qdrant_upserter(collection: str) -> Callable[[list[dict]], Any]:
+    def upsert(points: list[dict]) -> Any:
+        return _request("PUT", f"{QDRANT_URL}/collections/{collection}/points?wait=true", {"points": points})
+    return upsert
+
+
+def qdrant_delete(collection: str, ids: list[str]) -> None:
+    if ids:
+        _request("POST", f"{QDRANT_URL}/collections/{collection}/points/delete?wait=true", {"points": ids})
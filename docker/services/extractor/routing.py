@@ -0,0 +1,248 @@
+"""Per-page routing between a plain text-layer path and Docling.
+
+Most Library PDFs are born-digital running text, yet every page used to
+pay for Docling's layout and table-structure models. classify() looks at
+each page through pdfium (already installed as a Docling dependency)
+and sends a page down the cheap path only when nothing on it needs a
+model:
+
+  - enough text-layer characters (else it is scanned or mostly figure,
+    and needs OCR)
+  - a clean text layer (no run of replacement/control characters from a
+    broken font encoding)
+  - no image covering a noticeable part of the page
+  - no grid of thin ruled lines (a table Docling should structure)
+
+Everything else, and any PDF pdfium cannot open, goes to Docling.
+Reading the text layer and the page objects costs a few milliseconds a
+page, against seconds per page for the layout model.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import statistics
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterator
+
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+
+try:
+    # pdfium is not thread-safe; Docling's PDF backend and pipeline take
+    # this lock around every call, and so must this module, which runs
+    # beside conversions (in-process conversions, warm-up, coalesced
+    # requests).
+    from docling.utils.locks import pypdfium2_lock
+except ImportError:  # no Docling in this process: only serialize our own calls
+    pypdfium2_lock = threading.Lock()
+
+LOG = logging.getLogger("extractor.routing")
+
+FAST_PATH = os.environ.get("EXTRACTOR_FAST_PATH", "1") not in ("0", "false", "no")
+
+ROUTE_TEXT = "text"
+ROUTE_DOCLING = "docling"
+
+MIN_PAGE_CHARS = 200
+MAX_BAD_CHAR_RATIO = 0.02
+# Images smaller than this share of the page (logos, bullets, rules drawn
+# as bitmaps) do not force the Docling path.
+MAX_IMAGE_AREA_RATIO = 0.05
+# Thin paths this long (share of the page width or height) are table
+# rules; a few of them on one page look like a grid.
+RULE_THICKNESS_PT = 2.0
+RULE_MIN_LENGTH_RATIO = 0.2
+MAX_RULES = 4
+
+_BAD_CHARS = re.compile(r"[\ufffd\x00-\x01\x03-\x08\x0b\x0c\x0e-\x1f]")
+_SENTENCE_END = (".", "!", "?", ":", "。", "！", "？")
+# Chinese and Japanese do not separate words with spaces, so a line break
+# between two of these characters joins without one.
+_CJK = re.compile(r"[\u3000-\u303f\u3040-\u30ff\u31f0-\u31ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+@dataclass
+class PageRoute:
+    page: int  # 1-based, as Docling numbers pages
+    route: str
+    reason: str
+    chars: int = 0
+    images: int = 0
+    rules: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _count_objects(page: pdfium.PdfPage) -> tuple[int, int]:
+    width, height = page.get_size()
+    area = width * height or 1.0
+    images = rules = 0
+    for obj in page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_IMAGE, pdfium_c.FPDF_PAGEOBJ_PATH)):
+        left, bottom, right, top = obj.get_bounds()
+        w, h = right - left, top - bottom
+        if obj.type == pdfium_c.FPDF_PAGEOBJ_IMAGE:
+            if w * h / area >= MAX_IMAGE_AREA_RATIO:
+                images += 1
+        elif (h <= RULE_THICKNESS_PT and w >= width * RULE_MIN_LENGTH_RATIO) or (
+            w <= RULE_THICKNESS_PT and h >= height * RULE_MIN_LENGTH_RATIO
+        ):
+            rules += 1
+    return images, rules
+
+
+def _classify_page(page: pdfium.PdfPage, page_no: int) -> PageRoute:
+    text = page.get_textpage().get_text_range()
+    chars = len(text.strip())
+    images, rules = _count_objects(page)
+    if chars < MIN_PAGE_CHARS:
+        reason = "sparse_text"
+    elif len(_BAD_CHARS.findall(text)) / chars > MAX_BAD_CHAR_RATIO:
+        reason = "garbled_text"
+    elif images:
+        reason = "images"
+    elif rules > MAX_RULES:
+        reason = "ruled_table"
+    else:
+        return PageRoute(page_no, ROUTE_TEXT, "clean_text", chars, images, rules)
+    return PageRoute(page_no, ROUTE_DOCLING, reason, chars, images, rules)
+
+
+def classify(path: str | Path) -> list[PageRoute] | None:
+    """Route every page of a PDF, or None when pdfium cannot read it
+    (the caller then sends the whole file to Docling)."""
+    with pypdfium2_lock:
+        try:
+            pdf = pdfium.PdfDocument(str(path))
+        except Exception as exc:  # noqa: BLE001
+            LOG.info("routing skipped for %s: %s", path, exc)
+            return None
+        try:
+            return [_classify_page(pdf[i], i + 1) for i in range(len(pdf))]
+        except Exception as exc:  # noqa: BLE001
+            LOG.warning("routing failed for %s: %s", path, exc)
+            return None
+        finally:
+            pdf.close()
+
+
+def docling_only(path: str | Path) -> list[PageRoute] | None:
+    """Every page routed to Docling (fast path off), or None when pdfium
+    cannot read the file."""
+    with pypdfium2_lock:
+        try:
+            pdf = pdfium.PdfDocument(str(path))
+        except Exception as exc:  # noqa: BLE001
+            LOG.info("page count unavailable for %s: %s", path, exc)
+            return None
+        try:
+            return [PageRoute(i + 1, ROUTE_DOCLING, "fast_path_off") for i in range(len(pdf))]
+        finally:
+            pdf.close()
+
+
+_OPEN_END = 10**9
+
+
+def parse_page_ranges(spec: str) -> list[tuple[int, int]]:
+    """"1-3,7,10-" → [(1, 3), (7, 7), (10, MAX)]; 1-based, inclusive.
+    Raises ValueError on a malformed spec."""
+    ranges = []
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        lo = int(first) if first else 1
+        hi = (int(last) if last else _OPEN_END) if sep else lo
+        if lo < 1 or hi < lo:
+            raise ValueError(f"bad page range {part!r}")
+        ranges.append((lo, hi))
+    if not ranges:
+        raise ValueError("empty page range")
+    return ranges
+
+
+def select(
+    routes: list[PageRoute], ranges: list[tuple[int, int]] | None = None, max_pages: int | None = None,
+) -> list[PageRoute]:
+    """The pages to convert, in document order."""
+    chosen = [r for r in routes if not ranges or any(lo <= r.page <= hi for lo, hi in ranges)]
+    return chosen[:max_pages] if max_pages else chosen
+
+
+def runs(routes: list[PageRoute], max_len: dict[str, int] | None = None) -> Iterator[tuple[str, int, int]]:
+    """Group consecutive pages with the same route: (route, first, last).
+    A gap in page numbers also ends a run; `max_len` caps run length per
+    route, so a caller with a deadline can stop between runs."""
+    start = 0
+    for i in range(1, len(routes) + 1):
+        if (
+            i == len(routes)
+            or routes[i].route != routes[start].route
+            or routes[i].page != routes[i - 1].page + 1
+            or (max_len and i - start >= max_len.get(routes[start].route, len(routes)))
+        ):
+            yield routes[start].route, routes[start].page, routes[i - 1].page
+            start = i
+
+
+def text_to_markdown(text: str) -> str:
+    """Rebuild paragraphs from a page's text layer. pdfium yields one
+    line per visual line; a line that ends a sentence well short of the
+    usual line width ends its paragraph, a trailing hyphen joins words
+    and a break between CJK characters joins without a space."""
+    lines = [ln.strip() for ln in text.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    lengths = [len(ln) for ln in lines if ln]
+    if not lengths:
+        return ""
+    full = statistics.median(lengths)
+    paragraphs: list[str] = []
+    current = ""
+    for ln in lines:
+        if not ln:
+            if current:
+                paragraphs.append(current)
+                current = ""
+            continue
+        if current.endswith(("-", "\x02")) and ln[:1].islower():
+            current = current[:-1] + ln
+        elif current and _CJK.match(current[-1]) and _CJK.match(ln[0]):
+            current += ln
+        else:
+            current = f"{current} {ln}" if current else ln
+        if ln.endswith(_SENTENCE_END) and len(ln) < 0.75 * full:
+            paragraphs.append(current)
+            current = ""
+    if current:
+        paragraphs.append(current)
+    return "\n\n".join(_BAD_CHARS.sub("", p.replace("\x02", "-")) for p in paragraphs)
+
+
+def extract_text_pages(path: str | Path, first: int, last: int) -> str:
+    """Markdown for pages first..last (1-based, inclusive) from the text layer."""
+    with pypdfium2_lock:
+        pdf = pdfium.PdfDocument(str(path))
+        try:
+            texts = [pdf[i - 1].get_textpage().get_text_range() for i in range(first, last + 1)]
+        finally:
+            pdf.close()
+    parts = [text_to_markdown(text) for text in texts]
+    return "\n\n".join(p for p in parts if p)
+
+
+def pdf_author(path: str | Path) -> str:
+    """Author from the PDF info dictionary, for documents that never
+    reach Docling."""
+    with pypdfium2_lock:
+        try:
+            pdf = pdfium.PdfDocument(str(path))
+        except Exception:  # noqa: BLE001
+            return ""
+        try:
+            return pdf.get_metadata_dict().get("Author", "") or ""
+        finally:
+            pdf.close()
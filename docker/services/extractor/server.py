@@ -1,80 +1,125 @@
 """Extractor service: layout-aware document extraction via Docling.
 
 Endpoints:
-  GET  /v1/health
+  GET  /v1/health    (liveness)
+  GET  /v1/ready     (readiness: models loaded)
   GET  /v1/info
   POST /v1/extract
-
-Stateless apart from the singleton DocumentConverter loaded at import
-time. The Ruby side talks to this service via HTTP through the
-Compose network, passing file paths under /monadic/data (shared
-volume) rather than uploading bytes.
+  POST /v1/ingest
+  GET  /v1/metrics   (Prometheus text format)
+
+Stateless apart from the Docling converter, which lives in supervised
+worker processes (worker.py) or, with isolation off, in this process;
+/v1/ingest additionally writes to embeddings_service and Qdrant. The
+Ruby side talks to this service via HTTP through the Compose network,
+passing file paths under /monadic/data (shared volume) rather than
+uploading bytes.
 """
 from __future__ import annotations
 
 import logging
 import os
+import threading
 import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any
-
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions
-from docling.document_converter import DocumentConverter, PdfFormatOption
+from typing import Any, Literal
+
+from fastapi import FastAPI, HTTPException, Response
+from pydantic import BaseModel, Field, field_validator
+
+from chunking import (
+    CHUNK_TOKENS,
+    DEFAULT_CHUNK_MODE,
+    EMBEDDING_TOKENIZER,
+    MAX_CHUNK_TOKENS,
+    build_manifest,
+    chunk_markdown,
+    diff_against,
+    resolve_mode,
+)
+import components
+import conversion
+import metrics
+import routing
+import singleflight
+from conversion import convert_file
+from pipeline import (
+    EMBED_BATCH_SIZE,
+    QUEUE_BATCHES,
+    PipelineError,
+    embed_via_service,
+    make_point_factory,
+    qdrant_delete,
+    qdrant_upserter,
+    removed_point_ids,
+    run_pipeline,
+)
+from worker import DEFAULT_WARM, ISOLATION, WorkerError, WorkerPool, peak_rss_mb, reset_peak_rss
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
 LOG = logging.getLogger("extractor.server")
 
 PIPELINE_NAME = "docling-2.x"
 
-# Chunking knobs. Character-based to keep the image free of heavy
-# tokenizer downloads — these sizes track ~250-400 tokens of English
-# prose per chunk, which is comfortably within the e5-base 512-token
-# context used downstream by embeddings_service.
-CHUNK_SIZE_CHARS = 1500
-CHUNK_OVERLAP_CHARS = 200
-
-
-def _build_converter() -> DocumentConverter:
-    pipeline_options = PdfPipelineOptions()
-    pipeline_options.do_ocr = True
-    pipeline_options.do_table_structure = True
-
-    return DocumentConverter(
-        format_options={
-            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options),
-        },
-    )
-
-
-CONVERTER = _build_converter()
-LOG.info("Docling converter initialised (pipeline=%s)", PIPELINE_NAME)
-
-
-def _build_chunker():
-    """Recursive token-aware chunker with overlap. Built lazily so a
-    failure in chonkie does not block the converter from serving.
-    """
-    try:
-        from chonkie import RecursiveChunker
-        return RecursiveChunker(
-            tokenizer="character",
-            chunk_size=CHUNK_SIZE_CHARS,
-            min_characters_per_chunk=200,
-        )
-    except Exception as exc:  # noqa: BLE001
-        LOG.warning("chonkie not available, will fall back to character split: %s", exc)
-        return None
-
-
-CHUNKER = _build_chunker()
-if CHUNKER is not None:
-    LOG.info("Chonkie RecursiveChunker initialised (chunk_size=%d chars)", CHUNK_SIZE_CHARS)
 
-app = FastAPI(title="Monadic Extractor Service")
+# Conversions run in supervised worker processes (worker.py) unless
+# EXTRACTOR_WORKER_ISOLATION=0, in which case the server process holds
+# the converter itself. Either way nothing loads models at import time;
+# the warm-up thread started with the app does, and /v1/ready reports
+# when it is done.
+if ISOLATION:
+    WORKERS: WorkerPool | None = WorkerPool(warm=DEFAULT_WARM)
+    CONVERTER = None
+    LOG.info("Docling conversions isolated in %d worker process(es)", len(WORKERS.workers))
+else:
+    WORKERS = None
+    CONVERTER = conversion.CONVERTER
+
+# EXTRACTOR_WARMUP=0 leaves every model to load on first use.
+WARMUP_ENABLED = os.environ.get("EXTRACTOR_WARMUP", "1") not in ("0", "false", "no")
+WARMUP: dict[str, Any] = {"state": "pending" if WARMUP_ENABLED else "disabled", "duration_ms": None}
+
+components.LISTENERS.append(metrics.observe_component_init)
+
+
+def _warm_up() -> None:
+    WARMUP["state"] = "warming"
+    started = time.perf_counter()
+    names = ["chunker"] + (["tokenizer"] if DEFAULT_CHUNK_MODE == "token" else [])
+    components.warm(names)
+    if WORKERS is not None:
+        for w in WORKERS.warm():
+            if w["init_ms"] is not None:
+                metrics.observe_component_init("worker", w["init_ms"])
+            for name, status in (w["components"] or {}).items():
+                if status.get("init_ms") is not None:
+                    metrics.observe_component_init(name, status["init_ms"])
+    else:
+        components.warm(["docling_converter"])
+    WARMUP["duration_ms"] = int((time.perf_counter() - started) * 1000)
+    WARMUP["state"] = "done"
+    LOG.info("warm-up finished in %d ms", WARMUP["duration_ms"])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ENABLED:
+        threading.Thread(target=_warm_up, name="extractor-warmup", daemon=True).start()
+    yield
+    if WORKERS is not None:
+        WORKERS.shutdown()
+
+
+app = FastAPI(title="Monadic Extractor Service", lifespan=lifespan)
+
+
+class ChunkManifest(BaseModel):
+    """The `manifest` block of a previous /v1/extract response."""
+    version: int = 1
+    algorithm: str = "sha256"
+    root: str
+    chunks: list[str] = Field(default_factory=list)
 
 
 class ExtractRequest(BaseModel):
@@ -87,13 +132,92 @@ class ExtractRequest(BaseModel):
     # converter is built once at startup with do_ocr=True.
     ocr: str = "auto"
     language_hint: list[str] = Field(default_factory=list)
+    # Chunk sizing: 'character' (default, EXTRACTOR_CHUNK_MODE_RUNTIME)
+    # or 'token' to pack chunks against the embedding model's tokenizer.
+    # chunk_tokens overrides the token budget for this request, up to
+    # what fits the embedder's window (MAX_CHUNK_TOKENS).
+    chunk_mode: Literal["character", "token"] | None = None
+    chunk_tokens: int | None = Field(default=None, ge=32, le=MAX_CHUNK_TOKENS)
+    # Manifest returned by the last import of this document. When given,
+    # each chunk is marked unchanged/added and removed hashes are listed,
+    # so the importer only re-embeds what changed.
+    previous_manifest: ChunkManifest | None = None
+    # Partial extraction for "peek at this document" flows. `pages` is a
+    # PDF page spec ("1-3,7,10-"), `max_pages` caps the pages converted,
+    # `time_budget_ms` stops conversion between page batches once spent.
+    # A partial result is marked `truncated: true`.
+    pages: str | None = None
+    max_pages: int | None = Field(default=None, ge=1)
+    time_budget_ms: int | None = Field(default=None, ge=100)
+
+    @field_validator("pages")
+    @classmethod
+    def _check_pages(cls, v: str | None) -> str | None:
+        if v is not None:
+            routing.parse_page_ranges(v)
+        return v
+
+    def conversion_options(self) -> dict[str, Any]:
+        options: dict[str, Any] = {}
+        if self.pages:
+            options["pages"] = routing.parse_page_ranges(self.pages)
+        if self.max_pages:
+            options["max_pages"] = self.max_pages
+        if self.time_budget_ms:
+            options["time_budget_ms"] = self.time_budget_ms
+        return options
+
+
+class IngestRequest(ExtractRequest):
+    # Target Qdrant collection (must already exist with the embedding
+    # dimension) and, for named-vector collections, the vector name.
+    collection: str
+    vector_name: str | None = None
+    # Stable id of the document; point ids derive from it and the chunk
+    # hashes. Defaults to `path`.
+    document_id: str | None = None
+    # Merged into every point's payload (e.g. library/conversation ids).
+    payload: dict[str, Any] = Field(default_factory=dict)
+    embed_batch_size: int = Field(default=EMBED_BATCH_SIZE, ge=1, le=256)
+    queue_batches: int = Field(default=QUEUE_BATCHES, ge=1, le=64)
 
 
 @app.get("/v1/health")
 def health() -> dict[str, Any]:
+    # Liveness only: answers as soon as the process serves HTTP, before
+    # any model has loaded. Readiness is /v1/ready.
     return {"status": "ok", "pipeline": PIPELINE_NAME}
 
 
+def _converter_ready() -> bool:
+    if WORKERS is not None:
+        return any(
+            w["components"] and all(c["state"] == components.READY for c in w["components"].values())
+            for w in WORKERS.describe()
+        )
+    return conversion.DOCLING.state == components.READY
+
+
+@app.get("/v1/ready")
+def ready(response: Response) -> dict[str, Any]:
+    if WARMUP["state"] == "disabled":
+        status = "ready"  # models load on first use
+    elif WARMUP["state"] != "done":
+        status = "warming"
+    else:
+        status = "ready" if _converter_ready() else "failed"
+    if status != "ready":
+        response.status_code = 503
+    return {"status": status, "warmup": WARMUP, **_component_report()}
+
+
+def _component_report() -> dict[str, Any]:
+    report: dict[str, Any] = {"components": components.statuses()}
+    if WORKERS is not None:
+        report["workers"] = WORKERS.describe()
+    return report
+
+
 @app.get("/v1/info")
 def info() -> dict[str, Any]:
     return {
@@ -101,139 +225,174 @@ def info() -> dict[str, Any]:
         "ocr_backend": os.environ.get("EXTRACTOR_OCR_RUNTIME", "rapidocr"),
         "languages": os.environ.get("EXTRACTOR_LANGS_RUNTIME", "").split(","),
         "supported_formats": ["pdf"],
+        "chunking": {
+            "default_mode": DEFAULT_CHUNK_MODE,
+            "token_budget": CHUNK_TOKENS,
+            "tokenizer": EMBEDDING_TOKENIZER,
+        },
+        "fast_path": routing.FAST_PATH,
+        "conversions_in_flight": CONVERSIONS.in_flight(),
+        "warmup": WARMUP,
+        **_component_report(),
     }
 
 
-def _safe_export_markdown(doc: Any) -> str:
-    try:
-        return doc.export_to_markdown() or ""
-    except Exception as exc:  # noqa: BLE001
-        LOG.warning("export_to_markdown failed: %s", exc)
-        return ""
+# Concurrent requests for the same unchanged file share one conversion.
+CONVERSIONS = singleflight.Group()
 
 
-def _safe_chunks(markdown: str) -> list[dict]:
-    """Run RecursiveChunker over the markdown blob. Returns [] when
-    chunking is disabled or fails — the importer side falls back to its
-    own splitter in that case.
-    """
-    if not markdown or not markdown.strip():
-        return []
-    if CHUNKER is None:
-        return _character_window_chunks(markdown)
-    try:
-        chunks = CHUNKER.chunk(markdown)
-    except Exception as exc:  # noqa: BLE001
-        LOG.warning("chunker failed, falling back to char window: %s", exc)
-        return _character_window_chunks(markdown)
-    out: list[dict] = []
-    for i, c in enumerate(chunks):
-        text = getattr(c, "text", "") or ""
-        if not text.strip():
-            continue
-        out.append({
-            "text": text,
-            "metadata": {
-                "index": i,
-                "start": int(getattr(c, "start_index", 0) or 0),
-                "end": int(getattr(c, "end_index", 0) or 0),
-                "token_count": int(getattr(c, "token_count", 0) or 0),
-            },
-        })
-    return out
-
-
-def _character_window_chunks(markdown: str) -> list[dict]:
-    """Lightweight fallback: sliding character window with overlap.
-    Used when chonkie is unavailable or raises. Keeps the response
-    schema stable so the importer never has to special-case empties.
-    """
-    out: list[dict] = []
-    if not markdown:
-        return out
-    cursor = 0
-    idx = 0
-    n = len(markdown)
-    while cursor < n:
-        end = min(cursor + CHUNK_SIZE_CHARS, n)
-        text = markdown[cursor:end]
-        if text.strip():
-            out.append({
-                "text": text,
-                "metadata": {
-                    "index": idx,
-                    "start": cursor,
-                    "end": end,
-                    "token_count": len(text),
-                },
-            })
-            idx += 1
-        if end >= n:
-            break
-        cursor = end - CHUNK_OVERLAP_CHARS
-        if cursor < 0:
-            cursor = 0
-    return out
-
-
-def _safe_metadata(doc: Any, result: Any) -> tuple[str, str, int]:
-    title = ""
-    author = ""
-    page_count = 0
-    try:
-        if getattr(doc, "name", None):
-            title = str(doc.name)
-    except Exception:
-        pass
-    try:
-        meta = getattr(doc, "metadata", None) or {}
-        if isinstance(meta, dict):
-            title = title or str(meta.get("title", ""))
-            author = str(meta.get("author", ""))
-    except Exception:
-        pass
-    try:
-        pages_obj = getattr(result, "pages", None) or getattr(doc, "pages", None)
-        if pages_obj is not None and hasattr(pages_obj, "__len__"):
-            page_count = len(pages_obj)
-    except Exception:
-        pass
-    return title, author, page_count
+def _convert(path: str, options: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Convert one file; returns (conversion output, worker stats)."""
+    if WORKERS is not None:
+        out, stats = WORKERS.run(path, options)
+        if stats.get("worker_cold_start_ms") is not None:
+            metrics.observe_component_init("worker", stats["worker_cold_start_ms"])
+        return out, stats
+    reset_peak_rss()
+    out = convert_file(CONVERTER, path, **options)
+    return out, {"peak_rss_mb": peak_rss_mb()}
+
+
+@app.get("/v1/metrics")
+def prometheus_metrics() -> Response:
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 @app.post("/v1/extract")
 def extract(req: ExtractRequest) -> dict[str, Any]:
+    return _extract_document(req, endpoint="extract")
+
+
+def _route_summary(page_routes: list[dict] | None) -> dict[str, Any]:
+    if not page_routes:
+        return {}
+    counts: dict[str, int] = {}
+    for r in page_routes:
+        counts[r["route"]] = counts.get(r["route"], 0) + 1
+    return {"routes": counts, "page_routes": page_routes}
+
+
+def _extract_document(req: ExtractRequest, endpoint: str) -> dict[str, Any]:
     p = Path(req.path)
     if not p.exists():
+        metrics.observe_failure(endpoint, "not_found")
         raise HTTPException(status_code=404, detail=f"file not found: {req.path}")
+    if req.conversion_options() and p.suffix.lower() != ".pdf":
+        # convert_file only splits PDFs by page; anything else would be
+        # converted whole and still report truncated: false.
+        raise HTTPException(status_code=422, detail="pages/max_pages/time_budget_ms apply to PDF input only")
 
     started = time.time()
     try:
-        result = CONVERTER.convert(p)
+        options = req.conversion_options()
+        key = singleflight.file_key(str(p), req.format, req.ocr, *sorted((k, str(v)) for k, v in options.items()))
+        (converted, worker_stats), coalesced = CONVERSIONS.do(key, lambda: _convert(str(p), options))
+    except WorkerError as exc:
+        metrics.observe_failure(endpoint, exc.kind)
+        if exc.kind == "extraction_failed":
+            LOG.warning("convert failed (%s): %s", req.path, exc)
+            raise HTTPException(status_code=500, detail=f"extraction_failed: {exc}")
+        # Resource limit or crash: structured, so the caller can tell a
+        # pathological file from a service outage.
+        LOG.warning("worker %s on %s: %s", exc.kind, req.path, exc)
+        raise HTTPException(status_code=504 if exc.kind == "timeout" else 500, detail=exc.as_detail(req.path))
     except Exception as exc:  # noqa: BLE001
+        metrics.observe_failure(endpoint, "extraction_failed")
         LOG.exception("convert failed")
         raise HTTPException(status_code=500, detail=f"extraction_failed: {exc}")
-
-    doc = getattr(result, "document", None)
-    if doc is None:
-        raise HTTPException(status_code=500, detail="extraction_failed: no document returned")
-
-    markdown = _safe_export_markdown(doc)
-    title, author, page_count = _safe_metadata(doc, result)
-    chunks = _safe_chunks(markdown)
+    convert_s = time.time() - started
+
+    markdown = converted["markdown"]
+    title, author, page_count = converted["title"], converted["author"], converted["page_count"]
+    pages_converted = converted.get("pages_converted", page_count)
+    stage_timings_ms = dict(converted.get("stage_timings_ms") or {})
+    chunk_started = time.perf_counter()
+    chunk_mode = resolve_mode(req.chunk_mode)
+    chunks, chunker = chunk_markdown(markdown, mode=chunk_mode, token_budget=req.chunk_tokens)
+    manifest = build_manifest(chunks)
+    diff = None
+    if req.previous_manifest is not None:
+        diff = diff_against(chunks, manifest, req.previous_manifest.model_dump())
+    stage_timings_ms["chunking"] = int((time.perf_counter() - chunk_started) * 1000)
     elapsed_ms = int((time.time() - started) * 1000)
 
-    return {
+    response = {
         "title": title,
         "author": author,
         "page_count": page_count,
+        "truncated": converted.get("truncated", False),
         "markdown": markdown,
         "chunks": chunks,
+        "manifest": manifest,
         "extractor_meta": {
             "pipeline": PIPELINE_NAME,
             "ocr_backend": os.environ.get("EXTRACTOR_OCR_RUNTIME", "rapidocr"),
-            "chunker": "chonkie-recursive" if CHUNKER is not None else "character-window",
+            "chunker": chunker,
+            "chunk_mode": chunk_mode,
             "chunk_count": len(chunks),
             "duration_ms": elapsed_ms,
+            "stage_timings_ms": stage_timings_ms,
+            "pages_converted": pages_converted,
+            "truncated_reason": converted.get("truncated_reason"),
+            "pages_per_second": round(pages_converted / convert_s, 2) if pages_converted and convert_s > 0 else None,
+            "ocr_pages": converted.get("ocr_pages", 0),
+            **_route_summary(converted.get("page_routes")),
+            **worker_stats,
+            "coalesced": coalesced,
         },
     }
+    if diff is not None:
+        response["diff"] = diff
+    metrics.observe_extraction(endpoint, response["extractor_meta"], pages_converted, coalesced)
+    return response
+
+
+@app.post("/v1/ingest")
+def ingest(req: IngestRequest) -> dict[str, Any]:
+    """Extract, then stream the chunks through embeddings_service into
+    Qdrant (see pipeline.py). With `previous_manifest`, unchanged chunks
+    are skipped and points of removed chunks are deleted. The response
+    omits markdown and chunk texts — they are in Qdrant now.
+    """
+    if req.conversion_options():
+        # A partial extraction would look like removed chunks to the
+        # manifest diff and delete their points.
+        raise HTTPException(status_code=422, detail="pages/max_pages/time_budget_ms are not supported by /v1/ingest")
+    extracted = _extract_document(req, endpoint="ingest")
+    chunks = extracted["chunks"]
+    document_id = req.document_id or req.path
+    todo = [c for c in chunks if c["metadata"].get("status") != "unchanged"]
+    make_point = make_point_factory(document_id, req.payload, chunks, req.vector_name)
+
+    try:
+        stats = run_pipeline(
+            todo,
+            embed=embed_via_service,
+            upsert=qdrant_upserter(req.collection),
+            make_point=make_point,
+            batch_size=req.embed_batch_size,
+            queue_batches=req.queue_batches,
+        )
+        deleted: list[str] = []
+        if req.previous_manifest is not None:
+            deleted = removed_point_ids(document_id, req.previous_manifest.chunks, extracted["manifest"]["chunks"])
+            try:
+                qdrant_delete(req.collection, deleted)
+            except Exception as exc:  # noqa: BLE001
+                raise PipelineError("delete", str(exc)) from exc
+    except PipelineError as exc:
+        metrics.observe_failure("ingest", f"{exc.stage}_failed")
+        LOG.warning("ingest failed (%s): %s", req.path, exc)
+        raise HTTPException(status_code=502, detail=f"ingest_failed: {exc}")
+
+    response = {k: v for k, v in extracted.items() if k not in ("markdown", "chunks")}
+    response["ingest"] = {
+        "document_id": document_id,
+        "collection": req.collection,
+        "upserted": len(todo),
+        "skipped_unchanged": len(chunks) - len(todo),
+        "deleted": len(deleted),
+        **stats,
+    }
+    metrics.observe_ingest(stats)
+    return response
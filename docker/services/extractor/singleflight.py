@@ -0,0 +1,64 @@
+"""Coalesce concurrent conversions of the same file.
+
+A UI retry after a client-side timeout, or two sessions importing the
+same shared file, used to start a second full Docling conversion next to
+the first, doubling CPU and memory exactly when the service was already
+busy. Group.do() runs one call per key; callers arriving while it is in
+flight wait for it and get the same result (or the same exception).
+Nothing is cached once the call returns.
+
+The key is the file's identity (resolved path, size, mtime) plus the
+conversion options, so an edited file is never answered with the result
+for its previous contents.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Callable, Hashable
+
+
+def file_key(path: str, *options: Hashable) -> tuple:
+    st = os.stat(path)
+    return (os.path.realpath(path), st.st_size, st.st_mtime_ns, *options)
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class Group:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Run fn() once for `key`; returns (result, shared). `shared` is
+        True for callers that waited on another caller's run."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,113 @@
+"""Tests for the extractor's chunking modes.
+
+Token-mode tests use a tiny whitespace WordLevel tokenizer built in
+memory, so they run without the baked e5 tokenizer.
+"""
+import pytest
+from tokenizers import Tokenizer, models, pre_tokenizers
+
+import chunking
+
+
+@pytest.fixture
+def word_tokenizer():
+    tok = Tokenizer(models.WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    tok.pre_tokenizer = pre_tokenizers.Whitespace()
+    return tok
+
+
+def test_character_window_keeps_schema():
+    chunks = chunking.character_window_chunks("x" * 4000)
+    assert [c["metadata"]["index"] for c in chunks] == list(range(len(chunks)))
+    assert chunks[0]["metadata"]["start"] == 0
+    assert chunks[-1]["metadata"]["end"] == 4000
+    assert all(set(c["metadata"]) == {"index", "start", "end", "token_count"} for c in chunks)
+
+
+def test_token_window_respects_budget(word_tokenizer):
+    text = " ".join(f"w{i}" for i in range(1000))
+    chunks = chunking.token_window_chunks(text, word_tokenizer, budget=100, overlap=10)
+    assert all(c["metadata"]["token_count"] <= 100 for c in chunks)
+    assert all(len(c["text"].split()) <= 100 for c in chunks)
+    assert chunks[0]["metadata"]["start"] == 0
+    assert chunks[-1]["metadata"]["end"] == len(text)
+    # Character offsets must slice the original text exactly.
+    for c in chunks:
+        m = c["metadata"]
+        assert text[m["start"]:m["end"]] == c["text"]
+
+
+def test_token_window_overlaps_neighbours(word_tokenizer):
+    text = " ".join(f"w{i}" for i in range(250))
+    chunks = chunking.token_window_chunks(text, word_tokenizer, budget=100, overlap=10)
+    first, second = chunks[0]["text"].split(), chunks[1]["text"].split()
+    assert first[-10:] == second[:10]
+
+
+def test_token_mode_degrades_without_tokenizer(monkeypatch):
+    monkeypatch.setattr(chunking, "load_tokenizer", lambda: None)
+    assert chunking.resolve_mode("token") == "character"
+    assert chunking.safe_chunks("hello world " * 300, mode="token")
+
+
+def test_chunker_name_reports_the_fallback_used(monkeypatch, word_tokenizer):
+    class Broken:
+        def chunk(self, markdown):
+            raise RuntimeError("boom")
+
+    text = "hello world " * 300
+    monkeypatch.setattr(chunking.CHUNKER, "get", lambda: Broken())
+    chunks, name = chunking.chunk_markdown(text)
+    assert chunks and name == "character-window"
+    monkeypatch.setattr(chunking, "load_tokenizer", lambda: word_tokenizer)
+    monkeypatch.setattr(chunking, "_token_chunker", lambda budget: Broken())
+    chunks, name = chunking.chunk_markdown(text, mode="token", token_budget=100)
+    assert chunks and name == "token-window"
+    monkeypatch.setattr(chunking, "_token_chunker", lambda budget: None)
+    assert chunking.chunk_markdown(text, mode="token", token_budget=100)[1] == "token-window"
+    monkeypatch.setattr(chunking, "load_tokenizer", lambda: None)
+    assert chunking.chunk_markdown(text, mode="token")[1] == "character-window"
+    assert chunking.chunk_markdown("  ", mode="token") == ([], None)
+
+
+def test_unknown_mode_resolves_to_character():
+    assert chunking.resolve_mode("bogus") == "character"
+
+
+def test_empty_markdown_has_no_chunks():
+    assert chunking.safe_chunks("   \n", mode="token") == []
+
+
+def _chunks(*texts):
+    return [{"text": t, "metadata": {"index": i}} for i, t in enumerate(texts)]
+
+
+def test_content_hash_ignores_newline_style():
+    assert chunking.content_hash("a\r\nb") == chunking.content_hash("a\nb")
+    assert chunking.content_hash("a") != chunking.content_hash("b")
+
+
+def test_manifest_is_stable_and_order_sensitive():
+    m1 = chunking.build_manifest(_chunks("alpha", "beta", "gamma"))
+    m2 = chunking.build_manifest(_chunks("alpha", "beta", "gamma"))
+    m3 = chunking.build_manifest(_chunks("beta", "alpha", "gamma"))
+    assert m1 == m2
+    assert m1["root"] != m3["root"]
+    assert len(m1["chunks"]) == 3
+
+
+def test_diff_marks_unchanged_added_and_removed():
+    previous = chunking.build_manifest(_chunks("intro", "body", "outro"))
+    current = _chunks("intro", "body v2", "outro", "appendix")
+    manifest = chunking.build_manifest(current)
+    diff = chunking.diff_against(current, manifest, previous)
+    assert [c["metadata"]["status"] for c in current] == ["unchanged", "added", "unchanged", "added"]
+    assert diff["unchanged"] == 2 and diff["added"] == 2
+    assert diff["removed"] == [chunking.content_hash("body")]
+
+
+def test_diff_counts_duplicate_chunks_once_each():
+    previous = chunking.build_manifest(_chunks("same"))
+    current = _chunks("same", "same")
+    diff = chunking.diff_against(current, chunking.build_manifest(current), previous)
+    assert diff == {"unchanged": 1, "added": 1, "removed": []}
@@ -0,0 +1,78 @@
+"""Tests for lazy component initialisation and the readiness probe."""
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import components
+import conversion
+import server
+
+
+def test_component_builds_once_under_concurrency():
+    calls = []
+
+    def factory():
+        calls.append(threading.get_ident())
+        time.sleep(0.1)
+        return object()
+
+    c = components.Component("model", factory)
+    assert c.status()["state"] == "cold"
+    with ThreadPoolExecutor(4) as pool:
+        values = list(pool.map(lambda _: c.get(), range(4)))
+    assert len(calls) == 1
+    assert all(v is values[0] for v in values)
+    assert c.status()["state"] == "ready"
+    assert c.status()["init_ms"] >= 100
+
+
+def test_failed_component_retries_on_next_get():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("model file missing")
+        return "model"
+
+    c = components.Component("flaky", flaky)
+    with pytest.raises(OSError):
+        c.get()
+    assert c.status()["state"] == "failed"
+    assert "model file missing" in c.status()["error"]
+    assert c.get() == "model"
+    assert c.status()["error"] is None
+
+
+def test_server_import_loads_no_models():
+    # Importing the server must stay cheap: Docling is only imported by
+    # warm-up or the first conversion that needs it.
+    code = "import sys, server; assert 'docling.document_converter' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent.parent, check=True)
+
+
+def test_ready_reports_warming_then_ready(monkeypatch):
+    client = TestClient(server.app)
+    monkeypatch.setattr(server, "WORKERS", None)
+    monkeypatch.setattr(server, "WARMUP", {"state": "pending", "duration_ms": None})
+    assert client.get("/v1/health").status_code == 200
+    r = client.get("/v1/ready")
+    assert r.status_code == 503
+    assert r.json()["status"] == "warming"
+
+    monkeypatch.setattr(conversion.DOCLING, "_factory", lambda: object())
+    monkeypatch.setattr(conversion.DOCLING, "state", "cold")
+    server._warm_up()
+    r = client.get("/v1/ready")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["status"] == "ready"
+    assert body["components"]["docling_converter"]["init_ms"] is not None
+    assert body["warmup"]["duration_ms"] is not None
+    assert 'extractor_component_init_seconds_count{component="docling_converter"}' in client.get("/v1/metrics").text
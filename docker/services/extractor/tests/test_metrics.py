@@ -0,0 +1,65 @@
+"""Tests for per-stage timings and GET /v1/metrics.
+
+Docling is replaced by a converter whose result carries a `timings`
+mapping shaped like Docling's profiling output.
+"""
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import conversion
+import server
+
+client = TestClient(server.app)
+
+
+def _timings():
+    return {
+        "layout": SimpleNamespace(times=[0.2, 0.3]),
+        "ocr": SimpleNamespace(times=[0.001, 0.5, 0.002]),
+    }
+
+
+def test_stage_timings_sums_per_key_and_counts_ocr_pages():
+    timings, ocr_pages = conversion.stage_timings(SimpleNamespace(timings=_timings()))
+    assert timings == {"layout": 500, "ocr": 503}
+    assert ocr_pages == 1
+
+
+def test_stage_timings_tolerates_missing_profiling():
+    assert conversion.stage_timings(SimpleNamespace()) == ({}, 0)
+
+
+@pytest.fixture
+def fake_pdf(monkeypatch, tmp_path):
+    doc = SimpleNamespace(name="doc", export_to_markdown=lambda: "Some text.\n\nMore text.", pages=[1, 2, 3])
+    result = SimpleNamespace(document=doc, timings=_timings())
+    monkeypatch.setattr(server, "CONVERTER", SimpleNamespace(convert=lambda p: result))
+    monkeypatch.setattr(server, "WORKERS", None)
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    return str(pdf)
+
+
+def test_extract_meta_reports_stage_timings(fake_pdf):
+    r = client.post("/v1/extract", json={"path": fake_pdf})
+    assert r.status_code == 200
+    meta = r.json()["extractor_meta"]
+    assert {"layout", "ocr", "pipeline_total", "markdown_export", "chunking"} <= set(meta["stage_timings_ms"])
+    assert meta["ocr_pages"] == 1
+    assert r.json()["page_count"] == 3
+    assert meta["pages_per_second"] > 0
+
+
+def test_metrics_endpoint_exposes_extraction_counters(fake_pdf):
+    client.post("/v1/extract", json={"path": fake_pdf})
+    client.post("/v1/extract", json={"path": "/no/such/file.pdf"})
+    r = client.get("/v1/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    assert 'extractor_requests_total{endpoint="extract",outcome="ok"}' in text
+    assert 'extractor_requests_total{endpoint="extract",outcome="not_found"}' in text
+    assert 'extractor_stage_seconds_count{stage="layout"}' in text
+    assert "extractor_ocr_pages_total" in text
@@ -0,0 +1,145 @@
+"""Tests for the fused /v1/ingest pipeline.
+
+Embeddings and Qdrant are local stand-ins: plain callables for
+run_pipeline(), and a stdlib HTTP server for the endpoint test. Docling
+is replaced by a converter returning fixed markdown.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import chunking
+import pipeline
+import server
+
+
+def _chunks(n):
+    chunks = [{"text": f"chunk {i}", "metadata": {"index": i}} for i in range(n)]
+    chunking.build_manifest(chunks)
+    return chunks
+
+
+def _fake_embed(texts):
+    return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_run_pipeline_upserts_every_chunk_in_batches():
+    chunks = _chunks(10)
+    batches = []
+    make_point = pipeline.make_point_factory("doc", {"lib": "x"}, chunks)
+    stats = pipeline.run_pipeline(chunks, _fake_embed, batches.append, make_point, batch_size=4)
+    assert [len(b) for b in batches] == [4, 4, 2]
+    points = [p for b in batches for p in b]
+    assert [p["payload"]["chunk_index"] for p in points] == list(range(10))
+    assert points[0]["payload"]["lib"] == "x"
+    assert stats["stages"]["embed"]["batches"] == 3
+    assert stats["stages"]["upsert"]["items"] == 10
+
+
+def test_run_pipeline_queues_stay_bounded():
+    chunks = _chunks(60)
+
+    def slow_upsert(points):
+        time.sleep(0.01)
+
+    make_point = pipeline.make_point_factory("doc", {}, chunks)
+    stats = pipeline.run_pipeline(chunks, _fake_embed, slow_upsert, make_point, batch_size=2, queue_batches=2)
+    assert stats["stages"]["embed"]["max_queue_depth"] <= 2
+    assert stats["stages"]["chunk"]["max_queue_depth"] <= 4
+
+
+def test_run_pipeline_reports_failing_stage():
+    chunks = _chunks(5)
+
+    def broken_embed(texts):
+        raise RuntimeError("embeddings down")
+
+    upserted = []
+    with pytest.raises(pipeline.PipelineError) as err:
+        pipeline.run_pipeline(chunks, broken_embed, upserted.append, lambda c, v: c, batch_size=2)
+    assert err.value.stage == "embed"
+    assert upserted == []
+
+
+def test_point_ids_are_deterministic_and_removals_match():
+    chunks = _chunks(3) + [{"text": "chunk 0", "metadata": {"index": 3}}]
+    chunking.build_manifest(chunks)
+    make_point = pipeline.make_point_factory("doc", {}, chunks)
+    ids = [make_point(c, [0.0])["id"] for c in chunks]
+    assert len(set(ids)) == 4  # repeated text gets a distinct occurrence id
+    hashes = [c["metadata"]["content_hash"] for c in chunks]
+    # Dropping the repeated chunk orphans exactly its point.
+    assert pipeline.removed_point_ids("doc", hashes, hashes[:3]) == [ids[3]]
+
+
+class _StandIns(BaseHTTPRequestHandler):
+    upserts: list = []
+
+    def _reply(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        return json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+    def do_POST(self):
+        body = self._body()
+        if self.path == "/v1/embed":
+            self._reply({"vectors": _fake_embed(body["texts"])})
+        else:
+            self._reply({"result": {"status": "ok"}})
+
+    def do_PUT(self):
+        _StandIns.upserts.append(self._body()["points"])
+        self._reply({"result": {"status": "completed"}})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_ins(monkeypatch, tmp_path):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _StandIns)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    monkeypatch.setattr(pipeline, "EMBEDDINGS_URL", url)
+    monkeypatch.setattr(pipeline, "QDRANT_URL", url)
+    markdown = "\n\n".join(f"Paragraph {i}. " + "word " * 300 for i in range(8))
+    doc = SimpleNamespace(name="doc", export_to_markdown=lambda: markdown, pages=[1])
+    monkeypatch.setattr(server, "CONVERTER", SimpleNamespace(convert=lambda p: SimpleNamespace(document=doc)))
+    monkeypatch.setattr(server, "WORKERS", None)
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    _StandIns.upserts = []
+    yield str(pdf)
+    httpd.shutdown()
+
+
+def test_ingest_endpoint_streams_into_stand_ins(stand_ins):
+    client = TestClient(server.app)
+    r = client.post("/v1/ingest", json={"path": stand_ins, "collection": "lib", "embed_batch_size": 2})
+    assert r.status_code == 200
+    body = r.json()
+    assert "markdown" not in body and "chunks" not in body
+    upserted = [p for batch in _StandIns.upserts for p in batch]
+    assert len(upserted) == body["ingest"]["upserted"] == body["extractor_meta"]["chunk_count"]
+    assert body["ingest"]["stages"]["upsert"]["batches"] == len(_StandIns.upserts)
+
+    # Re-import with the returned manifest: nothing changed, nothing upserted.
+    _StandIns.upserts = []
+    r = client.post("/v1/ingest", json={
+        "path": stand_ins, "collection": "lib", "previous_manifest": body["manifest"],
+    })
+    again = r.json()["ingest"]
+    assert again["upserted"] == 0 and again["deleted"] == 0
+    assert again["skipped_unchanged"] == body["ingest"]["upserted"]
+    assert _StandIns.upserts == []
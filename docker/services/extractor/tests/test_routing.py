@@ -0,0 +1,214 @@
+"""Tests for per-page fast-path routing.
+
+The PDFs are written by hand (Helvetica text, stroked rules, an inline
+image) so the tests need no PDF authoring library; Docling is replaced
+by a converter that records the page ranges it was asked for.
+"""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import conversion
+import routing
+
+BODY = "This is a line of ordinary body text that goes on for quite a while,"
+
+
+def build_pdf(pages: list[bytes]) -> bytes:
+    objs = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    n = 4
+    for content in pages:
+        kids.append(n)
+        objs[n] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (n + 1)
+        )
+        objs[n + 1] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)
+        n += 2
+    objs[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for i in sorted(objs):
+        offsets[i] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, objs[i])
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % n
+    out += b"".join(b"%010d 00000 n \n" % offsets[i] for i in range(1, n))
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (n, xref)
+    return bytes(out)
+
+
+def text_page(lines: list[str]) -> bytes:
+    shown = b"\n".join(b"(%s) Tj T*" % ln.encode() for ln in lines)
+    return b"BT /F1 11 Tf 14 TL 72 720 Td\n%s\nET" % shown
+
+
+def ruled_page(lines: list[str]) -> bytes:
+    rules = [b"72 %d m 540 %d l S" % (y, y) for y in range(300, 500, 20)]
+    rules += [b"%d 300 m %d 480 l S" % (x, x) for x in (72, 300, 540)]
+    return text_page(lines) + b"\n" + b"\n".join(rules)
+
+
+def image_page(lines: list[str]) -> bytes:
+    return text_page(lines) + b"\nq 400 0 0 300 100 100 cm BI /W 2 /H 2 /CS /G /BPC 8 ID \x00\xff\xff\x00 EI Q"
+
+
+@pytest.fixture
+def mixed_pdf(tmp_path):
+    lines = [BODY] * 12 + ["End of the paragraph."]
+    path = tmp_path / "mixed.pdf"
+    path.write_bytes(build_pdf([
+        text_page(lines), text_page(lines), ruled_page(lines), image_page(lines), b"", text_page(lines),
+    ]))
+    return path
+
+
+def test_classify_tags_each_page_with_its_route(mixed_pdf):
+    routes = routing.classify(mixed_pdf)
+    assert [(r.route, r.reason) for r in routes] == [
+        ("text", "clean_text"),
+        ("text", "clean_text"),
+        ("docling", "ruled_table"),
+        ("docling", "images"),
+        ("docling", "sparse_text"),
+        ("text", "clean_text"),
+    ]
+    assert list(routing.runs(routes)) == [("text", 1, 2), ("docling", 3, 5), ("text", 6, 6)]
+
+
+def test_classify_returns_none_for_unreadable_pdf(tmp_path):
+    bad = tmp_path / "bad.pdf"
+    bad.write_bytes(b"%PDF-1.4")
+    assert routing.classify(bad) is None
+
+
+def test_pdfium_calls_hold_the_pdfium_lock(monkeypatch, mixed_pdf):
+    # pdfium is not thread-safe; Docling uses the same lock.
+    real = routing.pdfium.PdfDocument
+    held = []
+
+    def opened(*args, **kwargs):
+        held.append(routing.pypdfium2_lock.locked())
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(routing.pdfium, "PdfDocument", opened)
+    routing.classify(mixed_pdf)
+    routing.docling_only(mixed_pdf)
+    routing.extract_text_pages(mixed_pdf, 1, 1)
+    routing.pdf_author(mixed_pdf)
+    assert held == [True] * 4
+    assert not routing.pypdfium2_lock.locked()
+
+
+def test_text_to_markdown_rebuilds_paragraphs():
+    text = "\r\n".join([
+        "The first paragraph runs across a couple of",
+        "full-width lines and then ends with a short",
+        "line.",
+        "The second paragraph has a hyphen-",
+        "ated word that the line break split in two.",
+    ])
+    assert routing.text_to_markdown(text) == (
+        "The first paragraph runs across a couple of full-width lines and then ends with a short line."
+        "\n\nThe second paragraph has a hyphenated word that the line break split in two."
+    )
+
+
+def test_text_to_markdown_joins_japanese_lines_without_spaces():
+    text = "\n".join([
+        "このパッセージは日本語の文書から抽出したテキストで、行の途中でパ",
+        "ッセージが折り返されています。英語の Presidio と日本",
+        "語の単語が混ざっています。",
+        "短い段落です。",
+    ])
+    assert routing.text_to_markdown(text) == (
+        "このパッセージは日本語の文書から抽出したテキストで、行の途中でパッセージが折り返されています。"
+        "英語の Presidio と日本語の単語が混ざっています。"
+        "\n\n短い段落です。"
+    )
+
+
+class _RecordingConverter:
+    def __init__(self, delay=0.0):
+        self.ranges = []
+        self.delay = delay
+
+    def convert(self, path, page_range=None):
+        self.ranges.append(page_range)
+        time.sleep(self.delay)
+        doc = SimpleNamespace(name="mixed", export_to_markdown=lambda: "| table | from docling |", pages=[1])
+        return SimpleNamespace(document=doc)
+
+
+def test_convert_file_merges_fast_and_docling_runs_in_page_order(mixed_pdf):
+    converter = _RecordingConverter()
+    out = conversion.convert_file(converter, mixed_pdf)
+    assert converter.ranges == [(3, 5)]
+    parts = out["markdown"].split("\n\n")
+    assert parts[0].startswith(BODY)
+    assert "| table | from docling |" in parts
+    assert parts[-1].endswith("End of the paragraph.")
+    assert out["page_count"] == 6
+    assert [r["route"] for r in out["page_routes"]] == ["text", "text", "docling", "docling", "docling", "text"]
+    assert {"routing", "text_layer", "pipeline_total"} <= set(out["stage_timings_ms"])
+
+
+def test_convert_file_skips_routing_when_disabled(monkeypatch, mixed_pdf):
+    monkeypatch.setattr(routing, "FAST_PATH", False)
+    converter = _RecordingConverter()
+    out = conversion.convert_file(converter, mixed_pdf)
+    assert converter.ranges == [None]
+    assert "page_routes" not in out
+
+
+def test_parse_page_ranges():
+    assert routing.parse_page_ranges("1-3, 7,10-") == [(1, 3), (7, 7), (10, 10**9)]
+    for bad in ("", "0", "5-2", "a-b"):
+        with pytest.raises(ValueError):
+            routing.parse_page_ranges(bad)
+
+
+def test_runs_split_on_page_gaps_and_length_caps(mixed_pdf):
+    routes = routing.select(routing.classify(mixed_pdf), [(1, 1), (3, 6)])
+    assert list(routing.runs(routes)) == [("text", 1, 1), ("docling", 3, 5), ("text", 6, 6)]
+    assert list(routing.runs(routes, max_len={"docling": 2})) == [
+        ("text", 1, 1), ("docling", 3, 4), ("docling", 5, 5), ("text", 6, 6),
+    ]
+
+
+def test_convert_file_honours_pages_and_max_pages(mixed_pdf):
+    converter = _RecordingConverter()
+    out = conversion.convert_file(converter, mixed_pdf, pages=[(2, 4)], max_pages=2)
+    assert converter.ranges == [(3, 3)]
+    assert [r["page"] for r in out["page_routes"]] == [2, 3]
+    assert out["page_count"] == 6
+    assert out["truncated"] is True
+    assert out["truncated_reason"] == "max_pages"
+
+
+def test_convert_file_stops_when_time_budget_is_spent(mixed_pdf):
+    converter = _RecordingConverter(delay=0.3)
+    out = conversion.convert_file(converter, mixed_pdf, pages=[(3, 6)], time_budget_ms=200)
+    # The first Docling batch (pages 3-4) always runs; it blows the budget.
+    assert converter.ranges == [(3, 4)]
+    assert out["pages_converted"] == 2
+    assert out["truncated_reason"] == "time_budget"
+
+
+def test_extract_endpoint_marks_partial_results(monkeypatch, mixed_pdf):
+    from fastapi.testclient import TestClient
+
+    import server
+
+    monkeypatch.setattr(server, "CONVERTER", _RecordingConverter())
+    monkeypatch.setattr(server, "WORKERS", None)
+    body = TestClient(server.app).post("/v1/extract", json={"path": str(mixed_pdf), "max_pages": 1}).json()
+    assert body["truncated"] is True
+    assert body["page_count"] == 6
+    assert body["extractor_meta"]["pages_converted"] == 1
+    assert body["extractor_meta"]["truncated_reason"] == "max_pages"
@@ -9,6 +9,7 @@ without raising at import time.
 """
 from fastapi.testclient import TestClient
 
+from chunking import MAX_CHUNK_TOKENS
 from server import app
 
 client = TestClient(app)
@@ -40,3 +41,42 @@ def test_extract_request_schema_rejects_extra_required_fields():
     # path is the only required field; format/ocr/language_hint default
     r = client.post("/v1/extract", json={})
     assert r.status_code == 422
+
+
+def test_info_reports_chunking_defaults():
+    body = client.get("/v1/info").json()
+    assert body["chunking"]["default_mode"] in ("character", "token")
+    assert body["chunking"]["token_budget"] > 0
+
+
+def test_extract_rejects_unknown_chunk_mode():
+    r = client.post("/v1/extract", json={"path": "/no/such/file.pdf", "chunk_mode": "words"})
+    assert r.status_code == 422
+
+
+def test_extract_rejects_chunk_tokens_beyond_the_embedder_window():
+    r = client.post("/v1/extract", json={"path": "/no/such/file.pdf", "chunk_tokens": MAX_CHUNK_TOKENS + 1})
+    assert r.status_code == 422
+
+
+def test_extract_rejects_malformed_previous_manifest():
+    r = client.post("/v1/extract", json={"path": "/no/such/file.pdf", "previous_manifest": {"chunks": []}})
+    assert r.status_code == 422
+
+
+def test_extract_rejects_malformed_page_spec():
+    r = client.post("/v1/extract", json={"path": "/no/such/file.pdf", "pages": "5-2"})
+    assert r.status_code == 422
+
+
+def test_extract_rejects_partial_extraction_of_non_pdf(tmp_path):
+    doc = tmp_path / "notes.docx"
+    doc.write_bytes(b"not converted")
+    for option in ({"pages": "1-2"}, {"max_pages": 1}, {"time_budget_ms": 500}):
+        r = client.post("/v1/extract", json={"path": str(doc), **option})
+        assert r.status_code == 422, option
+
+
+def test_ingest_rejects_partial_extraction():
+    r = client.post("/v1/ingest", json={"path": "/no/such/file.pdf", "collection": "lib", "max_pages": 3})
+    assert r.status_code == 422
@@ -0,0 +1,85 @@
+"""Tests for coalescing concurrent conversions of the same file."""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+import singleflight
+
+
+def test_concurrent_callers_share_one_run():
+    group = singleflight.Group()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"markdown": "x"}
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: group.do("k", slow), range(4)))
+    assert len(calls) == 1
+    assert [shared for _, shared in results].count(False) == 1
+    assert all(r is results[0][0] for r, _ in results)
+    assert group.in_flight() == 0
+
+
+def test_waiters_get_the_leaders_exception():
+    group = singleflight.Group()
+    started = threading.Event()
+
+    def boom():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("bad pdf")
+
+    with ThreadPoolExecutor(2) as pool:
+        first = pool.submit(group.do, "k", boom)
+        started.wait()
+        second = pool.submit(group.do, "k", boom)
+        for fut in (first, second):
+            with pytest.raises(RuntimeError, match="bad pdf"):
+                fut.result()
+
+
+def test_nothing_is_cached_after_the_call():
+    group = singleflight.Group()
+    assert group.do("k", lambda: 1) == (1, False)
+    assert group.do("k", lambda: 2) == (2, False)
+
+
+def test_file_key_changes_when_the_file_does(tmp_path):
+    f = tmp_path / "a.pdf"
+    f.write_bytes(b"one")
+    before = singleflight.file_key(str(f), "auto")
+    assert singleflight.file_key(str(f), "auto") == before
+    assert singleflight.file_key(str(f), "always") != before
+    f.write_bytes(b"two!")
+    os.utime(f, ns=(1, 1))
+    assert singleflight.file_key(str(f), "auto") != before
+
+
+def test_concurrent_extract_requests_convert_once(monkeypatch, tmp_path):
+    calls = []
+
+    def convert(path):
+        calls.append(path)
+        time.sleep(0.3)
+        doc = SimpleNamespace(name="doc", export_to_markdown=lambda: "Some text.", pages=[1])
+        return SimpleNamespace(document=doc)
+
+    monkeypatch.setattr(server, "CONVERTER", SimpleNamespace(convert=convert))
+    monkeypatch.setattr(server, "WORKERS", None)
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    client = TestClient(server.app)
+    with ThreadPoolExecutor(2) as pool:
+        bodies = list(pool.map(lambda _: client.post("/v1/extract", json={"path": str(pdf)}).json(), range(2)))
+    assert len(calls) == 1
+    assert sorted(b["extractor_meta"]["coalesced"] for b in bodies) == [False, True]
+    assert bodies[0]["manifest"] == bodies[1]["manifest"]
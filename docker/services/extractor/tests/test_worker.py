@@ -0,0 +1,139 @@
+"""Tests for the supervised conversion workers.
+
+The jobs below stand in for Docling: they run in real spawned child
+processes, which import them from this module by name.
+"""
+import os
+import time
+
+import pytest
+
+from worker import Worker, WorkerError
+
+TARGET = __name__
+
+
+def echo(path):
+    return {"path": path, "pid": os.getpid()}
+
+
+def boom(path):
+    raise ValueError(f"cannot parse {path}")
+
+
+def hog(path):
+    blocks = []
+    for _ in range(40):
+        blocks.append(bytearray(32 * 1024 * 1024))
+        time.sleep(0.05)
+    return len(blocks)
+
+
+def sleepy(path):
+    time.sleep(30)
+
+
+def crash(path):
+    os._exit(3)
+
+
+def warmup():
+    time.sleep(0.2)
+    return {"fake_model": {"state": "ready", "init_ms": 200, "error": None}}
+
+
+@pytest.fixture
+def make_worker():
+    workers = []
+
+    def make(func, **kwargs):
+        w = Worker(target=f"{TARGET}:{func}", **kwargs)
+        workers.append(w)
+        return w
+
+    yield make
+    for w in workers:
+        w.stop()
+
+
+def test_runs_job_and_reports_peak_rss(make_worker):
+    w = make_worker("echo")
+    out, stats = w.run("/tmp/a.pdf")
+    assert out["path"] == "/tmp/a.pdf"
+    assert out["pid"] != os.getpid()
+    assert stats["peak_rss_mb"] > 0
+    assert stats["worker_jobs"] == 1
+
+
+def test_job_exception_keeps_worker(make_worker):
+    w = make_worker("boom")
+    with pytest.raises(WorkerError) as err:
+        w.run("/tmp/b.pdf")
+    assert err.value.kind == "extraction_failed"
+    assert "cannot parse" in str(err.value)
+    assert w.pid is not None
+
+
+def test_memory_ceiling_kills_and_recycles(make_worker):
+    w = make_worker("hog", rss_limit_mb=300)
+    with pytest.raises(WorkerError) as err:
+        w.run("/tmp/huge.pdf")
+    assert err.value.kind == "memory_limit_exceeded"
+    assert err.value.as_detail("/tmp/huge.pdf")["peak_rss_mb"] > 300
+    assert w.pid is None  # replaced lazily on the next job
+
+
+def test_timeout_kills_worker(make_worker):
+    w = make_worker("sleepy", timeout_s=1)
+    with pytest.raises(WorkerError) as err:
+        w.run("/tmp/slow.pdf")
+    assert err.value.kind == "timeout"
+    assert w.pid is None
+
+
+def test_crash_is_reported_and_next_job_gets_fresh_worker(make_worker):
+    w = make_worker("crash")
+    with pytest.raises(WorkerError) as err:
+        w.run("/tmp/c.pdf")
+    assert err.value.kind == "worker_crashed"
+    w.target = f"{TARGET}:echo"
+    out, stats = w.run("/tmp/d.pdf")
+    assert stats["worker_generation"] == 2
+
+
+def test_recycles_after_max_jobs(make_worker):
+    w = make_worker("echo", max_jobs=2)
+    first, _ = w.run("/tmp/1.pdf")
+    second, _ = w.run("/tmp/2.pdf")
+    third, stats = w.run("/tmp/3.pdf")
+    assert first["pid"] == second["pid"] != third["pid"]
+    assert stats["worker_generation"] == 2
+
+
+def test_warm_entry_runs_before_first_job(make_worker):
+    w = make_worker("echo", warm=f"{TARGET}:warmup")
+    _, stats = w.run("/tmp/1.pdf")
+    assert stats["worker_cold_start_ms"] >= 200
+    assert w.describe()["components"]["fake_model"]["state"] == "ready"
+    _, stats = w.run("/tmp/2.pdf")
+    assert stats["worker_cold_start_ms"] is None
+
+
+def test_extract_returns_structured_error_for_offending_file(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+
+    import server
+    from worker import WorkerPool
+
+    pool = WorkerPool(size=1, target=f"{TARGET}:crash")
+    monkeypatch.setattr(server, "WORKERS", pool)
+    pdf = tmp_path / "bad.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    try:
+        r = TestClient(server.app).post("/v1/extract", json={"path": str(pdf)})
+    finally:
+        pool.shutdown()
+    assert r.status_code == 500
+    detail = r.json()["detail"]
+    assert detail["error"] == "worker_crashed"
+    assert detail["path"] == str(pdf)
@@ -0,0 +1,318 @@
+"""Supervised child processes for Docling conversions.
+
+Docling and the OCR models grow in RSS over many conversions, and one
+pathological PDF can take the whole container down with it. Each
+conversion therefore runs in a worker process the server watches:
+
+  - RSS above `rss_limit_mb` while a job runs → the worker is killed
+    and the job fails with `memory_limit_exceeded`
+  - a job running past `timeout_s` → killed, `timeout`
+  - the worker dying on its own (kernel OOM killer, segfault in a
+    native lib) → `worker_crashed`
+  - after `max_jobs` jobs, or when the idle RSS after a job is above
+    `recycle_rss_mb`, the worker is replaced before the next job
+
+Killed or retired workers are respawned lazily on the next job. The
+child builds its own converter, so the server process never loads the
+Docling models in this mode. With a `warm` entry point the child runs it
+right after spawning (building the converter) and reports the
+per-component init times before it takes a job, so model load time is
+neither charged to the job's timeout nor hidden from /v1/info.
+
+Peak RSS per job comes from the kernel high-water mark (VmHWM, reset
+before each job via /proc/self/clear_refs) combined with the parent's
+own samples, so it is per job rather than per process lifetime.
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from typing import Any
+
+LOG = logging.getLogger("extractor.worker")
+
+ISOLATION = os.environ.get("EXTRACTOR_WORKER_ISOLATION", "1") not in ("0", "false", "no")
+POOL_SIZE = int(os.environ.get("EXTRACTOR_WORKERS", "1"))
+RSS_LIMIT_MB = int(os.environ.get("EXTRACTOR_WORKER_RSS_LIMIT_MB", "6144"))
+RECYCLE_RSS_MB = int(os.environ.get("EXTRACTOR_WORKER_RECYCLE_RSS_MB", str(RSS_LIMIT_MB * 3 // 4)))
+# Below the Ruby client's 600s read timeout, so the caller gets the
+# structured error instead of a dropped connection.
+TIMEOUT_S = float(os.environ.get("EXTRACTOR_WORKER_TIMEOUT_S", "540"))
+MAX_JOBS = int(os.environ.get("EXTRACTOR_WORKER_MAX_JOBS", "25"))
+
+DEFAULT_TARGET = "conversion:convert_path"
+DEFAULT_WARM = "conversion:warm"
+_POLL_S = 0.1
+
+
+def _read_status_kb(pid: int | str, field: str) -> int | None:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def rss_mb(pid: int | str = "self") -> float | None:
+    kb = _read_status_kb(pid, "VmRSS")
+    return round(kb / 1024, 1) if kb is not None else None
+
+
+def reset_peak_rss() -> None:
+    """Reset this process's VmHWM (Linux >= 4.0); silently a no-op elsewhere."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float | None:
+    kb = _read_status_kb("self", "VmHWM")
+    if kb is None:
+        try:
+            import resource
+            kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except (ImportError, OSError):
+            return None
+    return round(kb / 1024, 1)
+
+
+class WorkerError(Exception):
+    """A job failed inside, or because of, its worker process."""
+
+    def __init__(self, kind: str, message: str, peak_rss_mb: float | None = None):
+        super().__init__(message)
+        self.kind = kind
+        self.peak_rss_mb = peak_rss_mb
+
+    def as_detail(self, path: str) -> dict[str, Any]:
+        return {
+            "error": self.kind,
+            "path": path,
+            "message": str(self),
+            "peak_rss_mb": self.peak_rss_mb,
+        }
+
+
+def _resolve(target: str) -> Any:
+    module_name, func_name = target.split(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _child_main(conn: Any, target: str, warm: str | None = None) -> None:
+    if warm:
+        try:
+            conn.send(("warm", _resolve(warm)(), peak_rss_mb()))
+        except Exception as exc:  # noqa: BLE001
+            conn.send(("warm_error", f"{type(exc).__name__}: {exc}", peak_rss_mb()))
+    func = _resolve(target)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        path, options = job
+        reset_peak_rss()
+        try:
+            out = func(path, **options)
+            conn.send(("ok", out, peak_rss_mb()))
+        except Exception as exc:  # noqa: BLE001
+            conn.send(("error", f"{type(exc).__name__}: {exc}", peak_rss_mb()))
+
+
+class Worker:
+    """One supervised child process running `target` ("module:function")."""
+
+    def __init__(
+        self,
+        target: str = DEFAULT_TARGET,
+        rss_limit_mb: int = RSS_LIMIT_MB,
+        recycle_rss_mb: int = RECYCLE_RSS_MB,
+        timeout_s: float = TIMEOUT_S,
+        max_jobs: int = MAX_JOBS,
+        warm: str | None = None,
+    ):
+        self.target = target
+        self.warm = warm
+        self.rss_limit_mb = rss_limit_mb
+        self.recycle_rss_mb = recycle_rss_mb
+        self.timeout_s = timeout_s
+        self.max_jobs = max_jobs
+        self._ctx = multiprocessing.get_context("spawn")
+        self._proc = None
+        self._conn = None
+        self.jobs = 0
+        self.generation = 0
+        self.init_ms: int | None = None
+        self.init_status: Any = None
+
+    @property
+    def pid(self) -> int | None:
+        return self._proc.pid if self._proc is not None else None
+
+    def _start(self) -> None:
+        parent, child = self._ctx.Pipe()
+        self._proc = self._ctx.Process(
+            target=_child_main, args=(child, self.target, self.warm), name="extractor-worker", daemon=True,
+        )
+        self._proc.start()
+        child.close()
+        self._conn = parent
+        self.jobs = 0
+        self.generation += 1
+        LOG.info("worker %d started (generation %d)", self._proc.pid, self.generation)
+        if self.warm:
+            self._await_warm()
+
+    def _await_warm(self) -> None:
+        started = time.monotonic()
+        while not self._conn.poll(_POLL_S):
+            if not self._proc.is_alive():
+                code = self._proc.exitcode
+                self.stop("dead")
+                raise WorkerError("worker_crashed", f"worker exited with code {code} during warm-up")
+            if time.monotonic() - started > self.timeout_s:
+                self.stop("timeout")
+                raise WorkerError("timeout", f"worker warm-up exceeded {self.timeout_s:.0f}s")
+        status, payload, _ = self._conn.recv()
+        self.init_ms = int((time.monotonic() - started) * 1000)
+        self.init_status = payload
+        if status == "warm_error":
+            LOG.warning("worker %d warm-up failed: %s", self._proc.pid, payload)
+        else:
+            LOG.info("worker %d warm in %d ms", self._proc.pid, self.init_ms)
+
+    def ensure_started(self) -> bool:
+        """Start (and warm) the worker unless it is running. True if it
+        had to start."""
+        if self._proc is not None and self._proc.is_alive():
+            return False
+        if self._proc is not None:
+            self.stop("dead")
+        self._start()
+        return True
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "pid": self.pid,
+            "generation": self.generation,
+            "jobs": self.jobs,
+            "init_ms": self.init_ms,
+            "components": self.init_status,
+        }
+
+    def stop(self, reason: str = "shutdown") -> None:
+        if self._proc is None:
+            return
+        LOG.info("worker %d stopping: %s", self._proc.pid, reason)
+        try:
+            if self._proc.is_alive() and reason in ("shutdown", "max_jobs", "recycle_rss"):
+                self._conn.send(None)
+                self._proc.join(timeout=5)
+        except (OSError, BrokenPipeError):
+            pass
+        if self._proc.is_alive():
+            self._proc.kill()
+            self._proc.join(timeout=5)
+        self._conn.close()
+        self._proc = None
+        self._conn = None
+
+    def run(self, path: str, options: dict[str, Any] | None = None) -> tuple[Any, dict[str, Any]]:
+        """Run one job, target(path, **options). Returns (result, stats);
+        raises WorkerError."""
+        cold = self.ensure_started()
+        started = time.monotonic()
+        sampled_peak = 0.0
+        self._conn.send((path, options or {}))
+        while True:
+            if self._conn.poll(_POLL_S):
+                try:
+                    status, payload, child_peak = self._conn.recv()
+                except EOFError:
+                    status, payload, child_peak = None, None, None
+                if status is not None:
+                    break
+            elapsed = time.monotonic() - started
+            rss = rss_mb(self._proc.pid)
+            if rss is not None:
+                sampled_peak = max(sampled_peak, rss)
+            if rss is not None and rss > self.rss_limit_mb:
+                self.stop("rss_limit")
+                raise WorkerError(
+                    "memory_limit_exceeded",
+                    f"worker RSS {rss:.0f} MB exceeded limit {self.rss_limit_mb} MB",
+                    sampled_peak,
+                )
+            if elapsed > self.timeout_s:
+                self.stop("timeout")
+                raise WorkerError("timeout", f"conversion exceeded {self.timeout_s:.0f}s", sampled_peak or None)
+            if not self._proc.is_alive():
+                code = self._proc.exitcode
+                self.stop("dead")
+                raise WorkerError("worker_crashed", f"worker exited with code {code}", sampled_peak or None)
+
+        peak = max(sampled_peak, child_peak or 0.0) or None
+        self.jobs += 1
+        stats = {
+            "peak_rss_mb": peak,
+            "worker_pid": self._proc.pid,
+            "worker_generation": self.generation,
+            "worker_jobs": self.jobs,
+            # Spawn + warm-up this job waited for, if it found no live worker.
+            "worker_cold_start_ms": self.init_ms if cold else None,
+        }
+        idle_rss = rss_mb(self._proc.pid)
+        if self.jobs >= self.max_jobs:
+            self.stop("max_jobs")
+        elif idle_rss is not None and idle_rss > self.recycle_rss_mb:
+            self.stop("recycle_rss")
+        if status == "error":
+            raise WorkerError("extraction_failed", payload, peak)
+        return payload, stats
+
+
+class WorkerPool:
+    """Fixed set of workers; a job waits for a free one."""
+
+    def __init__(self, size: int = POOL_SIZE, **worker_kwargs: Any):
+        self.workers = [Worker(**worker_kwargs) for _ in range(max(1, size))]
+        self._idle: queue.Queue = queue.Queue()
+        for w in self.workers:
+            self._idle.put(w)
+
+    def run(self, path: str, options: dict[str, Any] | None = None) -> tuple[Any, dict[str, Any]]:
+        worker = self._idle.get()
+        try:
+            return worker.run(path, options)
+        finally:
+            self._idle.put(worker)
+
+    def warm(self) -> list[dict[str, Any]]:
+        """Start every worker now instead of on its first job."""
+        for _ in self.workers:
+            worker = self._idle.get()
+            try:
+                worker.ensure_started()
+            except WorkerError as exc:
+                LOG.warning("worker warm-up failed: %s", exc)
+            finally:
+                self._idle.put(worker)
+        return self.describe()
+
+    def describe(self) -> list[dict[str, Any]]:
+        return [w.describe() for w in self.workers]
+
+    def shutdown(self) -> None:
+        for w in self.workers:
+            w.stop()
@@ -0,0 +1,91 @@
+"""Admission control for analysis requests.
+
+The analyze handlers used to be plain `def` endpoints, run on Starlette's
+shared thread pool of 40: a burst of slow analyses took every thread, so
+health checks and restores queued behind them, and nothing ever refused
+work, so latency grew without bound under load.
+
+Analysis now runs on its own small executor (spaCy and the regexes hold
+the GIL, so more threads add queueing, not throughput). At most
+`max_in_flight` requests may be running or waiting for it; beyond that a
+request is refused at once with Overloaded, which the server turns into
+429 with a Retry-After estimated from recent service times.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# Weight of the newest service time in the moving average.
+EWMA_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"too many requests in flight, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Admission:
+    def __init__(self, threads: int, max_in_flight: int) -> None:
+        self.threads = max(1, threads)
+        self.max_in_flight = max(self.threads, max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="analysis")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._service_s = 0.0
+        self.rejected = 0
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead of a new request has drained,
+        at the recent mean service time; at least 1."""
+        return max(1, math.ceil(self._service_s * self._in_flight / self.threads))
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """fn(*args) on the analysis executor; Overloaded when
+        `max_in_flight` calls are already running or queued."""
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                self.rejected += 1
+                raise Overloaded(self.retry_after())
+            self._in_flight += 1
+        try:
+            # In the caller's context, like asyncio.to_thread (profiling.py).
+            future = self._executor.submit(contextvars.copy_context().run, self._timed, fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the work finishes or is cancelled before it
+        # starts, not when the awaiting request goes away.
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future: Any = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _timed(self, fn: Callable[..., Any], *args: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._service_s += EWMA_ALPHA * (elapsed - self._service_s)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "threads": self.threads,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "rejected": self.rejected,
+            "mean_service_ms": round(self._service_s * 1000, 2),
+        }
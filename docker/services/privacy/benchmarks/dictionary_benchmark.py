@@ -0,0 +1,108 @@
+"""Dictionary recognizer build and scan cost for a large term list.
+
+Generates a synthetic list of person names, project codenames, hostnames
+and Japanese names, builds a Dictionary over it and scans a chat-style
+text of about --chars characters. --compare-regex also times Presidio's
+deny_list (one regex alternation) on the same terms; it takes tens of
+seconds at 100k terms.
+
+  python benchmarks/dictionary_benchmark.py
+  python benchmarks/dictionary_benchmark.py --terms 10000 --compare-regex
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+
+from dictionary_recognizer import Dictionary  # noqa: E402
+from registry_setup import _rss_bytes  # noqa: E402
+
+FIRST = ["John", "Maria", "Wei", "Aisha", "Olga", "Kenji", "Priya", "Lucas", "Fatima", "Noah"]
+LAST = ["Smith", "Garcia", "Chen", "Khan", "Ivanova", "Sato", "Patel", "Silva", "Haddad", "Berg"]
+WORDS = ["amber", "falcon", "granite", "harbor", "juniper", "lantern", "meadow", "orbit", "quartz", "tundra"]
+JA_LAST = ["山田", "佐藤", "鈴木", "高橋", "田中", "伊藤", "渡辺", "中村"]
+JA_FIRST = ["太郎", "花子", "健", "美咲", "翔", "陽菜", "大輔", "さくら"]
+FILLER = [
+    "Can you check whether the deploy finished?",
+    "I moved the meeting to Thursday afternoon.",
+    "The logs look clean after the restart.",
+    "明日の打ち合わせは十時からです。",
+    "Let me know if anything else breaks.",
+]
+
+
+def terms(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        kind = i % 4
+        if kind == 0:
+            out.append(f"{rng.choice(FIRST)} {rng.choice(LAST)}{i}")
+        elif kind == 1:
+            out.append(f"Project {rng.choice(WORDS).title()} {i}")
+        elif kind == 2:
+            out.append(f"{rng.choice(WORDS)}-{i}.corp.example.com")
+        else:
+            out.append(f"{rng.choice(JA_LAST)}{rng.choice(JA_FIRST)}{i}")
+    return out
+
+
+def text(chars: int, vocabulary: list[str], seed: int = 1) -> str:
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < chars:
+        part = rng.choice(FILLER) if rng.random() < 0.8 else f"Ping {rng.choice(vocabulary)} about it."
+        parts.append(part)
+        size += len(part) + 1
+    return " ".join(parts)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--terms", type=int, default=100_000)
+    parser.add_argument("--chars", type=int, default=80_000)
+    parser.add_argument("--compare-regex", action="store_true")
+    args = parser.parse_args()
+
+    vocabulary = terms(args.terms)
+    sample = text(args.chars, vocabulary)
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        (base / "terms.txt").write_text("\n".join(vocabulary), encoding="utf-8")
+        spec = {"name": "BenchRecognizer", "supported_entity": "PERSON", "terms_file": "terms.txt"}
+        rss = _rss_bytes()
+        started = time.perf_counter()
+        dictionary = Dictionary(base / "bench.yaml", spec)
+        build_s = time.perf_counter() - started
+        grown = (_rss_bytes() - rss) / 2**20
+
+    dictionary.find(sample[:1000])
+    started = time.perf_counter()
+    hits = dictionary.find(sample)
+    scan_s = time.perf_counter() - started
+    print(f"automaton  {dictionary.size} terms  build {build_s:6.2f} s  +{grown:.0f} MB RSS")
+    print(f"automaton  scan {len(sample)} chars  {scan_s * 1000:8.1f} ms  {len(hits)} hits")
+
+    if args.compare_regex:
+        from presidio_analyzer import PatternRecognizer
+
+        started = time.perf_counter()
+        recognizer = PatternRecognizer(supported_entity="PERSON", deny_list=vocabulary)
+        recognizer.analyze(sample[:100], ["PERSON"])  # compiles the alternation
+        compile_s = time.perf_counter() - started
+        started = time.perf_counter()
+        found = recognizer.analyze(sample, ["PERSON"])
+        scan_s = time.perf_counter() - started
+        print(f"deny_list  compile {compile_s:6.2f} s  scan {scan_s:6.2f} s  {len(found)} hits")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
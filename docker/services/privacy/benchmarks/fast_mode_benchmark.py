@@ -0,0 +1,118 @@
+"""Fast (pattern-only) mode against full analysis.
+
+Anonymizes a templated chat-style corpus, one text per call with the
+span cache off, in both modes and prints per-text latency and, per
+entity type, how many of the full-mode entities fast mode also masked
+(same type and offsets). Full mode is the reference; no gold labels.
+
+  python benchmarks/fast_mode_benchmark.py
+  PRIVACY_LANGS_RUNTIME=en,ja python benchmarks/fast_mode_benchmark.py --languages en,ja
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+os.environ["PRIVACY_SPAN_CACHE"] = "0"
+
+import server  # noqa: E402
+
+EN = [
+    "Hi, this is {name} from {org}. Reach me at {email} or {phone}.",
+    "Please charge card {card} and send the receipt to {email}.",
+    "Wire the deposit to {iban} before {date}, thanks.",
+    "The server at {ip} has been down since {date}; see {url} for details.",
+    "My SSN is {ssn} and I moved to {city} last spring.",
+    "Call {intl_phone} if {name} is not in the office.",
+    "We agreed to revisit the design after the quarterly review in {city}.",
+]
+JA = [
+    "{ja_name}さんの連絡先は{email}、電話は{ja_phone}です。",
+    "〒{ja_postal} 東京都千代田区の{ja_org}までお送りください。",
+    "{date}までにカード{card}でお支払いください。",
+]
+VALUES = {
+    "name": ["John Smith", "Maria Garcia", "Wei Chen"],
+    "org": ["Acme Corp", "Globex", "Initech"],
+    "email": ["john.smith@acme.com", "m.garcia@example.org", "wei@chen.dev"],
+    "phone": ["415-555-0100", "(212) 555-0199", "646.555.0142"],
+    "intl_phone": ["+44 20 7946 0958", "+49 30 901820", "+81 3-1234-5678"],
+    "card": ["4111 1111 1111 1111", "5500 0000 0000 0004", "3400 000000 00009"],
+    "iban": ["DE89370400440532013000", "GB82 WEST 1234 5698 7654 32"],
+    "date": ["2024-05-01", "May 3rd", "next Friday"],
+    "ip": ["10.0.0.12", "192.168.1.20", "2001:db8::1"],
+    "url": ["https://status.example.com/incident/42", "www.acme.com/help"],
+    "ssn": ["078-05-1120", "219-09-9999"],
+    "city": ["Boston", "Lisbon", "Osaka"],
+    "ja_name": ["山田太郎", "佐藤花子"],
+    "ja_org": ["株式会社サンプル", "有限会社テスト"],
+    "ja_phone": ["03-1234-5678", "090-1234-5678"],
+    "ja_postal": ["100-0001", "530-0001"],
+}
+
+
+def corpus(n: int, languages: list[str], seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    templates = EN + (JA if "ja" in languages else [])
+    return [
+        rng.choice(templates).format(**{k: rng.choice(v) for k, v in VALUES.items()})
+        for _ in range(n)
+    ]
+
+
+def run(texts: list[str], languages: list[str], mode: str) -> tuple[list[float], list[list[dict]]]:
+    latencies, entities = [], []
+    for text in texts:
+        req = server.AnonymizeRequest(text=text, languages=languages, options={"mode": mode})
+        started = time.perf_counter()
+        (result,), _, _ = server._mask_all([text], req)
+        latencies.append(time.perf_counter() - started)
+        entities.append(result["entities"])
+    return latencies, entities
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=300)
+    parser.add_argument("--languages", default="en")
+    args = parser.parse_args()
+    languages = args.languages.split(",")
+
+    texts = corpus(args.texts, languages)
+    run(texts[:20], languages, "full")  # warm-up: lazy loads, regex compile
+    run(texts[:20], languages, "fast")
+    full_s, full = run(texts, languages, "full")
+    fast_s, fast = run(texts, languages, "fast")
+
+    for mode, lat in (("full", full_s), ("fast", fast_s)):
+        p95 = sorted(lat)[int(len(lat) * 0.95) - 1]
+        print(f"{mode}  mean {statistics.mean(lat) * 1000:7.2f} ms  p95 {p95 * 1000:7.2f} ms")
+    print(f"speedup {statistics.mean(full_s) / statistics.mean(fast_s):.1f}x")
+
+    reference, found, extra = Counter(), Counter(), Counter()
+    for want, got in zip(full, fast):
+        want_keys = {(e["type"], e["start"], e["end"]) for e in want}
+        got_keys = {(e["type"], e["start"], e["end"]) for e in got}
+        for t, *_ in want_keys:
+            reference[t] += 1
+        for t, *_ in want_keys & got_keys:
+            found[t] += 1
+        for t, *_ in got_keys - want_keys:
+            extra[t] += 1
+    print(f"\n{'type':<16}{'full':>6}{'fast':>6}{'recall':>8}{'fast-only':>11}")
+    for t in sorted(set(reference) | set(extra)):
+        recall = f"{found[t] / reference[t]:.2f}" if reference[t] else "-"
+        print(f"{t:<16}{reference[t]:>6}{found[t]:>6}{recall:>8}{extra[t]:>11}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
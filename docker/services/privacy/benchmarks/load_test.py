@@ -0,0 +1,183 @@
+"""HTTP load test of serve.py with 1, 2 and 4 pre-forked workers.
+
+Starts serve.py on a free port for each worker count (span cache off),
+keeps --concurrency clients posting /v1/anonymize for --duration seconds
+while another client probes /v1/health every 100 ms, and prints
+throughput, latency, how many requests got 429, health-check latency
+under load and the memory of the whole process tree (RSS counts shared
+pages once per process, PSS splits them).
+
+  python benchmarks/load_test.py
+  python benchmarks/load_test.py --workers 1,4 --concurrency 32 --max-in-flight 8
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+SERVE = HERE.parent / "serve.py"
+
+TEMPLATES = [
+    "Hi, this is {name} from Acme. Reach me at {user}@example.com or 415-555-{n4}.",
+    "Please charge card 4111 1111 1111 1111 and send the receipt to {user}@acme.com.",
+    "The server at 10.0.{n1}.{n2} has been down since Monday; see https://status.example.com/{n4}.",
+    "We agreed to revisit the design with {name} after the quarterly review in Boston.",
+]
+NAMES = ["John Smith", "Maria Garcia", "Wei Chen", "Aisha Khan"]
+
+
+def texts(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        rng.choice(TEMPLATES).format(
+            name=rng.choice(NAMES), user=f"user{rng.randrange(10**6)}",
+            n1=rng.randrange(256), n2=rng.randrange(256), n4=f"{rng.randrange(10**4):04d}",
+        )
+        for _ in range(n)
+    ]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _tree(pid: int) -> list[int]:
+    out = [pid]
+    for child in Path(f"/proc/{pid}/task/{pid}/children").read_text().split():
+        out.extend(_tree(int(child)))
+    return out
+
+
+def memory_mb(pid: int) -> tuple[float, float]:
+    """(RSS, PSS) of `pid` and its descendants, in MB."""
+    rss = pss = 0
+    for p in _tree(pid):
+        for line in Path(f"/proc/{p}/smaps_rollup").read_text().splitlines():
+            key, _, value = line.partition(":")
+            if key == "Rss":
+                rss += int(value.split()[0])
+            elif key == "Pss":
+                pss += int(value.split()[0])
+    return rss / 1024, pss / 1024
+
+
+def _request(conn: http.client.HTTPConnection, method: str, path: str, body: dict | None = None) -> int:
+    payload = json.dumps(body).encode() if body is not None else None
+    conn.request(method, path, body=payload, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def _wait_ready(port: int, timeout_s: float = 120) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            if _request(http.client.HTTPConnection("127.0.0.1", port, timeout=2), "GET", "/v1/health") == 200:
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError("server did not become ready")
+
+
+def load(port: int, corpus: list[str], concurrency: int, duration_s: float) -> dict:
+    latencies, health, statuses = [], [], []
+    stop = time.monotonic() + duration_s
+    lock = threading.Lock()
+
+    def client(seed: int) -> None:
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            status = _request(conn, "POST", "/v1/anonymize", {"text": rng.choice(corpus)})
+            elapsed = time.perf_counter() - started
+            with lock:
+                statuses.append(status)
+                if status == 200:
+                    latencies.append(elapsed)
+
+    def prober() -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            _request(conn, "GET", "/v1/health")
+            health.append(time.perf_counter() - started)
+            time.sleep(0.1)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    threads.append(threading.Thread(target=prober))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    health.sort()
+    return {
+        "rps": len(latencies) / duration_s,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "rejected": sum(1 for s in statuses if s == 429),
+        "errors": sum(1 for s in statuses if s not in (200, 429)),
+        "health_p95_ms": health[int(len(health) * 0.95) - 1] * 1000,
+        "health_max_ms": health[-1] * 1000,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    args = parser.parse_args()
+
+    corpus = texts(2000)
+    print(f"{os.cpu_count()} CPUs, {args.concurrency} clients, {args.duration:.0f}s, "
+          f"max in flight {args.max_in_flight} per worker")
+    print(f"{'workers':>7}{'req/s':>8}{'p50 ms':>8}{'p95 ms':>8}{'429':>6}{'errors':>7}"
+          f"{'health p95':>11}{'health max':>11}{'RSS MB':>8}{'PSS MB':>8}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        port = _free_port()
+        env = {
+            **os.environ,
+            "PRIVACY_WORKERS": str(workers),
+            "PRIVACY_PORT": str(port),
+            "PRIVACY_HOST": "127.0.0.1",
+            "PRIVACY_SPAN_CACHE": "0",
+            "PRIVACY_MAX_IN_FLIGHT": str(args.max_in_flight),
+            # Preloaded in every mode, so memory compares like with like.
+            "PRIVACY_PRELOAD_LANGS": "all",
+        }
+        proc = subprocess.Popen(
+            [sys.executable, str(SERVE)], cwd=SERVE.parent, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_ready(port)
+            load(port, corpus[:100], 4, 3)  # warm-up
+            r = load(port, corpus, args.concurrency, args.duration)
+            rss, pss = memory_mb(proc.pid)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+        print(f"{workers:>7}{r['rps']:>8.1f}{r['p50_ms']:>8.1f}{r['p95_ms']:>8.1f}{r['rejected']:>6}"
+              f"{r['errors']:>7}{r['health_p95_ms']:>11.1f}{r['health_max_ms']:>11.1f}{rss:>8.0f}{pss:>8.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
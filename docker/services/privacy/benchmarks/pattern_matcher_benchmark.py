@@ -0,0 +1,91 @@
+"""PatternMatcher against per-recognizer PatternRecognizer.analyze().
+
+Runs every PatternRecognizer registered for the requested languages
+(each once, as the analyzer does with language detection) over three
+corpora: templated chat texts with PII, plain prose without digits, and
+a long document. Prints the best-of-N time per text for both and checks
+they return the same results.
+
+  python benchmarks/pattern_matcher_benchmark.py
+  PRIVACY_LANGS_RUNTIME=en,ja python benchmarks/pattern_matcher_benchmark.py --languages en,ja
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+from presidio_analyzer import PatternRecognizer  # noqa: E402
+
+import server  # noqa: E402
+from fast_mode_benchmark import corpus  # noqa: E402
+from pattern_matcher import PatternMatcher  # noqa: E402
+
+PROSE = (
+    "We agreed to revisit the design after the quarterly review, and the team "
+    "will write up the open questions before the next planning meeting. "
+)
+
+
+def recognizers(languages: list[str]) -> list[PatternRecognizer]:
+    chosen, seen = [], set()
+    for lang in languages:
+        for r in server.analyzer.registry.get_recognizers(language=lang, all_fields=True):
+            if isinstance(r, PatternRecognizer) and r.name not in seen:
+                seen.add(r.name)
+                chosen.append(r)
+    return chosen
+
+
+def per_recognizer(recs, entities, text):
+    return [x for r in recs for x in r.analyze(text=text, entities=entities)]
+
+
+def best_of(fn, texts, repeat: int) -> tuple[float, list]:
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = [fn(t) for t in texts]
+        best = min(best, time.perf_counter() - started)
+    return best / len(texts), out
+
+
+def key(results) -> list:
+    return sorted((r.entity_type, r.start, r.end, r.score) for r in results)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--languages", default="en")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    languages = args.languages.split(",")
+
+    recs = recognizers(languages)
+    matcher = PatternMatcher(recs)
+    entities = matcher.entities
+    chat = corpus(200, languages, seed=1)
+    corpora = {
+        "chat (200 texts)": chat,
+        "prose, no digits (200 texts)": [PROSE * 2] * 200,
+        "document (60k chars)": [" ".join(chat) * 2],
+    }
+    print(f"{len(recs)} recognizers, {len(matcher.patterns)} patterns, {len(matcher.triggers)} triggers")
+    status = 0
+    for name, texts in corpora.items():
+        old_s, old = best_of(lambda t: per_recognizer(recs, entities, t), texts, args.repeat)
+        new_s, new = best_of(lambda t: matcher.analyze(t, entities), texts, args.repeat)
+        same = all(key(a) == key(b) for a, b in zip(old, new))
+        print(f"{name:<30} analyze() {old_s * 1000:8.3f} ms  matcher {new_s * 1000:8.3f} ms"
+              f"  ({old_s / new_s:.1f}x){'' if same else '  MISMATCH'}")
+        status |= not same
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""Benchmark suite: anonymize/deanonymize over synthetic en/ja corpora.
+
+Generates chat transcripts and documents in English and Japanese from
+100 B to 1 MB (UTF-8), each with PII planted at a known density, and
+runs them in-process through the anonymize path (server._mask_all) and
+back through /v1/deanonymize's handler. Per case it reports throughput,
+p50/p95 latency, peak RSS, masked spans, recall of the planted values
+(a value counts only when masked spans cover all of it) overall and per
+type, and whether every text round-tripped.
+
+The span cache is off and long texts are windowed in-process
+(PRIVACY_POOL_WORKERS=0 unless set), so every rep does the full work in
+this process and peak RSS covers it.
+
+  PRIVACY_LANGS_RUNTIME=en,ja python benchmarks/suite.py
+  PRIVACY_LANGS_RUNTIME=en,ja python benchmarks/suite.py --sizes 100,1000 --modes full,fast
+  PRIVACY_LANGS_RUNTIME=en,ja python benchmarks/suite.py --write-baseline benchmarks/baseline.json
+  PRIVACY_LANGS_RUNTIME=en,ja python benchmarks/suite.py --compare benchmarks/baseline.json
+
+--compare exits with 1 when a case is slower or bigger than the baseline
+by more than --tolerance, or when its span counts, recall or round trip
+changed. Timings and RSS only compare on the machine that recorded the
+baseline; span counts and recall compare anywhere, and are what moves
+when Presidio, spaCy or a model is upgraded.
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import importlib.metadata
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+os.environ["PRIVACY_SPAN_CACHE"] = "0"
+os.environ.setdefault("PRIVACY_POOL_WORKERS", "0")
+
+import server  # noqa: E402
+
+SIZES = (100, 1_000, 10_000, 100_000, 1_000_000)
+FIRST = ["John", "Maria", "Wei", "Aisha", "Olga", "Lucas", "Priya", "Noah"]
+LAST = ["Smith", "Garcia", "Chen", "Khan", "Ivanova", "Silva", "Patel", "Berg"]
+JA_LAST = ["山田", "佐藤", "鈴木", "高橋", "田中", "伊藤"]
+JA_FIRST = ["太郎", "花子", "健一", "美咲", "大輔", "陽菜"]
+CARDS = ["4111 1111 1111 1111", "5500 0000 0000 0004", "3400 000000 00009"]
+
+# entity type -> value generator; every value is unique within a text.
+PII = {
+    "en": {
+        "EMAIL_ADDRESS": lambda r, n: f"{r.choice(FIRST).lower()}.{r.choice(LAST).lower()}{n}@example.com",
+        "PHONE_NUMBER": lambda r, n: f"415-555-{n % 10000:04d}",
+        "CREDIT_CARD": lambda r, n: r.choice(CARDS),
+        "IP_ADDRESS": lambda r, n: f"10.{n // 256 % 256}.{n % 256}.{r.randrange(1, 255)}",
+        "URL": lambda r, n: f"https://portal.example.com/tickets/{n}",
+        "PERSON": lambda r, n: f"{r.choice(FIRST)} {r.choice(LAST)}",
+    },
+    "ja": {
+        "EMAIL_ADDRESS": lambda r, n: f"user{n}@example.jp",
+        "PHONE_NUMBER": lambda r, n: f"03-{n // 10000 % 10000:04d}-{n % 10000:04d}",
+        "CREDIT_CARD": lambda r, n: r.choice(CARDS),
+        "POSTAL_CODE": lambda r, n: f"〒{100 + n % 900:03d}-{n % 10000:04d}",
+        "PERSON": lambda r, n: f"{r.choice(JA_LAST)}{r.choice(JA_FIRST)}",
+    },
+}
+# Sentences that carry one planted value ({}) and filler without PII.
+CARRIERS = {
+    "en": [
+        "Please reach out to {} when you get a chance.",
+        "The ticket was filed under {} yesterday.",
+        "I double-checked {} against the old records.",
+        "Can you forward the invoice details to {}?",
+    ],
+    "ja": [
+        "担当は{}ですので、ご確認ください。",
+        "昨日{}の件で連絡がありました。",
+        "念のため{}を控えておいてください。",
+    ],
+}
+FILLER = {
+    "en": [
+        "The deploy finished without errors.",
+        "Let me know if the numbers look off.",
+        "We moved the review to Thursday afternoon.",
+        "I think the second option is cleaner.",
+        "Thanks, that fixed the build on my side.",
+        "The logs look clean after the restart.",
+    ],
+    "ja": [
+        "デプロイはエラーなく完了しました。",
+        "数値に違和感があれば教えてください。",
+        "レビューは木曜の午後に移しました。",
+        "二つ目の案のほうがすっきりしていると思います。",
+        "再起動後のログは問題ありません。",
+    ],
+}
+
+
+def generate(lang: str, kind: str, size: int, density: float, seed: int) -> tuple[str, list[tuple[str, int, int]]]:
+    """A text of at most `size` UTF-8 bytes and its planted (type,
+    start, end) values: one first, then one every 1000/density bytes.
+    kind "chat" is user/assistant lines, "doc" paragraphs."""
+    rng = random.Random(seed)
+    sep = "\n" if kind == "chat" else " "
+    every = 1000 / density
+    parts, planted, used, since, n = [], [], 0, every, 0
+    while True:
+        if since >= every:
+            etype = rng.choice(sorted(PII[lang]))
+            value = PII[lang][etype](rng, seed * 100_000 + n)
+            sentence = rng.choice(CARRIERS[lang]).format(value)
+        else:
+            etype = value = None
+            sentence = rng.choice(FILLER[lang])
+        if kind == "chat":
+            sentence = f"{'user' if len(parts) % 2 == 0 else 'assistant'}: {sentence}"
+        elif parts and rng.random() < 0.2:
+            sentence = "\n\n" + sentence
+        cost = len(sentence.encode()) + (len(sep) if parts else 0)
+        if used + cost > size:
+            break
+        parts.append(sentence)
+        used += cost
+        if value is not None:
+            planted.append((len(parts) - 1, etype, value))
+            since, n = 0, n + 1
+        else:
+            since += cost
+    starts, pos = [], 0
+    for part in parts:
+        starts.append(pos)
+        pos += len(part) + len(sep)
+    out = []
+    for i, etype, value in planted:
+        start = starts[i] + parts[i].index(value)
+        out.append((etype, start, start + len(value)))
+    return sep.join(parts), out
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")  # resets VmHWM
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _p95(values: list[float]) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, -(-len(ordered) * 95 // 100) - 1)]
+
+
+def _covered(entities: list[dict], starts: list[int], start: int, end: int) -> bool:
+    """Whether the masked spans (sorted, never overlapping) cover
+    [start, end); a value masked only in part still leaks."""
+    pos = start
+    for e in entities[max(0, bisect.bisect_right(starts, start) - 1):]:
+        if e["start"] > pos or pos >= end:
+            break
+        pos = max(pos, e["end"])
+    return pos >= end
+
+
+def run_case(lang: str, kind: str, size: int, mode: str, density: float, reps: int) -> dict:
+    texts = [generate(lang, kind, size, density, seed) for seed in range(reps)]
+    _reset_peak_rss()
+    anon, deanon, spans, roundtrip = [], [], [], True
+    planted: dict[str, int] = {}
+    found: dict[str, int] = {}
+    for text, plants in texts:
+        req = server.AnonymizeRequest(text=text, languages=[lang], options={"mode": mode})
+        started = time.perf_counter()
+        (result,), _, state = server._mask_all([text], req)
+        anon.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        restored = server.deanonymize(server.DeanonymizeRequest(text=result["masked_text"], registry=state.registry))
+        deanon.append(time.perf_counter() - started)
+        roundtrip &= restored["restored_text"] == text
+        spans.append(len(result["entities"]))
+        starts = [e["start"] for e in result["entities"]]
+        for etype, start, end in plants:
+            planted[etype] = planted.get(etype, 0) + 1
+            if _covered(result["entities"], starts, start, end):
+                found[etype] = found.get(etype, 0) + 1
+    total_bytes = sum(len(t.encode()) for t, _ in texts)
+    return {
+        "texts": reps,
+        "bytes": total_bytes // reps,
+        "texts_per_s": round(reps / sum(anon), 2),
+        "mb_per_s": round(total_bytes / sum(anon) / 1e6, 3),
+        "anon_p50_ms": round(statistics.median(anon) * 1000, 3),
+        "anon_p95_ms": round(_p95(anon) * 1000, 3),
+        "deanon_p95_ms": round(_p95(deanon) * 1000, 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "spans": sum(spans),
+        "planted": sum(planted.values()),
+        "recall": round(sum(found.values()) / sum(planted.values()), 3) if planted else None,
+        "recall_by_type": {t: round(found.get(t, 0) / n, 3) for t, n in sorted(planted.items())},
+        "roundtrip": roundtrip,
+    }
+
+
+def environment() -> dict:
+    def version(dist: str) -> str | None:
+        try:
+            return importlib.metadata.version(dist)
+        except importlib.metadata.PackageNotFoundError:
+            return None
+
+    engine = server.analyzer.nlp_engine
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "presidio_analyzer": version("presidio-analyzer"),
+        "spacy": version("spacy"),
+        "models": {lang: f"{nlp.meta['name']}-{nlp.meta['version']}" for lang, nlp in engine.nlp.items()},
+    }
+
+
+REGRESSIONS = (  # (field, worse when, relative)
+    ("mb_per_s", "lower", True),
+    ("anon_p95_ms", "higher", True),
+    ("deanon_p95_ms", "higher", True),
+    ("peak_rss_mb", "higher", True),
+)
+
+
+def compare(cases: dict, baseline: dict, tolerance: float) -> list[str]:
+    problems = []
+    for name, now in cases.items():
+        then = baseline["cases"].get(name)
+        if then is None:
+            continue
+        for field, worse, _ in REGRESSIONS:
+            a, b = then[field], now[field]
+            if not a:
+                continue
+            change = (b - a) / a
+            if (worse == "lower" and change < -tolerance) or (worse == "higher" and change > tolerance):
+                problems.append(f"{name}: {field} {a} -> {b} ({change:+.0%})")
+        for field in ("spans", "recall_by_type", "roundtrip"):
+            if then[field] != now[field]:
+                problems.append(f"{name}: {field} {then[field]} -> {now[field]}")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--languages", default=",".join(server.enabled_languages()))
+    parser.add_argument("--kinds", default="chat,doc")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    parser.add_argument("--modes", default="full")
+    parser.add_argument("--density", type=float, default=2.0, help="planted values per 1000 bytes")
+    parser.add_argument("--reps", type=int, default=0, help="texts per case (default: by size)")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--write-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    languages = args.languages.split(",")
+    for lang in languages:  # model loads and pattern compiles are not measured
+        server._mask_all(["warm-up a@b.com"], server.AnonymizeRequest(text="", languages=[lang]))
+    env = environment()
+    print(json.dumps(env))
+    print(f"{'case':<26}{'bytes':>9}{'n':>4}{'MB/s':>8}{'texts/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'de p95':>8}{'RSS MB':>8}{'spans':>7}{'recall':>7}{'rt':>4}")
+    cases = {}
+    for lang in languages:
+        for kind in args.kinds.split(","):
+            for size in map(int, args.sizes.split(",")):
+                for mode in args.modes.split(","):
+                    reps = args.reps or max(3, min(30, 100_000 // size))
+                    name = f"{lang}/{kind}/{size}/{mode}"
+                    r = cases[name] = run_case(lang, kind, size, mode, args.density, reps)
+                    recall = "-" if r["recall"] is None else f"{r['recall']:.2f}"
+                    print(f"{name:<26}{r['bytes']:>9}{r['texts']:>4}{r['mb_per_s']:>8.3f}{r['texts_per_s']:>9.1f}"
+                          f"{r['anon_p50_ms']:>9.2f}{r['anon_p95_ms']:>9.2f}{r['deanon_p95_ms']:>8.2f}"
+                          f"{r['peak_rss_mb']:>8.0f}{r['spans']:>7}{recall:>7}{'ok' if r['roundtrip'] else 'NO':>4}")
+
+    report = {"environment": env, "density": args.density, "cases": cases}
+    for path in (args.output, args.write_baseline):
+        if path:
+            Path(path).write_text(json.dumps(report, indent=1, ensure_ascii=False) + "\n", encoding="utf-8")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if baseline["environment"] != env:
+            print(f"baseline environment differs: {json.dumps(baseline['environment'])}")
+        problems = compare(cases, baseline, args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        print(f"{len(problems)} regressions against {args.compare}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
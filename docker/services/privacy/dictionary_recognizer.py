@@ -0,0 +1,239 @@
+"""Dictionary recognizers: large term lists matched by an automaton.
+
+Presidio's deny_list turns a term list into one regex alternation; with
+100k terms that took 16 s to compile and 26 s to scan 80k characters.
+A dictionary recognizer builds an Aho-Corasick automaton (pyahocorasick)
+over the terms instead, which finds every occurrence in one linear pass.
+
+A dictionary is a YAML file in recognizers/ with `type: dictionary`:
+
+    name: CustomerNameRecognizer
+    type: dictionary
+    supported_entity: PERSON
+    supported_language: all          # or one language code
+    score: 0.85
+    terms_file: customer_names.txt   # one term per line, "#" comments
+    terms: [Initech]                 # optional, merged with the file
+    context: [customer, client]
+
+Text and terms are compared after NFKC (full-width Latin and digits to
+half-width, half-width kana to full-width) and casefolding, so "ＡＣＭＥ",
+"Acme" and "ACME" are one term; offsets are mapped back to the original
+text. An edge of a match that is a letter or digit of a spaced script
+must not touch another such character, so "Ann" does not match inside
+"Annual"; kana, Han and Hangul edges need no boundary.
+
+The YAML and its terms file are checked at most every RELOAD_CHECK_S
+seconds and re-read when their size or mtime changed; the new automaton
+is built aside and swapped in, and a file that fails to load keeps the
+previous terms. Changing the name, entity or language, or adding a new
+dictionary file, needs a restart.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+import ahocorasick
+import yaml
+from presidio_analyzer import AnalysisExplanation, LocalRecognizer, RecognizerResult
+
+from language_detect import CJK, HANGUL, script_of
+
+LOG = logging.getLogger("privacy.dictionary")
+
+RELOAD_CHECK_S = 2.0
+# Half-width (semi-)voiced sound marks: NFKC turns them into combining
+# marks that belong to the kana before them.
+_KANA_MARKS = "ﾞﾟ"
+
+
+def _combines(ch: str) -> bool:
+    return bool(unicodedata.combining(ch)) or ch in _KANA_MARKS
+
+
+def normalize(text: str) -> tuple[str, list[int] | None, list[int] | None]:
+    """(normalized text, start, end): normalized[i] comes from
+    text[start[i]:end[i]]. start and end are None when offsets are
+    unchanged, which is the case for all ASCII text."""
+    if text.isascii():
+        return text.lower(), None, None
+    folded = text.casefold()
+    if len(folded) == len(text) and unicodedata.is_normalized("NFKC", text):
+        return folded, None, None
+    parts, starts, ends = [], [], []
+    i = 0
+    while i < len(text):
+        j = i + 1
+        while j < len(text) and _combines(text[j]):
+            j += 1
+        piece = unicodedata.normalize("NFKC", text[i:j]).casefold()
+        parts.append(piece)
+        starts.extend([i] * len(piece))
+        ends.extend([j] * len(piece))
+        i = j
+    return "".join(parts), starts, ends
+
+
+def _wordlike(ch: str) -> bool:
+    return ch.isalnum() and script_of(ch) not in (CJK, HANGUL)
+
+
+def read_terms(spec: dict, base: Path) -> list[str]:
+    terms = list(spec.get("terms") or [])
+    if spec.get("terms_file"):
+        for line in (base / spec["terms_file"]).read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                terms.append(line)
+    return terms
+
+
+class Dictionary:
+    """The automaton for one dictionary file, shared by its per-language
+    recognizers, rebuilt when the files change."""
+
+    def __init__(self, spec_path: Path, spec: dict) -> None:
+        self.spec_path = spec_path
+        self.terms_path = spec_path.parent / spec["terms_file"] if spec.get("terms_file") else None
+        self._lock = threading.Lock()
+        self._checked = time.monotonic()
+        self._stamp = self._stat()
+        self._build(spec)
+
+    def _stat(self) -> tuple:
+        out = []
+        for path in (self.spec_path, self.terms_path):
+            try:
+                st = path.stat() if path else None
+                out.append((st.st_mtime_ns, st.st_size) if st else None)
+            except OSError:
+                out.append(None)
+        return tuple(out)
+
+    def _build(self, spec: dict) -> None:
+        started = time.perf_counter()
+        automaton = ahocorasick.Automaton()
+        digest = hashlib.blake2b(digest_size=8)
+        count = 0
+        for term in read_terms(spec, self.spec_path.parent):
+            key, _, _ = normalize(term)
+            if not key or key in automaton:
+                continue
+            # (length, boundary needed before, boundary needed after)
+            automaton.add_word(key, (len(key), _wordlike(key[0]), _wordlike(key[-1])))
+            digest.update(key.encode("utf-8", "surrogatepass") + b"\0")
+            count += 1
+        if count:
+            automaton.make_automaton()
+        score = float(spec.get("score", 0.85))
+        digest.update(str(score).encode())
+        # Swapped in together; readers see either the old or the new set.
+        self.automaton, self.score, self.size, self.version = (
+            automaton if count else None, score, count, digest.hexdigest(),
+        )
+        LOG.info("dictionary %s: %d terms in %.2fs", self.spec_path.name, count, time.perf_counter() - started)
+
+    def refresh(self) -> str:
+        """Reload if the files changed (checked at most every
+        RELOAD_CHECK_S); returns the version of the terms in use."""
+        now = time.monotonic()
+        if now - self._checked >= RELOAD_CHECK_S and self._lock.acquire(blocking=False):
+            try:
+                self._checked = now
+                stamp = self._stat()
+                if stamp != self._stamp:
+                    self._stamp = stamp
+                    self._build(yaml.safe_load(self.spec_path.read_text(encoding="utf-8")))
+            except Exception as exc:  # noqa: BLE001
+                LOG.warning("reloading %s failed, keeping the previous terms: %s", self.spec_path.name, exc)
+            finally:
+                self._lock.release()
+        return self.version
+
+    def find(self, text: str) -> list[tuple[int, int]]:
+        """(start, end) of every occurrence in `text`, overlapping ones
+        included."""
+        automaton = self.automaton
+        if automaton is None or not text:
+            return []
+        normalized, starts, ends = normalize(text)
+        out = []
+        for last, (length, left, right) in automaton.iter(normalized):
+            first = last - length + 1
+            start = starts[first] if starts else first
+            end = ends[last] if ends else last + 1
+            if left and start > 0 and _wordlike(text[start - 1]):
+                continue
+            if right and end < len(text) and _wordlike(text[end]):
+                continue
+            out.append((start, end))
+        return out
+
+
+class DictionaryRecognizer(LocalRecognizer):
+    def __init__(
+        self,
+        dictionary: Dictionary,
+        supported_entity: str,
+        supported_language: str,
+        name: str,
+        context: list[str] | None = None,
+    ) -> None:
+        self.dictionary = dictionary
+        super().__init__(
+            supported_entities=[supported_entity],
+            name=name,
+            supported_language=supported_language,
+            context=context,
+        )
+
+    def load(self) -> None:
+        pass
+
+    def analyze(self, text: str, entities: list[str], nlp_artifacts=None) -> list[RecognizerResult]:
+        self.dictionary.refresh()
+        score = self.dictionary.score
+        results = []
+        for start, end in self.dictionary.find(text):
+            explanation = AnalysisExplanation(
+                recognizer=self.name,
+                original_score=score,
+                textual_explanation=f"Detected by `{self.name}` dictionary",
+            )
+            results.append(RecognizerResult(
+                entity_type=self.supported_entities[0],
+                start=start,
+                end=end,
+                score=score,
+                analysis_explanation=explanation,
+                recognition_metadata={
+                    RecognizerResult.RECOGNIZER_NAME_KEY: self.name,
+                    RecognizerResult.RECOGNIZER_IDENTIFIER_KEY: self.id,
+                },
+            ))
+        return results
+
+
+def from_spec(spec_path: Path, spec: dict, enabled_langs: list[str]) -> list[DictionaryRecognizer]:
+    """One recognizer per enabled language the spec applies to, all
+    sharing one Dictionary; [] when none is enabled."""
+    lang = spec["supported_language"]
+    langs = list(enabled_langs) if lang == "all" else [lang] if lang in enabled_langs else []
+    if not langs:
+        return []
+    dictionary = Dictionary(spec_path, spec)
+    return [
+        DictionaryRecognizer(
+            dictionary,
+            supported_entity=spec["supported_entity"],
+            supported_language=lang,
+            name=spec["name"],
+            context=spec.get("context", []),
+        )
+        for lang in langs
+    ]
@@ -0,0 +1,141 @@
+"""Script/language segmentation for the analyzer.
+
+With languages=["en", "ja"] every text used to go through both spaCy
+pipelines (and every pattern recognizer twice), although a given
+sentence is only ever one of them. segments() splits a text into runs
+of one script and labels each run with the requested language it most
+likely is, so each run is analyzed by a single pipeline.
+
+Script comes from Unicode ranges (kana, Han, Hangul, Latin). Kana means
+Japanese; Han alone means Chinese unless Japanese is requested and the
+text has kana elsewhere (or Chinese is not requested). Among Latin-script
+languages a function-word profile picks the one whose most frequent words
+appear most; with a single Latin language requested there is nothing to
+decide.
+
+Digits, punctuation and whitespace belong to no script and stay with the
+run before them. Every run of another script is its own segment, however
+short: a Japanese name inside an English sentence ("Please ask 田中一郎
+about ...") goes to the ja pipeline, since the en one cannot find it.
+Runs only merge when they land on the same language.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+LATIN, CJK, HANGUL, NEUTRAL = "latin", "cjk", "hangul", "neutral"
+
+# Most frequent function words per Latin-script language in language_map.json.
+FUNCTION_WORDS = {
+    "en": {"the", "and", "of", "to", "in", "is", "that", "for", "it", "with", "as", "was",
+           "on", "be", "at", "by", "this", "are", "from", "or", "have", "you", "not", "my"},
+    "de": {"der", "die", "und", "in", "den", "von", "zu", "das", "mit", "sich", "des", "auf",
+           "für", "ist", "im", "dem", "nicht", "ein", "eine", "als", "auch", "es", "an", "ich"},
+    "es": {"de", "la", "que", "el", "en", "y", "los", "del", "se", "las", "por", "un",
+           "para", "con", "no", "una", "su", "al", "es", "lo", "como", "más", "pero", "mi"},
+    "fr": {"de", "la", "le", "et", "les", "des", "en", "un", "du", "une", "que", "est",
+           "pour", "qui", "dans", "par", "pas", "au", "sur", "ne", "se", "avec", "je", "mon"},
+    "it": {"di", "e", "il", "la", "che", "in", "a", "per", "un", "del", "non", "è",
+           "una", "della", "le", "con", "si", "da", "sono", "gli", "al", "mi", "ho", "lo"},
+    "nl": {"de", "en", "van", "het", "een", "in", "is", "dat", "op", "te", "zijn", "met",
+           "voor", "niet", "die", "aan", "er", "ook", "als", "bij", "ik", "maar", "om", "mijn"},
+    "pt": {"de", "a", "o", "que", "e", "do", "da", "em", "um", "para", "com", "não",
+           "uma", "os", "no", "se", "na", "por", "mais", "as", "dos", "como", "mas", "meu"},
+}
+LATIN_LANGUAGES = tuple(FUNCTION_WORDS)
+WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+@dataclass
+class Segment:
+    start: int
+    end: int
+    lang: str
+
+
+def script_of(ch: str) -> str:
+    cp = ord(ch)
+    if cp < 0x80:
+        return LATIN if ch.isalpha() else NEUTRAL
+    if (
+        0x3040 <= cp <= 0x30FF or 0x31F0 <= cp <= 0x31FF or 0xFF66 <= cp <= 0xFF9F  # kana
+        or 0x3400 <= cp <= 0x4DBF or 0x4E00 <= cp <= 0x9FFF or 0xF900 <= cp <= 0xFAFF  # Han
+        or 0x20000 <= cp <= 0x3134F or cp == 0x3005  # Han ext. B+, 々
+    ):
+        return CJK
+    if 0xAC00 <= cp <= 0xD7AF or 0x1100 <= cp <= 0x11FF or 0x3130 <= cp <= 0x318F:
+        return HANGUL
+    if 0xC0 <= cp <= 0x24F and ch.isalpha():
+        return LATIN
+    return NEUTRAL
+
+
+def _has_kana(text: str) -> bool:
+    return any(0x3040 <= ord(c) <= 0x30FF or 0xFF66 <= ord(c) <= 0xFF9F for c in text)
+
+
+def latin_language(text: str, candidates: list[str]) -> str | None:
+    """The candidate whose function words occur most in `text`; the first
+    candidate on a tie (including no hits at all)."""
+    if not candidates:
+        return None
+    if len(candidates) == 1:
+        return candidates[0]
+    words = [w.lower() for w in WORD_RE.findall(text)]
+    best, best_hits = candidates[0], -1
+    for lang in candidates:
+        vocab = FUNCTION_WORDS.get(lang, set())
+        hits = sum(1 for w in words if w in vocab)
+        if hits > best_hits:
+            best, best_hits = lang, hits
+    return best
+
+
+def _runs(text: str) -> list[tuple[int, int, str, int]]:
+    """(start, end, script, letters) runs; neutral characters extend the
+    run before them (or open the first one)."""
+    runs: list[list] = []
+    for i, ch in enumerate(text):
+        script = script_of(ch)
+        if script == NEUTRAL:
+            if runs:
+                runs[-1][1] = i + 1
+            else:
+                runs.append([i, i + 1, NEUTRAL, 0])
+            continue
+        if runs and runs[-1][2] in (script, NEUTRAL):
+            runs[-1][1], runs[-1][2] = i + 1, script
+            runs[-1][3] += 1
+        else:
+            runs.append([i, i + 1, script, 1])
+    return [tuple(r) for r in runs]
+
+
+def segments(text: str, languages: list[str]) -> list[Segment]:
+    """Cover `text` with segments, each labelled with one of `languages`.
+    Adjacent segments always differ in language."""
+    if not languages:
+        return []
+    if len(languages) == 1 or not text:
+        return [Segment(0, len(text), languages[0])]
+    latin = [lang for lang in languages if lang in LATIN_LANGUAGES]
+    kana_in_text = _has_kana(text)
+    out: list[Segment] = []
+    for start, end, script, _ in _runs(text):
+        if script == CJK:
+            if "ja" in languages and (kana_in_text or "zh" not in languages):
+                lang = "ja"
+            elif "zh" in languages:
+                lang = "zh"
+            else:
+                lang = languages[0]
+        elif script == LATIN:
+            lang = latin_language(text[start:end], latin) or languages[0]
+        else:
+            lang = languages[0]
+        if out and out[-1].lang == lang:
+            out[-1].end = end
+        else:
+            out.append(Segment(start, end, lang))
+    return out
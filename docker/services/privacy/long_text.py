@@ -0,0 +1,135 @@
+"""Windowed, multi-process analysis of very long texts.
+
+A pasted contract or log dump used to go through spaCy as one document
+on one thread, so latency grew with length and a single request could
+hold the service for seconds. A text longer than the threshold is cut
+into windows on paragraph or sentence boundaries, the windows are
+analyzed in a pool of worker processes (each with its own analyzer,
+built once when the worker starts), and the spans are mapped back.
+
+Every window owns a "core" range; the cores partition the text. Each
+window is analyzed with OVERLAP extra characters on both sides, so an
+entity crossing a core boundary is seen whole by the window it starts
+in. A span is kept only from the window whose core contains its start,
+which also drops the clipped copies the neighbours see at their edges;
+exact duplicates left over are merged before overlap resolution.
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable
+
+LOG = logging.getLogger("privacy.long_text")
+
+PARAGRAPH_RE = re.compile(r"\n\s*\n")
+SENTENCE_RE = re.compile(r"[.!?。！？]\s|\n")
+WHITESPACE_RE = re.compile(r"\s")
+
+
+@dataclass
+class Window:
+    start: int  # analyzed range, core plus overlap
+    end: int
+    core_start: int
+    core_end: int
+
+
+def _cut(text: str, lo: int, hi: int) -> int:
+    """Best boundary in (lo, hi]: the last paragraph break, else the last
+    sentence end, else the last whitespace, else hi."""
+    for pattern in (PARAGRAPH_RE, SENTENCE_RE, WHITESPACE_RE):
+        last = None
+        for m in pattern.finditer(text, lo, hi):
+            last = m
+        if last is not None and last.end() > lo:
+            return last.end()
+    return hi
+
+
+def windows(text: str, size: int, overlap: int) -> list[Window]:
+    """Cores of at most `size` characters, cut in their last quarter at
+    the best boundary, each widened by `overlap` on both sides."""
+    out = []
+    start = 0
+    while start < len(text):
+        end = len(text) if len(text) - start <= size else _cut(text, start + size * 3 // 4, start + size)
+        out.append(Window(max(0, start - overlap), min(len(text), end + overlap), start, end))
+        start = end
+    return out
+
+
+def merge_window_spans(windows_: list[Window], per_window: list[list[dict]]) -> list[dict]:
+    """Window-relative spans -> spans on the original text, each entity
+    once."""
+    best: dict[tuple, dict] = {}
+    for window, spans in zip(windows_, per_window):
+        for s in spans:
+            start = s["start"] + window.start
+            if not window.core_start <= start < window.core_end:
+                continue
+            span = {**s, "start": start, "end": s["end"] + window.start}
+            k = (span["type"], span["start"], span["end"])
+            if k not in best or span["score"] > best[k]["score"]:
+                best[k] = span
+    return sorted(best.values(), key=lambda s: (s["start"], s["end"]))
+
+
+_worker_fn: Callable | None = None
+
+
+def _init_worker(module: str, attr: str) -> None:
+    # Importing the server module builds its analyzer once per process.
+    global _worker_fn
+    _worker_fn = getattr(__import__(module), attr)
+
+
+def _run_in_worker(args: tuple) -> Any:
+    return _worker_fn(*args)
+
+
+class AnalyzerPool:
+    """Runs `module.attr(*args)` for a list of argument tuples, in worker
+    processes when `workers` > 0, else in this process. The pool is
+    started on first use, so services that never see a long text never
+    pay for the extra analyzers. A broken pool is dropped and the work
+    is done in-process."""
+
+    def __init__(self, workers: int, module: str, attr: str) -> None:
+        self.workers = workers
+        self.module, self.attr = module, attr
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _local(self) -> Callable:
+        return getattr(__import__(self.module), self.attr)
+
+    def map(self, calls: list[tuple]) -> list[Any]:
+        if self.workers <= 0 or len(calls) < 2:
+            fn = self._local()
+            return [fn(*args) for args in calls]
+        if self._executor is None:
+            # spawn: the parent runs request threads, which fork does not survive cleanly.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.module, self.attr),
+            )
+        try:
+            return list(self._executor.map(_run_in_worker, calls))
+        except Exception as exc:  # noqa: BLE001
+            LOG.warning("analyzer pool failed, analyzing in-process: %s", exc)
+            self.shutdown()
+            fn = self._local()
+            return [fn(*args) for args in calls]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def describe(self) -> dict[str, Any]:
+        return {"workers": self.workers, "started": self._executor is not None}
@@ -0,0 +1,79 @@
+"""Prometheus metrics for GET /v1/metrics.
+
+LatencyMiddleware times every HTTP request from the first byte in to the
+end of the response and files it under its route template ("/v1/anonymize",
+or "/v1/sessions/{session_id}" rather than the concrete path, so session
+ids do not make one series each). Percentiles are left to the scraper
+(histogram_quantile over privacy_request_seconds_bucket).
+
+Metrics live in the default per-process registry: with serve.py workers,
+each worker reports its own counters, and a scrape reaches whichever
+worker accepts it.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Callable
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+_SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUESTS = Counter(
+    "privacy_requests_total", "HTTP requests by route template and status", ["method", "route", "status"],
+)
+REQUEST_SECONDS = Histogram(
+    "privacy_request_seconds",
+    "HTTP request latency by route template and status, first byte in to end of response",
+    ["method", "route", "status"],
+    buckets=_SECONDS_BUCKETS,
+)
+
+
+def gauge(name: str, documentation: str, read: Callable[[], float]) -> Gauge:
+    """A gauge read from `read` at scrape time, for state another module
+    already counts (admission, span cache)."""
+    g = Gauge(name, documentation)
+    g.set_function(read)
+    return g
+
+
+def observe(method: str, route: str, status: int, seconds: float) -> None:
+    labels = {"method": method, "route": route, "status": str(status)}
+    REQUESTS.labels(**labels).inc()
+    REQUEST_SECONDS.labels(**labels).observe(seconds)
+
+
+def render() -> bytes:
+    return generate_latest()
+
+
+class LatencyMiddleware:
+    """ASGI middleware feeding observe(); WebSocket and lifespan scopes
+    pass through untimed."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_status(message: dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            # The router stores the matched route in the shared scope.
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "(unmatched)"
+            observe(scope["method"], path, status, time.perf_counter() - started)
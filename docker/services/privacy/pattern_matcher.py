@@ -0,0 +1,270 @@
+"""Precompiled matching for a fixed set of PatternRecognizers.
+
+PatternRecognizer.analyze() is called once per recognizer per text; it
+looks its patterns up again, times every finditer and re-runs the
+validator on every hit. PatternMatcher takes the recognizers once (per
+language set and whitelist), compiles all of their patterns into one
+flat list and scans a text with it in a single loop. The results are
+the ones analyze() would give: same entity, offsets, score, validation
+(checksums set the score to 1.0 or drop the hit) and explanation, so
+the context enhancer can still work on them.
+
+Validators are pure functions of the matched text, and some are slow
+(EmailRecognizer's tldextract lookup takes milliseconds), so their
+verdicts are memoized per recognizer; chat texts repeat the same values.
+
+One alternation of every pattern was tried as a single-pass scan; with
+the `regex` engine and Presidio's 6 KB URL patterns it was 3-10x slower
+than the separate compiled patterns, so they stay separate, behind a
+prefilter instead: each pattern's trigger is the character class its
+matches can start with, read off the parse tree of the stdlib `re`
+parser (most of Presidio's patterns start with a digit). Patterns sharing a trigger share one
+search per text; a pattern whose trigger does not occur is skipped, and
+the others scan from the first trigger position instead of 0. A pattern
+the parser cannot bound (a leading `.`, negated class or backreference,
+scoped flags, regex-only syntax) has no trigger and always runs, and so
+does one with syntax `re` parses but reads differently from `regex`:
+POSIX classes, and the nested sets and set operations of regex.V1.
+
+Recognizers that override analyze() (IbanRecognizer, dictionaries) are
+called as-is.
+
+remove_duplicates() is EntityRecognizer.remove_duplicates() in
+O(n log n) instead of O(n^2); on a long document with a few hundred
+URL or date hits the pairwise version cost as much as the scan.
+"""
+from __future__ import annotations
+
+import re
+import re._constants as sre
+import re._parser as sre_parse
+import threading
+import time
+
+import regex
+from presidio_analyzer import EntityRecognizer, PatternRecognizer, RecognizerResult
+
+import profiling
+
+MAX_MEMO = 8192
+
+_CATEGORIES = {
+    sre.CATEGORY_DIGIT: r"\d",
+    sre.CATEGORY_WORD: r"\w",
+    sre.CATEGORY_SPACE: r"\s",
+}
+_ZERO_WIDTH = (sre.AT, sre.ASSERT, sre.ASSERT_NOT)
+# [[:alpha:]] is a class of letters to `regex`, but "[", ":", "a", "l",
+# "p", "h" followed by "]" to `re`.
+_POSIX_CLASS = re.compile(r"\[:\^?[A-Za-z]+:\]")
+_REPEATS = (sre.MAX_REPEAT, sre.MIN_REPEAT, sre.POSSESSIVE_REPEAT)
+
+
+class _Unbounded(Exception):
+    """The pattern can start with (nearly) any character."""
+
+
+def _first(items) -> tuple[set[str], bool]:
+    """(class members a match of `items` can start with, whether
+    `items` can match the empty string)."""
+    out: set[str] = set()
+    for op, av in items:
+        members, nullable = _first_op(op, av)
+        out |= members
+        if not nullable:
+            return out, False
+    return out, True
+
+
+def _first_op(op, av) -> tuple[set[str], bool]:
+    if op is sre.LITERAL:
+        return {re.escape(chr(av))}, False
+    if op is sre.IN:
+        members = set()
+        for kind, value in av:
+            if kind is sre.LITERAL:
+                members.add(re.escape(chr(value)))
+            elif kind is sre.RANGE:
+                members.add(f"{re.escape(chr(value[0]))}-{re.escape(chr(value[1]))}")
+            elif kind is sre.CATEGORY and value in _CATEGORIES:
+                members.add(_CATEGORIES[value])
+            else:  # NEGATE, negated categories
+                raise _Unbounded
+        return members, False
+    if op in _ZERO_WIDTH:
+        return set(), True
+    if op is sre.SUBPATTERN:
+        if av[1] or av[2]:  # (?i:...) and friends
+            raise _Unbounded
+        return _first(av[-1])
+    if op is sre.ATOMIC_GROUP:
+        return _first(av)
+    if op in _REPEATS:
+        members, nullable = _first(av[2])
+        return members, nullable or av[0] == 0
+    if op is sre.BRANCH:
+        members, nullable = set(), False
+        for branch in av[1]:
+            m, n = _first(branch)
+            members |= m
+            nullable |= n
+        return members, nullable
+    raise _Unbounded
+
+
+def trigger(pattern: str, flags: int) -> str | None:
+    """A character class every match of `pattern` starts with, or None
+    when there is no useful bound."""
+    if flags & regex.VERSION1 or _POSIX_CLASS.search(pattern):
+        return None
+    try:
+        parsed = sre_parse.parse(pattern, flags & re.IGNORECASE)
+        members, nullable = _first(parsed.data)
+    except (_Unbounded, re.error, RecursionError):
+        return None
+    # An inline (?i) the recognizer's flags lack would make the class too narrow.
+    if parsed.state.flags & re.IGNORECASE and not flags & re.IGNORECASE:
+        return None
+    if nullable or not members:
+        return None
+    return "[" + "".join(sorted(members)) + "]"
+
+
+def remove_duplicates(results: list[RecognizerResult]) -> list[RecognizerResult]:
+    """Same list, in the same order, as EntityRecognizer.remove_duplicates:
+    by (-score, start, -length), drop zero scores and every result
+    contained in an earlier kept one of its type. Kept results are
+    indexed per type by start in a Fenwick tree of max end, so "some
+    kept result starts at or before mine and ends at or after me" is one
+    prefix query."""
+    ordered = sorted(set(results), key=lambda x: (-x.score, x.start, -(x.end - x.start)))
+    starts: dict[str, set[int]] = {}
+    for r in ordered:
+        starts.setdefault(r.entity_type, set()).add(r.start)
+    index = {t: {s: i + 1 for i, s in enumerate(sorted(v))} for t, v in starts.items()}
+    trees = {t: [-1] * (len(v) + 1) for t, v in index.items()}
+    kept = []
+    for r in ordered:
+        if r.score == 0:
+            continue
+        tree = trees[r.entity_type]
+        i = index[r.entity_type][r.start]
+        best = -1
+        while i > 0:
+            best = max(best, tree[i])
+            i -= i & -i
+        if best >= r.end:
+            continue
+        kept.append(r)
+        i = index[r.entity_type][r.start]
+        while i < len(tree):
+            if tree[i] < r.end:
+                tree[i] = r.end
+            i += i & -i
+    return kept
+
+
+class PatternMatcher:
+    def __init__(self, recognizers: list[PatternRecognizer]) -> None:
+        self.patterns = []  # (recognizer, Pattern, compiled, flags, trigger key or None)
+        self.delegated = []  # recognizers with their own analyze()
+        self.language = {}  # recognizer id -> its registered language
+        self.triggers = {}  # (class, flags) -> compiled class
+        for r in recognizers:
+            self.language[r.id] = r.supported_language
+            if type(r).analyze is not PatternRecognizer.analyze:
+                self.delegated.append(r)
+                continue
+            for p in r.patterns:
+                flags = r.global_regex_flags
+                cls = trigger(p.regex, flags)
+                key = None
+                if cls is not None:
+                    try:
+                        key = (cls, flags)
+                        self.triggers.setdefault(key, regex.compile(cls, flags))
+                    except regex.error:
+                        key = None
+                self.patterns.append((r, p, regex.compile(p.regex, flags), flags, key))
+        self.entities = sorted({e for r in recognizers for e in r.supported_entities})
+        self._memo: dict[tuple[str, str], tuple] = {}
+        self._memo_lock = threading.Lock()
+
+    def _checks(self, recognizer: PatternRecognizer, value: str) -> tuple:
+        key = (recognizer.id, value)
+        verdict = self._memo.get(key)
+        if verdict is None:
+            verdict = (recognizer.validate_result(value), recognizer.invalidate_result(value))
+            with self._memo_lock:
+                if len(self._memo) >= MAX_MEMO:
+                    self._memo.clear()
+                self._memo[key] = verdict
+        return verdict
+
+    def analyze(self, text: str, entities: list[str]) -> list[RecognizerResult]:
+        """Every recognizer's results on `text`, deduplicated per
+        recognizer like PatternRecognizer.analyze() does."""
+        per_recognizer: dict[str, list[RecognizerResult]] = {}
+        starts: dict[tuple, int] = {}
+        profile = profiling.active()
+        # (time, recognizer) at the start of each pattern, when profiling.
+        marks = [] if profile is not None else None
+        for recognizer, pattern, compiled, flags, key in self.patterns:
+            if marks is not None:
+                marks.append((time.perf_counter(), recognizer.name))
+            found = per_recognizer.setdefault(recognizer.id, [])
+            pos = 0
+            if key is not None:
+                if key not in starts:
+                    m = self.triggers[key].search(text)
+                    starts[key] = m.start() if m else -1
+                pos = starts[key]
+                if pos < 0:
+                    continue
+            # From `pos`, lookbehinds and \b still see the text before it.
+            for m in compiled.finditer(text, pos):
+                start, end = m.span()
+                if start == end:
+                    continue
+                validation, invalidation = self._checks(recognizer, text[start:end])
+                score = pattern.score
+                if validation is not None:
+                    score = EntityRecognizer.MAX_SCORE if validation else EntityRecognizer.MIN_SCORE
+                if invalidation:
+                    score = EntityRecognizer.MIN_SCORE
+                if score <= EntityRecognizer.MIN_SCORE:
+                    continue
+                explanation = PatternRecognizer.build_regex_explanation(
+                    recognizer.name, pattern.name, pattern.regex, pattern.score, validation, flags,
+                )
+                explanation.score = score
+                found.append(RecognizerResult(
+                    entity_type=recognizer.supported_entities[0],
+                    start=start,
+                    end=end,
+                    score=score,
+                    analysis_explanation=explanation,
+                    recognition_metadata={
+                        RecognizerResult.RECOGNIZER_NAME_KEY: recognizer.name,
+                        RecognizerResult.RECOGNIZER_IDENTIFIER_KEY: recognizer.id,
+                    },
+                ))
+        results = []
+        for found in per_recognizer.values():
+            results.extend(remove_duplicates(found))
+        if marks:
+            marks.append((time.perf_counter(), None))
+            spent: dict[str, float] = {}
+            for (started, name), (ended, _) in zip(marks, marks[1:]):
+                spent[name] = spent.get(name, 0.0) + ended - started
+            for name, seconds in spent.items():
+                profile.add("recognizers", name, seconds)
+        for recognizer in self.delegated:
+            with profiling.timed("recognizers", recognizer.name):
+                found = recognizer.analyze(text=text, entities=entities, nlp_artifacts=None) or []
+            for r in found:
+                r.recognition_metadata = r.recognition_metadata or {}
+                r.recognition_metadata.setdefault(RecognizerResult.RECOGNIZER_IDENTIFIER_KEY, recognizer.id)
+                r.recognition_metadata.setdefault(RecognizerResult.RECOGNIZER_NAME_KEY, recognizer.name)
+            results.extend(found)
+        return results
@@ -0,0 +1,115 @@
+"""Per-request cost breakdown for options.profile.
+
+The analysis code reports its stages through timed(), timed_iter() and
+count(). They look up the Profile of the current request in a ContextVar
+and do nothing when there is none, so unprofiled requests pay one lookup
+per call site. Admission runs work in a copy of the caller's context, so
+a profile started in a handler sees the work done on the executor.
+
+Times are wall-clock milliseconds summed over every text and segment of
+the request:
+
+  nlp_ms          per language, the spaCy pass (nlp.pipe) over its segments
+  recognizers_ms  per recognizer name, its scan plus validators (pattern
+                  recognizers run inside PatternMatcher)
+  stages_ms       segmentation, context, dedupe, long_text_pool, merge
+  spans           recognized (raw recognizer results), detected (after
+                  dedupe and threshold), kept_after_merge, kept_after_trim
+
+Windows of long texts are analyzed in other processes, so they show up
+as one long_text_pool stage rather than per recognizer.
+"""
+from __future__ import annotations
+
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Any, Iterable, Iterator
+
+_current: ContextVar["Profile | None"] = ContextVar("privacy_profile", default=None)
+
+
+class Profile:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.times: dict[str, dict[str, float]] = {}
+        self.calls: dict[str, int] = {}
+        self.counts: dict[str, int] = {}
+
+    def add(self, kind: str, name: str, seconds: float) -> None:
+        """One call of `name`, taking `seconds`."""
+        bucket = self.times.setdefault(kind, {})
+        bucket[name] = bucket.get(name, 0.0) + seconds
+        if kind == "recognizers":
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def report(self, **extra: Any) -> dict[str, Any]:
+        def ms(bucket: dict[str, float]) -> dict[str, float]:
+            ordered = sorted(bucket.items(), key=lambda kv: -kv[1])
+            return {name: round(s * 1000, 3) for name, s in ordered}
+
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "nlp_ms": ms(self.times.get("nlp", {})),
+            "recognizers_ms": ms(self.times.get("recognizers", {})),
+            "recognizer_calls": dict(sorted(self.calls.items())),
+            "stages_ms": ms(self.times.get("stages", {})),
+            "spans": dict(self.counts),
+            **extra,
+        }
+
+
+def active() -> Profile | None:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def profiling(enabled: bool) -> Iterator[Profile | None]:
+    """Make a new Profile current for the block (None when disabled)."""
+    if not enabled:
+        yield None
+        return
+    profile = Profile()
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def timed(kind: str, name: str) -> Iterator[None]:
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(kind, name, time.perf_counter() - started)
+
+
+def timed_iter(kind: str, name: str, items: Iterable) -> Iterator:
+    """`items`, with the time spent producing each one added to `name`
+    (for lazy pipelines such as nlp.pipe)."""
+    profile = _current.get()
+    if profile is None:
+        yield from items
+        return
+    it = iter(items)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            profile.add(kind, name, time.perf_counter() - started)
+            return
+        profile.add(kind, name, time.perf_counter() - started)
+        yield item
+
+
+def count(name: str, n: int) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.counts[name] = profile.counts.get(name, 0) + n
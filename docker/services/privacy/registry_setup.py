@@ -3,19 +3,26 @@
 Responsibilities:
 1. Build NlpEngine for the languages enabled at runtime (PRIVACY_LANGS,
    injected by compose; all supported models are baked into the image).
+   Each model is loaded on first use, without the components Presidio
+   never reads; PRIVACY_PRELOAD_LANGS loads some (or "all") up front.
 2. Re-register PatternRecognizers (CC, Phone, Email, etc.) under every
    enabled language so they fire regardless of input language.
 3. Remove noisy country-specific recognizers that hurt global usage.
-4. Load custom YAML recognizers from /app/recognizers.
+4. Load custom YAML recognizers from /app/recognizers: regex patterns,
+   or term dictionaries (`type: dictionary`, dictionary_recognizer.py).
 """
 import json
 import logging
 import os
+import threading
+import time
+from collections.abc import Mapping
 from pathlib import Path
 
+import spacy
 import yaml
 from presidio_analyzer import AnalyzerEngine, Pattern, PatternRecognizer
-from presidio_analyzer.nlp_engine import NlpEngineProvider
+from presidio_analyzer.nlp_engine import SpacyNlpEngine
 from presidio_analyzer.predefined_recognizers import (
     CreditCardRecognizer,
     EmailRecognizer,
@@ -31,6 +38,8 @@ from presidio_analyzer.predefined_recognizers import (
     UsSsnRecognizer,
 )
 
+import dictionary_recognizer
+
 LOG = logging.getLogger("privacy.registry_setup")
 
 LANGUAGE_MAP_PATH = Path(__file__).parent / "language_map.json"
@@ -78,6 +87,12 @@ LANGUAGE_AGNOSTIC_PATTERN_CLASSES = (
 )
 
 
+# spaCy components whose output Presidio never reads: it uses tokens,
+# lemmas (tagger/morphologizer + attribute_ruler + lemmatizer) and
+# entities. Excluded at load time, so they cost neither memory nor time.
+UNUSED_PIPES = ("parser", "senter", "textcat", "textcat_multilabel", "entity_linker")
+
+
 def enabled_languages() -> list[str]:
     """Languages to load, filtered against language_map.json.
 
@@ -101,15 +116,110 @@ def enabled_languages() -> list[str]:
     return langs or ["en"]
 
 
-def build_nlp_engine(languages: list[str]):
+def preload_languages(languages: list[str]) -> list[str]:
+    """Enabled languages to load at startup (PRIVACY_PRELOAD_LANGS, a
+    comma list or "all"); the rest load on their first request."""
+    raw = os.environ.get("PRIVACY_PRELOAD_LANGS", "").strip()
+    if raw == "all":
+        return list(languages)
+    wanted = [s.strip() for s in raw.split(",") if s.strip()]
+    skipped = [lang for lang in wanted if lang not in languages]
+    if skipped:
+        LOG.warning("Ignoring PRIVACY_PRELOAD_LANGS entries that are not enabled: %s", skipped)
+    return [lang for lang in wanted if lang in languages]
+
+
+def _rss_bytes() -> int | None:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _LazyModels(Mapping):
+    """lang -> spacy.Language, loading each model on first access. Keys
+    are all configured languages, so Presidio sees every one as
+    supported before it is loaded."""
+
+    def __init__(self, engine: "LazySpacyNlpEngine") -> None:
+        self._engine = engine
+        self._loaded: dict[str, spacy.Language] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, lang: str) -> spacy.Language:
+        nlp = self._loaded.get(lang)
+        if nlp is None:
+            with self._lock:
+                nlp = self._loaded.get(lang)
+                if nlp is None:
+                    nlp = self._loaded[lang] = self._engine.load_model(lang)
+        return nlp
+
+    def __iter__(self):
+        return iter(self._engine.model_names)
+
+    def __len__(self) -> int:
+        return len(self._engine.model_names)
+
+    def is_loaded(self, lang: str) -> bool:
+        return lang in self._loaded
+
+
+class LazySpacyNlpEngine(SpacyNlpEngine):
+    """SpacyNlpEngine whose models load on first use, without
+    UNUSED_PIPES. load() only loads the `preload` languages; the load
+    time and RSS growth of every model are kept in `load_stats`."""
+
+    def __init__(self, models: list[dict[str, str]], preload: list[str]) -> None:
+        super().__init__(models=models)
+        self.model_names = {m["lang_code"]: m["model_name"] for m in models}
+        self.preload = preload
+        self.load_stats: dict[str, dict] = {}
+
+    def load(self) -> None:
+        self.nlp = _LazyModels(self)
+        for lang in self.preload:
+            self.nlp[lang]
+
+    def load_model(self, lang: str) -> spacy.Language:
+        name = self.model_names[lang]
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        if not spacy.util.is_package(name):
+            # The image bakes every model in; this is for local runs.
+            LOG.warning("model %s is not installed, downloading it", name)
+            spacy.cli.download(name)
+        nlp = spacy.load(name, exclude=list(UNUSED_PIPES))
+        seconds = time.perf_counter() - started
+        rss_after = _rss_bytes()
+        rss_mb = round((rss_after - rss_before) / 2**20, 1) if rss_before and rss_after else None
+        self.load_stats[lang] = {
+            "model": name,
+            "load_s": round(seconds, 3),
+            "rss_mb": rss_mb,
+            "pipes": list(nlp.pipe_names),
+        }
+        LOG.info("loaded %s for %s in %.2fs (+%s MB RSS), pipes=%s", name, lang, seconds, rss_mb, nlp.pipe_names)
+        return nlp
+
+    def describe(self) -> dict[str, dict]:
+        return {
+            lang: {"loaded": self.nlp.is_loaded(lang), **self.load_stats.get(lang, {"model": name})}
+            for lang, name in self.model_names.items()
+        }
+
+
+def build_nlp_engine(languages: list[str], preload: list[str] | None = None) -> LazySpacyNlpEngine:
     mapping = json.loads(LANGUAGE_MAP_PATH.read_text())
     models = []
     for lang in languages:
         if lang not in mapping:
             raise ValueError(f"Unknown language code: {lang}. Allowed: {sorted(mapping)}")
         models.append({"lang_code": lang, "model_name": mapping[lang]})
-    config = {"nlp_engine_name": "spacy", "models": models}
-    return NlpEngineProvider(nlp_configuration=config).create_engine()
+    engine = LazySpacyNlpEngine(models=models, preload=preload or [])
+    engine.load()
+    return engine
 
 
 def remove_disabled_recognizers(analyzer: AnalyzerEngine) -> int:
@@ -146,6 +256,14 @@ def load_yaml_recognizers(analyzer: AnalyzerEngine, enabled_langs: list[str]) ->
     for yaml_file in sorted(RECOGNIZERS_DIR.glob("*.yaml")):
         spec = yaml.safe_load(yaml_file.read_text())
         lang = spec["supported_language"]
+        if spec.get("type") == "dictionary":
+            recognizers = dictionary_recognizer.from_spec(yaml_file, spec, enabled_langs)
+            if not recognizers:
+                LOG.info("skipping %s: language %s not enabled", yaml_file.name, lang)
+            for recognizer in recognizers:
+                analyzer.registry.add_recognizer(recognizer)
+            added += len(recognizers)
+            continue
         if lang not in enabled_langs:
             LOG.info("skipping %s: language %s not enabled", yaml_file.name, lang)
             continue
@@ -167,7 +285,7 @@ def load_yaml_recognizers(analyzer: AnalyzerEngine, enabled_langs: list[str]) ->
 
 def build_analyzer() -> AnalyzerEngine:
     languages = enabled_languages()
-    nlp_engine = build_nlp_engine(languages)
+    nlp_engine = build_nlp_engine(languages, preload_languages(languages))
     analyzer = AnalyzerEngine(nlp_engine=nlp_engine, supported_languages=languages)
 
     removed = remove_disabled_recognizers(analyzer)
@@ -175,7 +293,7 @@ def build_analyzer() -> AnalyzerEngine:
     yaml_added = load_yaml_recognizers(analyzer, languages)
 
     LOG.info(
-        "AnalyzerEngine ready: languages=%s removed=%d pattern_added=%d yaml=%d",
-        languages, removed, pattern_added, yaml_added,
+        "AnalyzerEngine ready: languages=%s preloaded=%s removed=%d pattern_added=%d yaml=%d",
+        languages, nlp_engine.preload, removed, pattern_added, yaml_added,
     )
     return analyzer
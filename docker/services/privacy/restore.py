@@ -0,0 +1,76 @@
+"""Placeholder restoration, whole-text and streamed.
+
+restore_text() replaces every <<TYPE_N>> in one regex pass, instead of one
+str.replace over the whole text per distinct placeholder; a restored value
+that happens to look like a placeholder is never expanded again.
+
+StreamRestorer does the same for text arriving in pieces (LLM tokens).
+A chunk can end in the middle of a placeholder ("... <<PERS"), so the
+longest suffix that could still grow into one is held back until the
+next chunk decides it; everything before it is restored and released at
+once. Held-back text never exceeds MAX_PLACEHOLDER_LEN characters.
+"""
+from __future__ import annotations
+
+import re
+from typing import Callable
+
+PLACEHOLDER_RE = re.compile(r"<<([A-Z_]+)_(\d+)>>")
+# A suffix that is a proper prefix of some placeholder. Looser than the
+# placeholder itself ("<<AB1" passes); that only delays text, never loses it.
+PARTIAL_RE = re.compile(r"<(?:<(?:[A-Z_]+(?:\d+>?)?)?)?\Z")
+MAX_PLACEHOLDER_LEN = 96
+
+Lookup = Callable[[str], "str | None"]
+
+
+class Restoration:
+    """Counts across one text or one stream: distinct placeholders
+    restored, and those with no registry entry in first-seen order."""
+
+    def __init__(self, lookup: Lookup) -> None:
+        self.lookup = lookup
+        self.restored: set[str] = set()
+        self.missing: list[str] = []
+        self._missing_seen: set[str] = set()
+
+    def _replace(self, m: re.Match) -> str:
+        placeholder = m.group(0)
+        original = self.lookup(placeholder)
+        if original is None:
+            if placeholder not in self._missing_seen:
+                self._missing_seen.add(placeholder)
+                self.missing.append(placeholder)
+            return placeholder
+        self.restored.add(placeholder)
+        return original
+
+    def sub(self, text: str) -> str:
+        return PLACEHOLDER_RE.sub(self._replace, text)
+
+    def stats(self) -> dict:
+        return {"replacements": len(self.restored), "missing_placeholders": list(self.missing)}
+
+
+def restore_text(text: str, registry: dict[str, str]) -> tuple[str, dict]:
+    restoration = Restoration(registry.get)
+    return restoration.sub(text), restoration.stats()
+
+
+class StreamRestorer(Restoration):
+    def __init__(self, lookup: Lookup) -> None:
+        super().__init__(lookup)
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        """Restored text that is final as of this chunk (possibly "")."""
+        text = self._pending + chunk
+        tail = PARTIAL_RE.search(text, max(0, len(text) - MAX_PLACEHOLDER_LEN))
+        cut = tail.start() if tail else len(text)
+        self._pending = text[cut:]
+        return self.sub(text[:cut])
+
+    def flush(self) -> str:
+        """Whatever is still held back, restored; the stream is over."""
+        text, self._pending = self._pending, ""
+        return self.sub(text)
@@ -0,0 +1,136 @@
+"""Start the privacy server, as one process or as pre-forked workers.
+
+  python serve.py                     # PRIVACY_WORKERS=1, plain uvicorn
+  PRIVACY_WORKERS=4 python serve.py
+
+`uvicorn --workers N` starts every worker as a fresh interpreter, so each
+one builds its own AnalyzerEngine and loads its own spaCy models. Here
+the parent imports server.py once, with every enabled model loaded
+(PRIVACY_PRELOAD_LANGS defaults to "all" in this mode) and one warm-up
+request per language so patterns and matchers are compiled. It then
+freezes the heap, so the collector does not write to the shared pages,
+and forks the workers. They share that memory copy-on-write and accept
+on one listening socket. A worker that exits is forked again from the
+same parent; SIGTERM and SIGINT are passed on to the workers.
+
+The span cache, sessions and admission limits are per worker: N workers
+admit up to N x PRIVACY_MAX_IN_FLIGHT requests, and a session only
+exists in the worker that created it, so clients that use /v1/sessions
+need PRIVACY_WORKERS=1. Long texts are windowed in-process unless
+PRIVACY_POOL_WORKERS is set, since every pool process of every worker
+would load a full analyzer of its own.
+"""
+from __future__ import annotations
+
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+LOG = logging.getLogger("privacy.serve")
+
+HOST = os.environ.get("PRIVACY_HOST", "0.0.0.0")
+PORT = int(os.environ.get("PRIVACY_PORT", "8000"))
+# A worker that dies sooner than this after its fork is re-forked only
+# after a pause, so a crash at startup does not spin.
+MIN_WORKER_LIFE_S = 5.0
+
+WARM_UP_TEXT = {
+    "en": "Contact John Smith at john@example.com or 415-555-0100.",
+    "ja": "山田太郎さんの連絡先は taro@example.jp、電話は03-1234-5678です。",
+}
+
+
+def warm_up(server) -> None:
+    """One full and one fast request per enabled language."""
+    for lang in server.enabled_languages():
+        text = WARM_UP_TEXT.get(lang, WARM_UP_TEXT["en"])
+        for mode in ("full", "fast"):
+            req = server.AnonymizeRequest(text=text, languages=[lang], options={"mode": mode})
+            server._mask_all([text], req)
+
+
+def _listen() -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in HOST else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((HOST, PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _worker(server, sock: socket.socket) -> None:
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+    uvicorn.Server(uvicorn.Config(server.app)).run(sockets=[sock])
+
+
+def main() -> int:
+    workers = int(os.environ.get("PRIVACY_WORKERS", "1"))
+    if workers <= 1:
+        uvicorn.run("server:app", host=HOST, port=PORT)
+        return 0
+
+    os.environ.setdefault("PRIVACY_PRELOAD_LANGS", "all")
+    started = time.perf_counter()
+    import server
+
+    warm_up(server)
+    sock = _listen()
+    LOG.info("preloaded analyzer in %.2fs; forking %d workers on %s:%d",
+             time.perf_counter() - started, workers, HOST, PORT)
+    gc.collect()
+    gc.freeze()
+
+    children: dict[int, float] = {}
+    stopping = False
+
+    def fork() -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _worker(server, sock)
+            except BaseException as exc:  # noqa: BLE001
+                LOG.error("worker %d failed: %s", os.getpid(), exc)
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        fork()
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        forked = children.pop(pid, None)
+        if stopping or forked is None:
+            continue
+        LOG.warning("worker %d exited (status %d); forking a new one", pid, status)
+        if time.monotonic() - forked < MIN_WORKER_LIFE_S:
+            time.sleep(MIN_WORKER_LIFE_S)
+        if not stopping:
+            fork()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
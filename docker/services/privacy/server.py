@@ -3,28 +3,84 @@
 Endpoints:
   GET  /v1/health
   GET  /v1/info
+  GET  /v1/metrics   (Prometheus text format)
   POST /v1/anonymize
+  POST /v1/anonymize/batch
   POST /v1/deanonymize
-
-The server is stateless: registry is passed in/out per request so that
-multiple workers and session restoration both work without server-side state.
+  WS   /v1/deanonymize/stream
+  POST /v1/sessions, GET|DELETE /v1/sessions/{id}
+
+The server is stateless by default: registry is passed in/out per request so
+that multiple workers and session restoration both work without server-side
+state. Optionally a client keeps its registry here (sessions.py) and gets
+only the placeholders each call added back.
+
+Each text is split into single-language segments (language_detect.py) and
+every segment runs through one spaCy pipeline only; the pattern
+recognizers of all requested languages run once per segment. Set
+PRIVACY_LANG_DETECT=0 to analyze the whole text once per requested
+language instead.
+
+Analyzer spans are cached per text (span_cache.py, PRIVACY_SPAN_CACHE
+entries, 0 disables); the registry is applied to them per request.
+
+Analysis runs on a bounded executor (admission.py, PRIVACY_ANALYSIS_THREADS
+threads); past PRIVACY_MAX_IN_FLIGHT running or queued requests the
+analyze endpoints answer 429 with Retry-After, while health checks and
+restores stay on the event loop. serve.py starts several workers that
+fork from one preloaded analyzer (PRIVACY_WORKERS).
+
+/v1/metrics has request latency histograms per route (metrics.py);
+options.profile adds a per-recognizer and per-language cost breakdown
+of the request to its response (profiling.py).
+
+options.mode "fast" skips spaCy entirely: only the recognizers that need
+no NLP artifacts run (pattern, checksum, dictionary and phonenumbers),
+through one precompiled PatternMatcher per language set and whitelist
+(pattern_matcher.py), without context-word scoring.
 """
+import contextlib
+import functools
+import heapq
+import json
 import logging
-import re
-from typing import Any
+import os
+import threading
+from typing import Any, Literal
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response, WebSocket, WebSocketDisconnect
+from presidio_analyzer import EntityRecognizer, LocalRecognizer, RecognizerResult
+from presidio_analyzer.predefined_recognizers import SpacyRecognizer
 from pydantic import BaseModel, Field
 
+import admission
+import language_detect
+import long_text
+import metrics
+import profiling
+import sessions
+import span_cache
+from dictionary_recognizer import DictionaryRecognizer
+from pattern_matcher import PatternMatcher, remove_duplicates
 from registry_setup import build_analyzer, enabled_languages
+from restore import PLACEHOLDER_RE, StreamRestorer, restore_text
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
 LOG = logging.getLogger("privacy.server")
 
 analyzer = build_analyzer()
-app = FastAPI(title="Privacy Filter")
 
-PLACEHOLDER_RE = re.compile(r"<<([A-Z_]+)_(\d+)>>")
+
+@contextlib.asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    yield
+    ADMISSION.shutdown()
+    POOL.shutdown()
+
+
+app = FastAPI(title="Privacy Filter", lifespan=_lifespan)
+app.add_middleware(metrics.LatencyMiddleware)
+
 JA_HONORIFICS = ("様", "さま", "さん", "くん", "君", "殿", "氏", "先生", "ちゃん")
 
 # Higher = higher priority. Used for overlap resolution.
@@ -44,14 +100,66 @@ TYPE_PRIORITY = {
 }
 NUMERIC_TYPES = {"CREDIT_CARD", "PHONE_NUMBER", "POSTAL_CODE", "IBAN_CODE", "US_SSN"}
 
+MAX_BATCH_TEXTS = 512
+
+# spaCy components that only feed the NER-backed recognizer.
+NER_PIPES = ("ner", "entity_ruler", "span_ruler")
+
+LONG_TEXT_CHARS = int(os.environ.get("PRIVACY_LONG_TEXT_CHARS", "20000"))
+LONG_TEXT_WINDOW = 8000
+LONG_TEXT_OVERLAP = 200
+
+
+def pool_workers() -> int:
+    """PRIVACY_POOL_WORKERS, or when unset 2 with one server worker and 0
+    (windows in-process) with more. Every pool process spawns with its own
+    analyzer and models, about as much memory as the server itself, and
+    under serve.py each worker would start a pool of its own."""
+    value = os.environ.get("PRIVACY_POOL_WORKERS", "").strip()
+    if value:
+        return int(value)
+    return 2 if int(os.environ.get("PRIVACY_WORKERS", "1")) <= 1 else 0
+
+
+POOL = long_text.AnalyzerPool(pool_workers(), "server", "_analyze_direct")
+
+LANG_DETECT = os.environ.get("PRIVACY_LANG_DETECT", "1") not in ("0", "false", "no")
+SPAN_CACHE = span_cache.SpanCache(int(os.environ.get("PRIVACY_SPAN_CACHE", "4096")))
+RECOGNIZER_VERSION = span_cache.recognizer_version(analyzer.registry.recognizers)
+# One Dictionary per file, shared by its per-language recognizers.
+DICTIONARIES = list({
+    id(r.dictionary): r.dictionary for r in analyzer.registry.recognizers if isinstance(r, DictionaryRecognizer)
+}.values())
+ADMISSION = admission.Admission(
+    threads=int(os.environ.get("PRIVACY_ANALYSIS_THREADS", "2")),
+    max_in_flight=int(os.environ.get("PRIVACY_MAX_IN_FLIGHT", "32")),
+)
+SESSIONS = sessions.SessionStore(
+    ttl_s=float(os.environ.get("PRIVACY_SESSION_TTL_S", "3600")),
+    max_sessions=int(os.environ.get("PRIVACY_MAX_SESSIONS", "1024")),
+)
+
+metrics.gauge(
+    "privacy_admission_in_flight", "Analyze requests running or queued", lambda: ADMISSION.describe()["in_flight"],
+)
+metrics.gauge("privacy_admission_rejected", "Analyze requests refused with 429 since start", lambda: ADMISSION.rejected)
+metrics.gauge("privacy_span_cache_hits", "Span cache hits since start", lambda: SPAN_CACHE.hits)
+metrics.gauge("privacy_span_cache_misses", "Span cache misses since start", lambda: SPAN_CACHE.misses)
+
 
 class AnalyzeOptions(BaseModel):
     score_threshold: float = 0.4
     honorific_trim: bool = True
+    # "fast": NLP-free recognizers only (patterns, checksums, dictionaries,
+    # phonenumbers), no NLP pipeline, no context-word boosts. No
+    # PERSON/ORG/LOCATION from NER.
+    mode: Literal["full", "fast"] = "full"
+    # Report where the time went (response "profile"); bypasses span
+    # cache lookups so every text is really analyzed.
+    profile: bool = False
 
 
-class AnonymizeRequest(BaseModel):
-    text: str
+class AnonymizeParams(BaseModel):
     languages: list[str] = Field(default_factory=lambda: ["en"])
     registry: dict[str, str] = Field(default_factory=dict)
     options: AnalyzeOptions = Field(default_factory=AnalyzeOptions)
@@ -59,15 +167,34 @@ class AnonymizeRequest(BaseModel):
     # — return all detected types" (legacy behavior). Default kept as None so
     # existing unfiltered callers stay unchanged.
     entity_types: list[str] | None = None
+    # Server-side registry (POST /v1/sessions). When set, `registry` must
+    # be empty and responses carry only `registry_delta`.
+    session_id: str | None = None
+
+
+class AnonymizeRequest(AnonymizeParams):
+    text: str
+
+
+class AnonymizeBatchRequest(AnonymizeParams):
+    # Texts share `registry`: it is threaded through them in order, so the
+    # same value gets the same placeholder across the whole batch.
+    texts: list[str] = Field(default_factory=list, max_length=MAX_BATCH_TEXTS)
 
 
 class DeanonymizeRequest(BaseModel):
     text: str
-    registry: dict[str, str]
+    registry: dict[str, str] = Field(default_factory=dict)
+    session_id: str | None = None
+
+
+class SessionRequest(BaseModel):
+    # Seed registry, e.g. the one the client held in stateless mode.
+    registry: dict[str, str] = Field(default_factory=dict)
 
 
 @app.get("/v1/health")
-def health() -> dict[str, Any]:
+async def health() -> dict[str, Any]:
     return {"status": "ok", "languages": enabled_languages()}
 
 
@@ -75,6 +202,7 @@ def health() -> dict[str, Any]:
 def info() -> dict[str, Any]:
     return {
         "languages": enabled_languages(),
+        "models": analyzer.nlp_engine.describe(),
         "recognizers": [
             {
                 "name": r.name,
@@ -83,26 +211,323 @@ def info() -> dict[str, Any]:
             }
             for r in analyzer.registry.recognizers
         ],
+        "recognizer_version": RECOGNIZER_VERSION,
+        "dictionaries": [
+            {"file": d.spec_path.name, "terms": d.size, "version": d.refresh()} for d in DICTIONARIES
+        ],
+        "span_cache": SPAN_CACHE.stats(),
+        "sessions": len(SESSIONS),
+        "long_text": {"threshold_chars": LONG_TEXT_CHARS, "pool": POOL.describe()},
+        "admission": ADMISSION.describe(),
     }
 
 
-def _analyze_per_language(text: str, languages: list[str], score_threshold: float) -> list[dict]:
-    spans = []
+@app.get("/v1/metrics")
+def prometheus_metrics() -> Response:
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def _to_spans(results: list, lang: str, offset: int = 0) -> list[dict]:
+    return [
+        {
+            "type": r.entity_type,
+            "start": r.start + offset,
+            "end": r.end + offset,
+            "score": float(r.score),
+            "lang_used": lang,
+        }
+        for r in results
+    ]
+
+
+def _ner_entities(lang: str) -> set[str]:
+    """Entity types the `lang` pipeline's NER can actually produce."""
+    engine = analyzer.nlp_engine
+    mapping = engine.ner_model_configuration.model_to_presidio_entity_mapping
+    nlp = engine.nlp[lang]
+    labels = set()
+    for name in nlp.pipe_names:
+        if name in NER_PIPES:
+            labels.update(getattr(nlp.get_pipe(name), "labels", ()))
+    return {mapping[label] for label in labels if label in mapping}
+
+
+@functools.lru_cache(maxsize=256)
+def _recognizer_subset(
+    lang: str, languages: tuple[str, ...], entities: frozenset[str] | None, detect: bool, version: str,
+) -> tuple[tuple[EntityRecognizer, ...], tuple[str, ...], bool]:
+    own = analyzer.registry.get_recognizers(language=lang, all_fields=True)
+    if detect:
+        chosen = [r for r in own if isinstance(r, SpacyRecognizer)]
+        seen = set()
+        for other in languages:
+            for r in analyzer.registry.get_recognizers(language=other, all_fields=True):
+                if not isinstance(r, SpacyRecognizer) and r.name not in seen:
+                    seen.add(r.name)
+                    chosen.append(r)
+    else:
+        chosen = list(own)
+    supported = {e for r in chosen for e in r.supported_entities}
+    if entities:
+        ner = _ner_entities(lang)
+        chosen = [
+            r for r in chosen
+            if entities & set(r.supported_entities)
+            and (not isinstance(r, SpacyRecognizer) or entities & ner)
+        ]
+        supported &= entities
+    run_ner = any(isinstance(r, SpacyRecognizer) for r in chosen)
+    return tuple(chosen), tuple(sorted(supported)), run_ner
+
+
+def _recognizers_for(
+    lang: str, languages: list[str], entities: list[str] | None = None,
+) -> tuple[tuple[EntityRecognizer, ...], tuple[str, ...], bool]:
+    """(recognizers, entity types to ask them for, whether NER must run)
+    for a `lang` segment, cached per whitelist.
+
+    With detection: that language's NLP recognizer plus every non-NLP
+    recognizer registered for any requested language, each once (the
+    per-language copies of EmailRecognizer & co. share a name). Without:
+    whatever is registered for `lang`. A whitelist (`entities`) keeps
+    only recognizers that can report one of its types; the NLP recognizer
+    only if the pipeline's NER can produce one of them."""
+    return _recognizer_subset(
+        lang, tuple(languages), frozenset(entities) if entities else None, LANG_DETECT, RECOGNIZER_VERSION,
+    )
+
+
+def _nlp_batch(texts: list[str], lang: str, run_ner: bool):
+    """(text, NlpArtifacts) per text. Without NER, the NER and parser
+    components are disabled: only tokens and lemmas (for the context
+    words of the pattern recognizers) are needed, and with a whitelist
+    like EMAIL/PHONE/CREDIT_CARD the NER model is most of the cost."""
+    engine = analyzer.nlp_engine
+    if run_ner:
+        return engine.process_batch(texts, language=lang)
+    nlp = engine.nlp[lang]
+    skip = [name for name in nlp.pipe_names if name in NER_PIPES or name == "parser"]
+    # process_batch() has no way to disable pipes per call, and
+    # select_pipes() would change them for every thread. The private
+    # converter is what process_batch() uses; presidio-analyzer is pinned
+    # in the Dockerfile and test_nlp_batch_without_ner guards the hook.
+    return ((doc.text, engine._doc_to_nlp_artifact(doc, lang)) for doc in nlp.pipe(texts, disable=skip))
+
+
+def _nlp_free(recognizer: EntityRecognizer) -> bool:
+    """Whether `recognizer` never reads NLP artifacts: every local
+    recognizer but the NER-backed SpacyRecognizer (and its Stanza and
+    Transformers subclasses). Pattern recognizers use the artifacts only
+    through the context enhancer, which runs on its own. Fast mode runs
+    only these."""
+    return isinstance(recognizer, LocalRecognizer) and not isinstance(recognizer, SpacyRecognizer)
+
+
+@functools.lru_cache(maxsize=256)
+def _pattern_matcher(recognizers: tuple[EntityRecognizer, ...]) -> PatternMatcher:
+    """One PatternMatcher per (cached, so identical) recognizer subset,
+    over its NLP-free recognizers (the ones that are not PatternRecognizers,
+    such as dictionaries and PhoneRecognizer, it calls as-is)."""
+    return PatternMatcher([r for r in recognizers if _nlp_free(r)])
+
+
+def _run_recognizers(
+    text: str, artifacts, recognizers: tuple, entities: tuple[str, ...], score_threshold: float,
+) -> list[RecognizerResult]:
+    """AnalyzerEngine.analyze() over an explicit recognizer list and
+    precomputed NLP artifacts. The PatternRecognizers run through their
+    subset's PatternMatcher; context words still apply to their hits."""
+    entities = list(entities)
+    results = _pattern_matcher(recognizers).analyze(text, entities)
+    for recognizer in recognizers:
+        if _nlp_free(recognizer):
+            continue
+        if not recognizer.is_loaded:
+            recognizer.load()
+            recognizer.is_loaded = True
+        with profiling.timed("recognizers", recognizer.name):
+            found = recognizer.analyze(text=text, entities=entities, nlp_artifacts=artifacts) or []
+        for r in found:
+            # The context enhancer matches results to recognizers by id.
+            r.recognition_metadata = r.recognition_metadata or {}
+            r.recognition_metadata.setdefault(RecognizerResult.RECOGNIZER_IDENTIFIER_KEY, recognizer.id)
+            r.recognition_metadata.setdefault(RecognizerResult.RECOGNIZER_NAME_KEY, recognizer.name)
+        results.extend(found)
+    profiling.count("recognized", len(results))
+    with profiling.timed("stages", "context"):
+        results = analyzer._enhance_using_context(text, results, artifacts, list(recognizers))
+    with profiling.timed("stages", "dedupe"):
+        results = remove_duplicates(results)
+    return [r for r in results if r.score >= score_threshold]
+
+
+def _analyze_direct(
+    texts: list[str], languages: list[str], score_threshold: float, entities: list[str] | None = None,
+) -> list[tuple[list[dict], list[str], bool]]:
+    """(spans, languages whose pipeline ran, complete) per text; a text
+    is not complete when one of its languages failed.
+
+    Work is grouped by language, so each pipeline runs once over all of
+    its segments across `texts` (nlp.pipe) and the recognizers reuse
+    those NLP artifacts."""
+    loaded = set(analyzer.supported_languages)
     for lang in languages:
+        if lang not in loaded:
+            LOG.warning("analyze(lang=%s) skipped: language not enabled", lang)
+    languages = [lang for lang in languages if lang in loaded]
+
+    jobs: dict[str, list[tuple[int, int, str]]] = {}
+    with profiling.timed("stages", "segmentation"):
+        for i, text in enumerate(texts):
+            if LANG_DETECT:
+                for seg in language_detect.segments(text, languages):
+                    jobs.setdefault(seg.lang, []).append((i, seg.start, text[seg.start:seg.end]))
+            else:
+                for lang in languages:
+                    jobs.setdefault(lang, []).append((i, 0, text))
+
+    spans: list[list[dict]] = [[] for _ in texts]
+    used: list[list[str]] = [[] for _ in texts]
+    complete = [True] * len(texts)
+    for lang, items in jobs.items():
         try:
-            results = analyzer.analyze(text=text, language=lang, score_threshold=score_threshold)
+            recognizers, asked, run_ner = _recognizers_for(lang, languages, entities)
+            batch = profiling.timed_iter("nlp", lang, _nlp_batch([t for _, _, t in items], lang, run_ner))
+            for (i, offset, _), (segment, artifacts) in zip(items, batch):
+                results = _run_recognizers(segment, artifacts, recognizers, asked, score_threshold)
+                spans[i].extend(_to_spans(results, lang, offset))
+                if lang not in used[i]:
+                    used[i].append(lang)
         except Exception as exc:  # noqa: BLE001
             LOG.warning("analyze(lang=%s) failed: %s", lang, exc)
+            for i, _, _ in items:
+                complete[i] = False
             continue
-        for r in results:
-            spans.append({
-                "type": r.entity_type,
-                "start": r.start,
-                "end": r.end,
-                "score": float(r.score),
-                "lang_used": lang,
-            })
-    return spans
+    return list(zip(spans, used, complete))
+
+
+def _analyze_texts(
+    texts: list[str], languages: list[str], score_threshold: float, entities: list[str] | None = None,
+) -> list[tuple[list[dict], list[str], bool]]:
+    """_analyze_direct(), except that texts over LONG_TEXT_CHARS are cut
+    into overlapping windows (long_text.py) analyzed across POOL and
+    merged back onto the original offsets."""
+    long = {i for i, t in enumerate(texts) if len(t) > LONG_TEXT_CHARS}
+    if not long:
+        return _analyze_direct(texts, languages, score_threshold, entities)
+    results: list = [None] * len(texts)
+    short = [i for i in range(len(texts)) if i not in long]
+    for i, result in zip(short, _analyze_direct([texts[i] for i in short], languages, score_threshold, entities)):
+        results[i] = result
+
+    parts = []  # (text index, window, window text)
+    for i in sorted(long):
+        for w in long_text.windows(texts[i], LONG_TEXT_WINDOW, LONG_TEXT_OVERLAP):
+            parts.append((i, w, texts[i][w.start:w.end]))
+    tasks = max(1, min(POOL.workers, len(parts)))
+    groups = [parts[n::tasks] for n in range(tasks)]
+    with profiling.timed("stages", "long_text_pool"):
+        analyzed = POOL.map([([p[2] for p in g], languages, score_threshold, entities) for g in groups])
+    per_text: dict[int, list] = {i: [] for i in long}
+    for group, group_results in zip(groups, analyzed):
+        for (i, w, _), result in zip(group, group_results):
+            per_text[i].append((w, result))
+    for i, pieces in per_text.items():
+        pieces.sort(key=lambda p: p[0].core_start)
+        spans = long_text.merge_window_spans([w for w, _ in pieces], [r[0] for _, r in pieces])
+        used = []
+        for _, (_, langs, _) in pieces:
+            used += [lang for lang in langs if lang not in used]
+        results[i] = (spans, used, all(r[2] for _, r in pieces))
+    return results
+
+
+@functools.lru_cache(maxsize=64)
+def _matcher_subset(languages: tuple[str, ...], entities: frozenset[str] | None, version: str) -> PatternMatcher:
+    chosen, seen = [], set()
+    for lang in languages:
+        for r in analyzer.registry.get_recognizers(language=lang, all_fields=True):
+            if not _nlp_free(r) or r.name in seen:
+                continue
+            if entities and not entities & set(r.supported_entities):
+                continue
+            seen.add(r.name)
+            chosen.append(r)
+    return _pattern_matcher(tuple(chosen))
+
+
+def _fast_matcher(languages: list[str], entities: list[str] | None = None) -> PatternMatcher:
+    """The PatternMatcher for fast mode: every NLP-free recognizer of the
+    requested languages, each once, narrowed to the whitelist; built once
+    per (languages, whitelist)."""
+    return _matcher_subset(tuple(languages), frozenset(entities) if entities else None, RECOGNIZER_VERSION)
+
+
+def _analyze_fast(
+    texts: list[str], languages: list[str], score_threshold: float, entities: list[str] | None = None,
+) -> list[tuple[list[dict], list[str], bool]]:
+    """_analyze_direct() for options.mode "fast": the whole text goes
+    through the pattern matcher once, with no segmentation, NLP pipeline
+    or context enhancement, so no language "runs". Long texts need no
+    windows; the scan is linear. A span's lang_used is the language of
+    the recognizer that found it."""
+    loaded = set(analyzer.supported_languages)
+    languages = [lang for lang in languages if lang in loaded]
+    out = []
+    try:
+        matcher = _fast_matcher(languages, entities)
+        for text in texts:
+            spans = []
+            results = matcher.analyze(text, matcher.entities)
+            profiling.count("recognized", len(results))
+            with profiling.timed("stages", "dedupe"):
+                results = remove_duplicates(results)
+            for r in results:
+                if r.score >= score_threshold:
+                    lang = matcher.language[r.recognition_metadata[RecognizerResult.RECOGNIZER_IDENTIFIER_KEY]]
+                    spans.extend(_to_spans([r], lang))
+            out.append((spans, [], True))
+    except Exception as exc:  # noqa: BLE001
+        LOG.warning("fast analyze failed: %s", exc)
+        return [([], [], False) for _ in texts]
+    return out
+
+
+def _analyze_cached(
+    texts: list[str],
+    languages: list[str],
+    score_threshold: float,
+    entities: list[str] | None = None,
+    mode: str = "full",
+) -> list[tuple[list[dict], list[str], bool]]:
+    """_analyze_texts() (or _analyze_fast()) through SPAN_CACHE: (spans,
+    languages_run, cached) per text. Only the misses are analyzed, each
+    distinct text once; incomplete analyses are not cached. Callers get
+    their own span dicts."""
+    whitelist = sorted(entities) if entities else None
+    # A reloaded dictionary must not be answered with spans from its old terms.
+    dictionaries = [d.refresh() for d in DICTIONARIES]
+    keys = [
+        span_cache.key(t, languages, score_threshold, whitelist, mode, LANG_DETECT, RECOGNIZER_VERSION, dictionaries)
+        for t in texts
+    ]
+    found = [None] * len(keys) if profiling.active() else [SPAN_CACHE.get(k) for k in keys]
+    pending: dict[bytes, int] = {}
+    for i, value in enumerate(found):
+        if value is None:
+            pending.setdefault(keys[i], i)
+    analyze = _analyze_fast if mode == "fast" else _analyze_texts
+    fresh = dict(zip(pending, analyze(
+        [texts[i] for i in pending.values()], languages, score_threshold, entities,
+    )))
+    for k, (spans, used, complete) in fresh.items():
+        if complete:
+            SPAN_CACHE.put(k, (spans, used))
+    out = []
+    for k, value in zip(keys, found):
+        spans, used = value if value is not None else fresh[k][:2]
+        out.append(([dict(s) for s in spans], list(used), value is not None))
+    return out
 
 
 def _resolve_overlaps(spans: list[dict]) -> list[dict]:
@@ -113,23 +538,42 @@ def _resolve_overlaps(spans: list[dict]) -> list[dict]:
       2. Score gap >= 0.1: higher score wins.
       3. Otherwise: TYPE_PRIORITY decides.
       4. DATE_TIME never beats numeric ID types when overlapping.
+
+    Candidates are taken by start (longest first). Each is judged against
+    the first kept span, in keep order, that it overlaps: it is dropped if
+    that span wins, otherwise it takes that span's place. Every kept span
+    starts at or before the candidate, so it overlaps the candidate iff it
+    ends after the candidate's start; kept spans that end earlier are
+    retired for good. A heap of live keep indices yields the first
+    overlapping one, making the sweep O(n log n).
     """
     spans = sorted(spans, key=lambda s: (s["start"], -(s["end"] - s["start"])))
     kept: list[dict] = []
+    live: set[int] = set()
+    order: list[int] = []  # heap of keep indices, lazily pruned of retired ones
+    ends: list[tuple[int, int]] = []  # heap of (end, index); stale once kept[index] changed end
     for cand in spans:
-        loser = False
-        for i, k in enumerate(list(kept)):
-            if cand["end"] <= k["start"] or cand["start"] >= k["end"]:
-                continue
-            winner = _pick_winner(cand, k)
-            if winner is k:
-                loser = True
-                break
-            kept[i] = cand
-            loser = True
-            break
-        if not loser:
+        start = cand["start"]
+        while ends and ends[0][0] <= start:
+            end, i = heapq.heappop(ends)
+            if kept[i]["end"] == end:
+                live.discard(i)
+        while order and order[0] not in live:
+            heapq.heappop(order)
+        if cand["end"] > start:
+            first = order[0] if order else None
+        else:
+            # An empty span overlaps only what strictly contains its position.
+            first = min((i for i in live if kept[i]["start"] < start), default=None)
+        if first is None:
             kept.append(cand)
+            i = len(kept) - 1
+            live.add(i)
+            heapq.heappush(order, i)
+            heapq.heappush(ends, (cand["end"], i))
+        elif _pick_winner(cand, kept[first]) is not kept[first]:
+            kept[first] = cand
+            heapq.heappush(ends, (cand["end"], first))
     return sorted(kept, key=lambda s: s["start"])
 
 
@@ -182,41 +626,56 @@ def _seed_counters(registry: dict[str, str]) -> dict[str, int]:
     return counters
 
 
+class RegistryState:
+    """A registry plus the per-type counters and (type, original) ->
+    placeholder map used to extend it. Built once in O(registry), then
+    kept in sync as placeholders are added, so a batch or a session pays
+    for the indexing only once."""
+
+    def __init__(self, registry: dict[str, str]) -> None:
+        self.registry = dict(registry)
+        self.counters = _seed_counters(registry)
+        self.reverse: dict[tuple[str, str], str] = {}
+        for ph, original in registry.items():
+            m = PLACEHOLDER_RE.fullmatch(ph)
+            if m:
+                self.reverse[(m.group(1), original)] = ph
+        self.lock = threading.Lock()
+
+    def placeholder(self, entity_type: str, original: str, added: dict[str, str]) -> str:
+        key = (entity_type, original)
+        placeholder = self.reverse.get(key)
+        if placeholder is None:
+            self.counters[entity_type] = self.counters.get(entity_type, 0) + 1
+            placeholder = f"<<{entity_type}_{self.counters[entity_type]}>>"
+            self.reverse[key] = placeholder
+            self.registry[placeholder] = original
+            added[placeholder] = original
+        return placeholder
+
+
 def _build_masked(
     text: str,
     spans: list[dict],
-    registry: dict[str, str],
+    state: RegistryState,
 ) -> tuple[str, dict[str, str], list[dict]]:
     """Walk text, replace each span with <<TYPE_N>>.
 
     Same original value reuses the same placeholder. New entities increment
-    a per-type counter seeded from the existing registry.
+    a per-type counter seeded from the existing registry. Returns the
+    masked text, the placeholders added to `state` and the entities.
     """
-    counters = _seed_counters(registry)
-    reverse: dict[tuple[str, str], str] = {}
-    for ph, original in registry.items():
-        m = PLACEHOLDER_RE.fullmatch(ph)
-        if m:
-            reverse[(m.group(1), original)] = ph
-
     out_parts = []
     cursor = 0
     entities: list[dict] = []
-    new_registry = dict(registry)
+    added: dict[str, str] = {}
 
     for s in sorted(spans, key=lambda s: s["start"]):
         if s["start"] < cursor:
             continue
         out_parts.append(text[cursor:s["start"]])
         original = text[s["start"]:s["end"]]
-        key = (s["type"], original)
-        if key in reverse:
-            placeholder = reverse[key]
-        else:
-            counters[s["type"]] = counters.get(s["type"], 0) + 1
-            placeholder = f"<<{s['type']}_{counters[s['type']]}>>"
-            reverse[key] = placeholder
-            new_registry[placeholder] = original
+        placeholder = state.placeholder(s["type"], original, added)
         out_parts.append(placeholder)
         entities.append({
             "placeholder": placeholder,
@@ -230,57 +689,217 @@ def _build_masked(
         cursor = s["end"]
 
     out_parts.append(text[cursor:])
-    return "".join(out_parts), new_registry, entities
+    return "".join(out_parts), added, entities
 
 
-@app.post("/v1/anonymize")
-def anonymize(req: AnonymizeRequest) -> dict[str, Any]:
-    if not req.languages:
-        raise HTTPException(status_code=400, detail="languages must not be empty")
-
-    raw_spans = _analyze_per_language(req.text, req.languages, req.options.score_threshold)
+def _mask(
+    text: str,
+    raw_spans: list[dict],
+    languages_run: list[str],
+    cached: bool,
+    params: AnonymizeParams,
+    state: RegistryState,
+) -> tuple[dict[str, Any], dict[str, str]]:
+    """Result for one text, and the placeholders it added to `state`."""
     detected = len(raw_spans)
-    if req.entity_types:
-        whitelist = set(req.entity_types)
+    if params.entity_types:
+        whitelist = set(params.entity_types)
         raw_spans = [s for s in raw_spans if s["type"] in whitelist]
     merged = _resolve_overlaps(raw_spans)
     after_merge = len(merged)
-    if req.options.honorific_trim:
-        merged = _trim_japanese_honorifics(req.text, merged)
-    masked_text, new_registry, entities = _build_masked(req.text, merged, req.registry)
+    if params.options.honorific_trim:
+        merged = _trim_japanese_honorifics(text, merged)
+    masked_text, added, entities = _build_masked(text, merged, state)
     return {
         "masked_text": masked_text,
         "entities": entities,
-        "registry": new_registry,
         "stats": {
             "detected": detected,
             "kept_after_merge": after_merge,
             "kept_after_trim": len(entities),
+            "languages_run": languages_run,
+            "cached": cached,
+            "mode": params.options.mode,
         },
-    }
+    }, added
+
+
+def _session(session_id: str) -> RegistryState:
+    state = SESSIONS.get(session_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="unknown or expired session")
+    return state
+
+
+def _registry_state(params: AnonymizeParams) -> RegistryState:
+    if params.session_id is None:
+        return RegistryState(params.registry)
+    if params.registry:
+        raise HTTPException(status_code=400, detail="send either registry or session_id, not both")
+    return _session(params.session_id)
+
+
+def _mask_all(texts: list[str], params: AnonymizeParams) -> tuple[list[dict], dict[str, str], RegistryState]:
+    """Mask `texts` in order against one registry; returns the per-text
+    results, every placeholder added and the registry state."""
+    state = _registry_state(params)
+    options = params.options
+    analyses = _analyze_cached(texts, params.languages, options.score_threshold, params.entity_types, options.mode)
+    results, added = [], {}
+    # A session is extended by one request at a time, so concurrent calls
+    # never hand out the same placeholder twice.
+    with state.lock:
+        for text, (spans, used, cached) in zip(texts, analyses):
+            with profiling.timed("stages", "merge"):
+                result, new = _mask(text, spans, used, cached, params, state)
+            results.append(result)
+            added.update(new)
+            for name in ("detected", "kept_after_merge", "kept_after_trim"):
+                profiling.count(name, result["stats"][name])
+    return results, added, state
+
+
+async def _admitted_mask_all(
+    texts: list[str], params: AnonymizeParams,
+) -> tuple[list[dict], dict[str, str], RegistryState]:
+    """_mask_all on the analysis executor; 429 when it is saturated."""
+    try:
+        return await ADMISSION.run(_mask_all, texts, params)
+    except admission.Overloaded as exc:
+        raise HTTPException(
+            status_code=429, detail=str(exc), headers={"Retry-After": str(exc.retry_after)},
+        ) from None
+
+
+def _with_profile(body: dict[str, Any], profile: profiling.Profile | None, state: RegistryState) -> dict[str, Any]:
+    if profile is not None:
+        body["profile"] = profile.report(
+            registry_size=len(state.registry), recognizers_registered=len(analyzer.registry.recognizers),
+        )
+    return body
+
+
+@app.post("/v1/anonymize")
+async def anonymize(req: AnonymizeRequest) -> dict[str, Any]:
+    if not req.languages:
+        raise HTTPException(status_code=400, detail="languages must not be empty")
+
+    with profiling.profiling(req.options.profile) as profile:
+        (result,), added, state = await _admitted_mask_all([req.text], req)
+    if req.session_id is None:
+        return _with_profile({**result, "registry": state.registry}, profile, state)
+    return _with_profile({**result, "registry_delta": added, "session_id": req.session_id}, profile, state)
+
+
+@app.post("/v1/anonymize/batch")
+async def anonymize_batch(req: AnonymizeBatchRequest) -> dict[str, Any]:
+    """Anonymize many texts with one registry. Results come back in input
+    order; each is what /v1/anonymize would return for that text given
+    the registry left by the texts before it. The final registry (or,
+    with a session, every placeholder the batch added) is returned once,
+    at the top level."""
+    if not req.languages:
+        raise HTTPException(status_code=400, detail="languages must not be empty")
+
+    with profiling.profiling(req.options.profile) as profile:
+        results, added, state = await _admitted_mask_all(req.texts, req)
+    if req.session_id is None:
+        return _with_profile({"results": results, "registry": state.registry}, profile, state)
+    return _with_profile({"results": results, "registry_delta": added, "session_id": req.session_id}, profile, state)
+
+
+@app.post("/v1/sessions")
+def create_session(req: SessionRequest) -> dict[str, Any]:
+    session_id = SESSIONS.create(RegistryState(req.registry))
+    return {"session_id": session_id, "ttl_s": SESSIONS.ttl_s, "size": len(req.registry)}
+
+
+@app.get("/v1/sessions/{session_id}")
+def get_session(session_id: str) -> dict[str, Any]:
+    state = _session(session_id)
+    with state.lock:
+        return {"session_id": session_id, "registry": dict(state.registry)}
+
+
+@app.delete("/v1/sessions/{session_id}")
+def delete_session(session_id: str) -> dict[str, Any]:
+    if not SESSIONS.delete(session_id):
+        raise HTTPException(status_code=404, detail="unknown or expired session")
+    return {"deleted": True}
 
 
 @app.post("/v1/deanonymize")
 def deanonymize(req: DeanonymizeRequest) -> dict[str, Any]:
-    text = req.text
-    placeholders_in_text = PLACEHOLDER_RE.findall(text)
-    seen = set()
-    replacements = 0
-    missing: list[str] = []
-    for type_str, num_str in placeholders_in_text:
-        ph = f"<<{type_str}_{num_str}>>"
-        if ph in seen:
-            continue
-        seen.add(ph)
-        if ph in req.registry:
-            text = text.replace(ph, req.registry[ph])
-            replacements += 1
-        else:
-            missing.append(ph)
-    return {
-        "restored_text": text,
-        "stats": {
-            "replacements": replacements,
-            "missing_placeholders": missing,
-        },
-    }
+    registry = req.registry
+    if req.session_id is not None:
+        if registry:
+            raise HTTPException(status_code=400, detail="send either registry or session_id, not both")
+        registry = _session(req.session_id).registry
+    restored_text, stats = restore_text(req.text, registry)
+    return {"restored_text": restored_text, "stats": stats}
+
+
+class _BadMessage(Exception):
+    """A stream message the protocol does not allow; closes the socket
+    with `code` (1003: not JSON text, 1008: wrong shape)."""
+
+    def __init__(self, code: int, reason: str) -> None:
+        super().__init__(reason)
+        self.code, self.reason = code, reason
+
+
+async def _receive_object(ws: WebSocket) -> dict:
+    try:
+        message = json.loads(await ws.receive_text())
+    except (KeyError, ValueError):  # a binary frame, or not JSON
+        raise _BadMessage(1003, "messages must be JSON text") from None
+    if not isinstance(message, dict):
+        raise _BadMessage(1008, "messages must be JSON objects")
+    return message
+
+
+def _opening_registry(opening: dict) -> dict[str, str]:
+    if opening.get("session_id") is not None:
+        if not isinstance(opening["session_id"], str):
+            raise _BadMessage(1008, "session_id must be a string")
+        state = SESSIONS.get(opening["session_id"])
+        if state is None:
+            raise _BadMessage(1008, "unknown or expired session")
+        return state.registry
+    registry = opening.get("registry") or {}
+    if not isinstance(registry, dict) or not all(
+        isinstance(k, str) and isinstance(v, str) for k, v in registry.items()
+    ):
+        raise _BadMessage(1008, "registry must map placeholders to strings")
+    return dict(registry)
+
+
+@app.websocket("/v1/deanonymize/stream")
+async def deanonymize_stream(ws: WebSocket) -> None:
+    """Restore a streamed reply chunk by chunk.
+
+    First message: {"registry": {...}} or {"session_id": "..."}. Then one
+    {"chunk": "..."} per piece of text, each answered with {"text": ...}
+    (possibly "", while a split placeholder is held back). A message with
+    "final": true (and optionally a last chunk) is answered with the rest
+    of the text plus the /v1/deanonymize stats, and ends the stream.
+    A malformed message closes the socket with 1003 or 1008 and a reason."""
+    await ws.accept()
+    try:
+        registry = _opening_registry(await _receive_object(ws))
+        restorer = StreamRestorer(registry.get)
+        while True:
+            message = await _receive_object(ws)
+            chunk = message.get("chunk") or ""
+            if not isinstance(chunk, str):
+                raise _BadMessage(1008, "chunk must be a string")
+            text = restorer.feed(chunk)
+            if message.get("final"):
+                await ws.send_json({"text": text + restorer.flush(), "stats": restorer.stats()})
+                break
+            await ws.send_json({"text": text})
+        await ws.close()
+    except _BadMessage as exc:
+        await ws.close(code=exc.code, reason=exc.reason)
+    except WebSocketDisconnect:
+        return
@@ -0,0 +1,66 @@
+"""Optional server-side session registries.
+
+The service is stateless by default: the whole registry goes in and out
+of every call, and is re-indexed each time. In a long session that is
+thousands of entries per request, most of the payload and most of the
+masking work. A client can instead create a session once, send its id,
+and get back only the placeholders a call added (a delta).
+
+SessionStore keeps one value per opaque id. An entry expires after
+`ttl_s` without use, and the least recently used one is dropped beyond
+`max_sessions`; both are answered like an unknown id, and the client
+falls back to creating a new session from the registry it holds. Nothing
+is persisted: a container restart forgets every session.
+"""
+from __future__ import annotations
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class SessionStore:
+    def __init__(self, ttl_s: float, max_sessions: int) -> None:
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            sid, (touched, _) = next(iter(self._entries.items()))
+            if now - touched < self.ttl_s and len(self._entries) <= self.max_sessions:
+                break
+            del self._entries[sid]
+
+    def create(self, value: Any) -> str:
+        sid = secrets.token_urlsafe(16)
+        now = time.monotonic()
+        with self._lock:
+            self._entries[sid] = (now, value)
+            self._expire(now)
+        return sid
+
+    def get(self, sid: str) -> Any:
+        """The value for `sid`, or None when unknown or expired. A hit
+        renews the TTL."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            self._entries[sid] = (now, entry[1])
+            self._entries.move_to_end(sid)
+            return entry[1]
+
+    def delete(self, sid: str) -> bool:
+        with self._lock:
+            return self._entries.pop(sid, None) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._entries)
@@ -0,0 +1,80 @@
+"""Bounded LRU cache of analyzer spans.
+
+Chat clients resend the whole conversation on every turn, so almost all
+of the text reaching /v1/anonymize has been analyzed before. Detection
+depends only on the text and on what the analyzer was asked to look
+for, not on the registry, so the spans are cached and each request still
+applies its own registry (placeholder numbering, reuse) on top of them.
+
+Keys are digests, not the texts themselves, so a long history does not
+sit in memory twice. recognizer_version() fingerprints the recognizer
+set; it is part of the key so a changed registry can never be answered
+with spans from the old one.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any
+
+
+def recognizer_version(recognizers: list) -> str:
+    parts = []
+    for r in recognizers:
+        patterns = [(p.name, p.regex, p.score) for p in getattr(r, "patterns", None) or []]
+        parts.append([type(r).__name__, r.name, r.supported_language, sorted(r.supported_entities), patterns])
+    parts.sort(key=json.dumps)
+    return hashlib.blake2b(json.dumps(parts).encode(), digest_size=8).hexdigest()
+
+
+def key(text: str, *params: Any) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps(params).encode())
+    h.update(b"\0")
+    h.update(text.encode("utf-8", "surrogatepass"))
+    return h.digest()
+
+
+class SpanCache:
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[bytes, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, k: bytes) -> Any:
+        with self._lock:
+            value = self._entries.get(k)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(k)
+            self.hits += 1
+            return value
+
+    def put(self, k: bytes, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[k] = value
+            self._entries.move_to_end(k)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
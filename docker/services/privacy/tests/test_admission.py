@@ -0,0 +1,40 @@
+import asyncio
+import threading
+
+import pytest
+
+from admission import Admission, Overloaded
+
+
+def test_rejects_past_the_in_flight_cap_and_releases():
+    gate = Admission(threads=1, max_in_flight=2)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(gate.run(release.wait))
+        second = asyncio.ensure_future(gate.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        assert gate.describe()["in_flight"] == 2
+        with pytest.raises(Overloaded) as exc:
+            await gate.run(lambda: "rejected")
+        assert exc.value.retry_after >= 1
+        release.set()
+        return await first, await second
+
+    assert asyncio.run(scenario()) == (True, "queued")
+    assert gate.describe()["in_flight"] == 0
+    assert gate.rejected == 1
+    gate.shutdown()
+
+
+def test_errors_propagate_and_free_the_slot():
+    gate = Admission(threads=1, max_in_flight=1)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(gate.run(fail))
+    assert asyncio.run(gate.run(lambda: 1)) == 1
+    assert gate.describe()["in_flight"] == 0
+    gate.shutdown()
@@ -0,0 +1,80 @@
+import os
+
+import yaml
+
+import dictionary_recognizer
+from dictionary_recognizer import Dictionary, from_spec, normalize
+
+
+def _write(tmp_path, terms, **spec):
+    (tmp_path / "terms.txt").write_text("\n".join(terms), encoding="utf-8")
+    spec = {
+        "name": "CustomerRecognizer",
+        "type": "dictionary",
+        "supported_entity": "PERSON",
+        "supported_language": "all",
+        "terms_file": "terms.txt",
+        **spec,
+    }
+    path = tmp_path / "customers.yaml"
+    path.write_text(yaml.safe_dump(spec, allow_unicode=True), encoding="utf-8")
+    return path, spec
+
+
+def _found(dictionary, text):
+    return [text[s:e] for s, e in dictionary.find(text)]
+
+
+def test_normalize_maps_offsets_back():
+    assert normalize("Plain ASCII") == ("plain ascii", None, None)
+    text, starts, ends = normalize("ＡＢ ｶﾞｲｱ")
+    assert text == "ab ガイア"
+    # ｶﾞ (two characters) became ガ.
+    assert (starts[3], ends[3]) == (3, 5)
+
+
+def test_case_and_width_variants_match(tmp_path):
+    path, spec = _write(tmp_path, ["Acme Corp", "ガイア", "# a comment", ""])
+    d = Dictionary(path, spec)
+    assert d.size == 2
+    assert _found(d, "ＡＣＭＥ ＣＯＲＰ and acme corp") == ["ＡＣＭＥ ＣＯＲＰ", "acme corp"]
+    assert _found(d, "担当はｶﾞｲｱです") == ["ｶﾞｲｱ"]
+
+
+def test_word_boundaries_only_for_spaced_scripts(tmp_path):
+    path, spec = _write(tmp_path, ["Ann", "田中"])
+    d = Dictionary(path, spec)
+    assert _found(d, "Annual report by Ann, and Ann's notes") == ["Ann", "Ann"]
+    assert _found(d, "田中さんと田中部長") == ["田中", "田中"]
+    assert _found(d, "Ann様") == ["Ann"]
+
+
+def test_overlapping_terms_are_all_reported(tmp_path):
+    path, spec = _write(tmp_path, ["Acme", "Acme Corp"])
+    assert sorted(Dictionary(path, spec).find("Acme Corp")) == [(0, 4), (0, 9)]
+
+
+def test_one_dictionary_per_file_shared_by_languages(tmp_path):
+    path, spec = _write(tmp_path, ["Initech"], context=["client"])
+    recognizers = from_spec(path, spec, ["en", "ja"])
+    assert [r.supported_language for r in recognizers] == ["en", "ja"]
+    assert recognizers[0].dictionary is recognizers[1].dictionary
+    (result,) = recognizers[1].analyze("Initechの件", ["PERSON"])
+    assert (result.entity_type, result.start, result.end, result.score) == ("PERSON", 0, 7, 0.85)
+    assert from_spec(path, {**spec, "supported_language": "de"}, ["en"]) == []
+
+
+def test_reloads_changed_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(dictionary_recognizer, "RELOAD_CHECK_S", 0)
+    path, spec = _write(tmp_path, ["Initech"])
+    d = Dictionary(path, spec)
+    version = d.version
+    (tmp_path / "terms.txt").write_text("Initech\nGlobex\n", encoding="utf-8")
+    os.utime(tmp_path / "terms.txt", ns=(1, 1))
+    assert d.refresh() != version
+    assert _found(d, "Globex and Initech") == ["Globex", "Initech"]
+
+    # A broken spec keeps the terms in use.
+    path.write_text("name: [unclosed", encoding="utf-8")
+    assert d.refresh() == d.version
+    assert _found(d, "Globex") == ["Globex"]
@@ -0,0 +1,57 @@
+"""Script/language segmentation used to pick one spaCy pipeline per segment."""
+from language_detect import latin_language, segments
+
+
+def _labelled(text, languages):
+    return [(text[s.start:s.end], s.lang) for s in segments(text, languages)]
+
+
+def test_single_language_is_one_segment():
+    assert _labelled("田中さん", ["ja"]) == [("田中さん", "ja")]
+
+
+def test_english_text_uses_english_only():
+    assert _labelled("Contact john@x.com please.", ["en", "ja"]) == [("Contact john@x.com please.", "en")]
+
+
+def test_short_runs_in_another_script_get_their_own_segment():
+    text = "田中太郎さんに連絡してください。メールは taro@example.co.jp です。"
+    assert _labelled(text, ["en", "ja"]) == [
+        ("田中太郎さんに連絡してください。メールは ", "ja"),
+        ("taro@example.co.jp ", "en"),
+        ("です。", "ja"),
+    ]
+
+
+def test_short_japanese_name_in_english_goes_to_japanese():
+    text = "Please ask 田中一郎 about the invoice."
+    assert _labelled(text, ["en", "ja"]) == [
+        ("Please ask ", "en"),
+        ("田中一郎 ", "ja"),
+        ("about the invoice.", "en"),
+    ]
+
+
+def test_mixed_text_splits_at_script_change():
+    ja = "田中太郎さんに連絡してください。"
+    en = "The meeting with John Smith is scheduled for next week in London."
+    segs = segments(ja + en, ["en", "ja"])
+    assert [(s.start, s.end, s.lang) for s in segs] == [(0, len(ja), "ja"), (len(ja), len(ja + en), "en")]
+
+
+def test_segments_cover_the_whole_text():
+    text = "123 Hello there, this is a fairly long English sentence. 東京都千代田区に住んでいます。 ok"
+    segs = segments(text, ["ja", "en"])
+    assert segs[0].start == 0 and segs[-1].end == len(text)
+    assert all(a.end == b.start and a.lang != b.lang for a, b in zip(segs, segs[1:]))
+
+
+def test_han_without_kana_prefers_chinese_when_requested():
+    assert _labelled("北京是中国的首都", ["ja", "zh"]) == [("北京是中国的首都", "zh")]
+    assert _labelled("北京是中国的首都", ["en", "ja"]) == [("北京是中国的首都", "ja")]
+
+
+def test_latin_language_by_function_words():
+    assert latin_language("Der Vertrag mit der Firma ist nicht gültig.", ["en", "de"]) == "de"
+    assert latin_language("The contract with the company is not valid.", ["en", "de"]) == "en"
+    assert latin_language("Zzz qqq", ["fr", "en"]) == "fr"
@@ -0,0 +1,70 @@
+"""Windowed analysis of long texts: windows, span merging, end to end."""
+import random
+
+import long_text
+import server
+from long_text import Window, merge_window_spans, windows
+
+SENTENCES = [
+    "Contact John Smith at john{n}@acme.com today.",
+    "Call 415-555-{n:04d} for the Friday review.",
+    "The contract renews every year without notice.",
+    "Payment card 4111 1111 1111 1111 was charged.",
+]
+
+
+def _document(paragraphs, seed=3):
+    rng = random.Random(seed)
+    return "\n\n".join(
+        " ".join(rng.choice(SENTENCES).format(n=i) for _ in range(rng.randint(2, 5))) for i in range(paragraphs)
+    )
+
+
+def test_windows_partition_text_on_boundaries():
+    text = _document(60)
+    ws = windows(text, size=1000, overlap=50)
+    assert ws[0].core_start == 0 and ws[-1].core_end == len(text)
+    for a, b in zip(ws, ws[1:]):
+        assert a.core_end == b.core_start
+        # Cut after a paragraph break or sentence end, never mid-word.
+        assert text[a.core_end - 1].isspace()
+    for w in ws:
+        assert w.core_end - w.core_start <= 1000
+        assert w.start == max(0, w.core_start - 50) and w.end == min(len(text), w.core_end + 50)
+
+
+def test_merge_keeps_span_from_window_owning_its_start():
+    ws = [Window(0, 60, 0, 50), Window(40, 100, 50, 100)]
+    per_window = [
+        # Entity at 45..55 lies in both analyzed ranges; the first window's core owns it.
+        [{"type": "PERSON", "start": 45, "end": 55, "score": 0.85}],
+        [{"type": "PERSON", "start": 5, "end": 15, "score": 0.9},
+         {"type": "EMAIL_ADDRESS", "start": 20, "end": 30, "score": 1.0}],
+    ]
+    merged = merge_window_spans(ws, per_window)
+    assert [(s["type"], s["start"], s["end"]) for s in merged] == [
+        ("PERSON", 45, 55), ("EMAIL_ADDRESS", 60, 70),
+    ]
+    assert merged[0]["score"] == 0.85
+
+
+def test_long_text_matches_whole_document(monkeypatch):
+    text = _document(120)
+    monkeypatch.setattr(server, "LONG_TEXT_CHARS", 2000)
+    monkeypatch.setattr(server, "LONG_TEXT_WINDOW", 1500)
+    monkeypatch.setattr(server, "POOL", long_text.AnalyzerPool(0, "server", "_analyze_direct"))
+    whole = server._analyze_direct([text], ["en"], 0.4)[0]
+    windowed, used, complete = server._analyze_texts([text], ["en"], 0.4)[0]
+    key = lambda s: (s["type"], s["start"], s["end"])  # noqa: E731
+    assert [key(s) for s in server._resolve_overlaps(windowed)] == [key(s) for s in server._resolve_overlaps(whole[0])]
+    assert used == ["en"] and complete
+
+
+def test_pool_runs_windows_in_worker_processes(monkeypatch):
+    pool = long_text.AnalyzerPool(2, "server", "_analyze_direct")
+    try:
+        results = pool.map([(["Mail a@x.com"], ["en"], 0.4, None), (["Mail b@y.org"], ["en"], 0.4, None)])
+        assert pool.describe()["started"]
+    finally:
+        pool.shutdown()
+    assert [r[0][0][0]["type"] for r in results] == ["EMAIL_ADDRESS", "EMAIL_ADDRESS"]
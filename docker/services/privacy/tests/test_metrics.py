@@ -0,0 +1,31 @@
+from prometheus_client import REGISTRY
+
+import metrics
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_observe_counts_by_route_and_status():
+    before_ok = _sample("privacy_requests_total", method="POST", route="/v1/test", status="200")
+    before_429 = _sample("privacy_requests_total", method="POST", route="/v1/test", status="429")
+    metrics.observe("POST", "/v1/test", 200, 0.004)
+    metrics.observe("POST", "/v1/test", 429, 0.0001)
+    assert _sample("privacy_requests_total", method="POST", route="/v1/test", status="200") == before_ok + 1
+    assert _sample("privacy_requests_total", method="POST", route="/v1/test", status="429") == before_429 + 1
+
+
+def test_latency_lands_in_its_bucket():
+    labels = {"method": "GET", "route": "/v1/bucket-test", "status": "200"}
+    metrics.observe("GET", "/v1/bucket-test", 200, 0.004)
+    assert _sample("privacy_request_seconds_bucket", **labels, le="0.0025") == 0
+    assert _sample("privacy_request_seconds_bucket", **labels, le="0.005") == 1
+    assert _sample("privacy_request_seconds_count", **labels) == 1
+
+
+def test_gauge_reads_at_scrape_time():
+    state = {"n": 1}
+    metrics.gauge("privacy_test_gauge", "test", lambda: state["n"])
+    state["n"] = 7
+    assert b"privacy_test_gauge 7.0" in metrics.render()
@@ -0,0 +1,66 @@
+"""_resolve_overlaps must keep exactly what the original pairwise scan kept."""
+import random
+
+from server import TYPE_PRIORITY, _pick_winner, _resolve_overlaps
+
+TYPES = list(TYPE_PRIORITY) + ["IP_ADDRESS"]
+
+
+def _resolve_overlaps_pairwise(spans):
+    # The original O(n^2) implementation, kept as the specification.
+    spans = sorted(spans, key=lambda s: (s["start"], -(s["end"] - s["start"])))
+    kept = []
+    for cand in spans:
+        loser = False
+        for i, k in enumerate(list(kept)):
+            if cand["end"] <= k["start"] or cand["start"] >= k["end"]:
+                continue
+            winner = _pick_winner(cand, k)
+            if winner is k:
+                loser = True
+                break
+            kept[i] = cand
+            loser = True
+            break
+        if not loser:
+            kept.append(cand)
+    return sorted(kept, key=lambda s: s["start"])
+
+
+def _random_spans(rng, n, width, max_len, allow_empty=False):
+    spans = []
+    for _ in range(n):
+        start = rng.randrange(width)
+        length = rng.randint(0 if allow_empty else 1, max_len)
+        spans.append({
+            "type": rng.choice(TYPES),
+            "start": start,
+            "end": start + length,
+            # Coarse scores so that ties and exact 0.1 gaps both happen.
+            "score": rng.choice([0.3, 0.4, 0.5, 0.6, 0.85, 0.9, 1.0]),
+        })
+    return spans
+
+
+def test_sweep_matches_pairwise_on_random_spans():
+    rng = random.Random(40)
+    for trial in range(3000):
+        n = rng.randint(0, 40)
+        spans = _random_spans(rng, n, width=rng.choice([10, 50, 200]), max_len=rng.choice([3, 10, 40]),
+                              allow_empty=trial % 5 == 0)
+        expected = _resolve_overlaps_pairwise(spans)
+        got = _resolve_overlaps(spans)
+        # Same span objects, same order: not just equal-looking dicts.
+        assert [id(s) for s in got] == [id(s) for s in expected], (trial, spans)
+
+
+def test_sweep_matches_pairwise_on_dense_document():
+    rng = random.Random(7)
+    spans = _random_spans(rng, 2000, width=8000, max_len=25)
+    assert [id(s) for s in _resolve_overlaps(spans)] == [id(s) for s in _resolve_overlaps_pairwise(spans)]
+
+
+def test_outer_span_absorbs_inner():
+    outer = {"type": "PERSON", "start": 0, "end": 10, "score": 0.85}
+    inner = {"type": "LOCATION", "start": 2, "end": 5, "score": 0.85}
+    assert _resolve_overlaps([inner, outer]) == [outer]
@@ -0,0 +1,108 @@
+import random
+
+import regex
+from presidio_analyzer import EntityRecognizer, Pattern, PatternRecognizer, RecognizerResult
+from presidio_analyzer.predefined_recognizers import (
+    CreditCardRecognizer,
+    EmailRecognizer,
+    IbanRecognizer,
+    UsSsnRecognizer,
+)
+
+from pattern_matcher import PatternMatcher, remove_duplicates, trigger
+
+TEXT = (
+    "Write to alice@example.com or alice@example.com, card 4111 1111 1111 1111 "
+    "(not 4111 1111 1111 1112), IBAN DE89370400440532013000, SSN 078-05-1120 "
+    "but not 000-00-0000."
+)
+
+
+def _key(r):
+    return (r.entity_type, r.start, r.end, r.score)
+
+
+def test_matches_pattern_recognizer_analyze():
+    recognizers = [EmailRecognizer(), CreditCardRecognizer(), IbanRecognizer(), UsSsnRecognizer()]
+    matcher = PatternMatcher(recognizers)
+    expected = [r2 for r in recognizers for r2 in r.analyze(TEXT, matcher.entities)]
+    got = matcher.analyze(TEXT, matcher.entities)
+    assert sorted(map(_key, got)) == sorted(map(_key, expected))
+    assert [r.name for r in matcher.delegated] == ["IbanRecognizer"]
+    for r in got:
+        assert r.analysis_explanation is not None
+        assert r.recognition_metadata[r.RECOGNIZER_NAME_KEY]
+
+
+def test_validators_run_once_per_value():
+    calls = []
+
+    class Counting(EmailRecognizer):
+        def validate_result(self, pattern_text):
+            calls.append(pattern_text)
+            return True
+
+    matcher = PatternMatcher([Counting()])
+    matcher.analyze(TEXT, ["EMAIL_ADDRESS"])
+    matcher.analyze(TEXT, ["EMAIL_ADDRESS"])
+    assert calls == ["alice@example.com"]
+
+
+def test_custom_pattern_recognizer():
+    r = PatternRecognizer(supported_entity="TICKET", patterns=[Pattern("ticket", r"\bT-\d{4}\b", 0.8)])
+    got = PatternMatcher([r]).analyze("see T-1234 and T-12", ["TICKET"])
+    assert [(x.start, x.end, x.score) for x in got] == [(4, 10, 0.8)]
+
+
+def test_trigger_is_the_first_character_class():
+    flags = regex.IGNORECASE
+    assert trigger(r"\b\d{3}-\d{4}\b", flags) == r"[\d]"
+    assert trigger(r"(?<!\w)(?:abc|9x)", flags) == "[9a]"
+    assert trigger(r"x?[0-5]+", flags) == "[0-5x]"
+    assert trigger(r"(?:a|b)?(?=c)c", flags) == "[abc]"
+    # No useful bound: these always run.
+    for pattern in (r".foo", r"[^a]b", r"a*", r"(?i:x)y", r"\p{L}+"):
+        assert trigger(pattern, flags) is None, pattern
+    # Parsed by `re`, but read differently by `regex`.
+    assert trigger(r"[[:alpha:]]{2}\d", flags) is None
+    assert trigger(r"[[a-z]--[aeiou]]x", flags | regex.VERSION1) is None
+
+
+def test_syntax_re_reads_differently_gives_the_same_spans():
+    r = PatternRecognizer(supported_entity="CODE", patterns=[
+        Pattern("posix", r"\b[[:alpha:]]{2}\d{3}\b", 0.6),
+        Pattern("digits", r"\b\d{2}[[:upper:]]\b", 0.6),
+    ])
+    matcher = PatternMatcher([r])
+    for text in ("codes ZZ123 and bq456", "no codes", "plain 12Q here"):
+        expected = r.analyze(text, ["CODE"])
+        assert sorted(map(_key, matcher.analyze(text, ["CODE"]))) == sorted(map(_key, expected))
+    assert [(x.start, x.end) for x in matcher.analyze("codes ZZ123 and bq456", ["CODE"])] == [(6, 11), (16, 21)]
+
+
+def test_trigger_skips_and_fast_forwards_scans():
+    r = PatternRecognizer(supported_entity="ID", patterns=[
+        Pattern("digits", r"(?<![\w-])\d{4}\b", 0.5),
+        Pattern("prefixed", r"\bID-[a-z]{3}\b", 0.5),
+    ])
+    matcher = PatternMatcher([r])
+    assert len(matcher.triggers) == 2
+    for text in ("no numbers here", "id-abc and 1234", "x-1234 1234", "ID-xyz"):
+        expected = r.analyze(text, ["ID"])
+        assert sorted(map(_key, matcher.analyze(text, ["ID"]))) == sorted(map(_key, expected))
+
+
+def test_remove_duplicates_matches_presidio():
+    rng = random.Random(7)
+    for _ in range(300):
+        results = []
+        for _ in range(rng.randint(0, 40)):
+            start = rng.randint(0, 60)
+            results.append(RecognizerResult(
+                rng.choice(["A", "B", "C"]), start, start + rng.randint(0, 12), rng.choice([0, 0.3, 0.5, 0.5, 1.0]),
+            ))
+        expected = EntityRecognizer.remove_duplicates(list(results))
+        got = remove_duplicates(list(results))
+        assert [(r.entity_type, r.start, r.end, r.score) for r in got] == [
+            (r.entity_type, r.start, r.end, r.score) for r in expected
+        ]
@@ -0,0 +1,54 @@
+"""Whole-text and streamed placeholder restoration."""
+import random
+
+from restore import MAX_PLACEHOLDER_LEN, StreamRestorer, restore_text
+
+REGISTRY = {
+    "<<PERSON_1>>": "Alice",
+    "<<PERSON_12>>": "Bob",
+    "<<EMAIL_ADDRESS_1>>": "a@x.com",
+    "<<PHONE_NUMBER_3>>": "<<PERSON_1>>",  # a value that looks like a placeholder
+}
+
+
+def test_restore_text_single_pass():
+    text, stats = restore_text("Hi <<PERSON_1>>, <<PERSON_1>> and <<PHONE_NUMBER_3>> <<PERSON_9>>", REGISTRY)
+    assert text == "Hi Alice, Alice and <<PERSON_1>> <<PERSON_9>>"
+    assert stats == {"replacements": 2, "missing_placeholders": ["<<PERSON_9>>"]}
+
+
+def test_stream_holds_back_only_partial_placeholders():
+    r = StreamRestorer(REGISTRY.get)
+    assert r.feed("Hello <<PER") == "Hello "
+    assert r.feed("SON_1") == ""
+    assert r.feed(">> and 3 < 4 <") == "Alice and 3 < 4 "
+    assert r.feed("<PERSON_12>>!") == "Bob!"
+    assert r.flush() == ""
+    assert r.stats() == {"replacements": 2, "missing_placeholders": []}
+
+
+def test_flush_releases_unfinished_prefix():
+    r = StreamRestorer(REGISTRY.get)
+    assert r.feed("ends with <<PERS") == "ends with "
+    assert r.flush() == "<<PERS"
+
+
+def test_pending_text_is_bounded():
+    r = StreamRestorer(REGISTRY.get)
+    out = r.feed("<<" + "A" * (MAX_PLACEHOLDER_LEN * 2))
+    assert len(out) >= MAX_PLACEHOLDER_LEN
+
+
+def test_any_chunking_matches_whole_text():
+    rng = random.Random(41)
+    pieces = ["<<PERSON_1>>", "<<PERSON_12>>", "<<EMAIL_ADDRESS_1>>", "<<PHONE_NUMBER_3>>", "<<PERSON_7>>",
+              "<", "<<", ">>", "<<A", " ", "text", "日本語", "x<y", "_1>>"]
+    for _ in range(500):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 30)))
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 8))))
+        chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        r = StreamRestorer(REGISTRY.get)
+        streamed = "".join(r.feed(c) for c in chunks) + r.flush()
+        expected, stats = restore_text(text, REGISTRY)
+        assert streamed == expected, (text, chunks)
+        assert r.stats() == stats
@@ -3,7 +3,9 @@
 Run inside the privacy container:
   docker exec -it monadic-chat-privacy-container python -m pytest /app/tests
 """
+import pytest
 from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
 
 from server import app
 
@@ -35,6 +37,61 @@ def test_enabled_languages_falls_back_to_english(monkeypatch):
     assert registry_setup.enabled_languages() == ["en"]
 
 
+def test_preload_languages(monkeypatch):
+    import registry_setup
+
+    monkeypatch.setenv("PRIVACY_PRELOAD_LANGS", "all")
+    assert registry_setup.preload_languages(["en", "ja"]) == ["en", "ja"]
+    monkeypatch.setenv("PRIVACY_PRELOAD_LANGS", "ja, de")
+    assert registry_setup.preload_languages(["en", "ja"]) == ["ja"]
+    monkeypatch.delenv("PRIVACY_PRELOAD_LANGS")
+    assert registry_setup.preload_languages(["en"]) == []
+
+
+def test_pool_workers_default_to_in_process_with_several_server_workers(monkeypatch):
+    import server
+
+    monkeypatch.delenv("PRIVACY_POOL_WORKERS", raising=False)
+    monkeypatch.setenv("PRIVACY_WORKERS", "1")
+    assert server.pool_workers() == 2
+    monkeypatch.setenv("PRIVACY_WORKERS", "4")
+    assert server.pool_workers() == 0
+    monkeypatch.setenv("PRIVACY_POOL_WORKERS", "")  # compose passes unset as empty
+    assert server.pool_workers() == 0
+    monkeypatch.setenv("PRIVACY_POOL_WORKERS", "1")
+    assert server.pool_workers() == 1
+
+
+def test_models_load_on_first_use_without_unused_pipes():
+    import registry_setup
+
+    engine = registry_setup.build_nlp_engine(["en"])
+    assert engine.describe() == {"en": {"loaded": False, "model": "en_core_web_sm"}}
+    assert engine.get_supported_languages() == ["en"]
+    nlp = engine.nlp["en"]
+    assert engine.nlp["en"] is nlp
+    assert not set(nlp.pipe_names) & set(registry_setup.UNUSED_PIPES)
+    stats = engine.describe()["en"]
+    assert stats["loaded"] is True
+    assert stats["load_s"] >= 0
+    assert stats["pipes"] == nlp.pipe_names
+
+
+def test_nlp_batch_without_ner():
+    # _nlp_batch relies on the private SpacyNlpEngine._doc_to_nlp_artifact;
+    # this fails when a presidio-analyzer upgrade renames or changes it.
+    import server
+
+    text = "John Smith met alice@example.com in Boston."
+    [(full_text, full)] = list(server._nlp_batch([text], "en", run_ner=True))
+    [(lean_text, lean)] = list(server._nlp_batch([text], "en", run_ner=False))
+    assert full_text == lean_text == text
+    assert [t.text for t in lean.tokens] == [t.text for t in full.tokens]
+    assert lean.lemmas == full.lemmas
+    assert lean.tokens_indices == full.tokens_indices
+    assert lean.entities == []
+
+
 def test_info_lists_recognizers():
     r = client.get("/v1/info")
     assert r.status_code == 200
@@ -144,3 +201,311 @@ def test_entity_types_empty_list_is_no_filter():
     })
     body = r.json()
     assert "<<DATE_TIME_1>>" in body["masked_text"]
+
+
+def test_anonymize_batch_threads_registry_in_order():
+    r = client.post("/v1/anonymize/batch", json={
+        "texts": [
+            "Contact john@x.com today.",
+            "Nothing sensitive here.",
+            "Write to mary@y.org or john@x.com.",
+        ],
+        "languages": ["en"],
+        "registry": {},
+    })
+    assert r.status_code == 200
+    body = r.json()
+    results = body["results"]
+    assert len(results) == 3
+    assert results[0]["masked_text"] == "Contact <<EMAIL_ADDRESS_1>> today."
+    assert results[1]["masked_text"] == "Nothing sensitive here."
+    # The second text's known address keeps the placeholder from the first.
+    assert results[2]["masked_text"] == "Write to <<EMAIL_ADDRESS_2>> or <<EMAIL_ADDRESS_1>>."
+    assert body["registry"] == {
+        "<<EMAIL_ADDRESS_1>>": "john@x.com",
+        "<<EMAIL_ADDRESS_2>>": "mary@y.org",
+    }
+    assert "registry" not in results[0]
+
+
+def test_anonymize_batch_matches_single_endpoint():
+    texts = [
+        "Email Alice at alice@x.com about the Friday meeting.",
+        "Call 415-555-0100 today.",
+    ]
+    options = {"languages": ["en"], "entity_types": ["PERSON", "EMAIL_ADDRESS", "PHONE_NUMBER"]}
+    batch = client.post("/v1/anonymize/batch", json={"texts": texts, "registry": {}, **options}).json()
+
+    registry = {}
+    for text, result in zip(texts, batch["results"]):
+        single = client.post("/v1/anonymize", json={"text": text, "registry": registry, **options}).json()
+        assert result["masked_text"] == single["masked_text"]
+        assert result["entities"] == single["entities"]
+        registry = single["registry"]
+    assert batch["registry"] == registry
+
+
+def test_anonymize_batch_rejects_empty_languages():
+    r = client.post("/v1/anonymize/batch", json={"texts": ["x"], "languages": []})
+    assert r.status_code == 400
+
+
+def test_anonymize_reports_languages_run():
+    r = client.post("/v1/anonymize", json={
+        "text": "Contact john@x.com please.",
+        "languages": ["en"],
+        "registry": {},
+    })
+    assert r.json()["stats"]["languages_run"] == ["en"]
+
+
+def test_anonymize_reuses_cached_spans_with_request_registry():
+    text = "Forward the invoice to cache.check@example.org today."
+    first = client.post("/v1/anonymize", json={"text": text, "languages": ["en"], "registry": {}}).json()
+    again = client.post("/v1/anonymize", json={
+        "text": text,
+        "languages": ["en"],
+        "registry": {"<<EMAIL_ADDRESS_1>>": "someone@else.org"},
+    }).json()
+    assert first["stats"]["cached"] is False
+    assert again["stats"]["cached"] is True
+    # Spans come from the cache, numbering from this request's registry.
+    assert "<<EMAIL_ADDRESS_2>>" in again["masked_text"]
+    assert again["registry"]["<<EMAIL_ADDRESS_2>>"] == "cache.check@example.org"
+    assert client.get("/v1/info").json()["span_cache"]["hits"] >= 1
+
+
+def test_session_returns_registry_deltas():
+    sid = client.post("/v1/sessions", json={
+        "registry": {"<<EMAIL_ADDRESS_1>>": "old@x.com"},
+    }).json()["session_id"]
+
+    first = client.post("/v1/anonymize", json={
+        "text": "Mail old@x.com and new@y.org.",
+        "languages": ["en"],
+        "session_id": sid,
+    }).json()
+    assert first["masked_text"] == "Mail <<EMAIL_ADDRESS_1>> and <<EMAIL_ADDRESS_2>>."
+    assert first["registry_delta"] == {"<<EMAIL_ADDRESS_2>>": "new@y.org"}
+    assert "registry" not in first
+
+    second = client.post("/v1/anonymize/batch", json={
+        "texts": ["Again new@y.org.", "And third@z.net."],
+        "languages": ["en"],
+        "session_id": sid,
+    }).json()
+    assert second["results"][0]["masked_text"] == "Again <<EMAIL_ADDRESS_2>>."
+    assert second["registry_delta"] == {"<<EMAIL_ADDRESS_3>>": "third@z.net"}
+
+    restored = client.post("/v1/deanonymize", json={
+        "text": "<<EMAIL_ADDRESS_1>> <<EMAIL_ADDRESS_3>>",
+        "session_id": sid,
+    }).json()
+    assert restored["restored_text"] == "old@x.com third@z.net"
+
+    full = client.get(f"/v1/sessions/{sid}").json()["registry"]
+    assert len(full) == 3
+    assert client.delete(f"/v1/sessions/{sid}").status_code == 200
+
+
+def test_unknown_session_is_404():
+    r = client.post("/v1/anonymize", json={"text": "hi", "session_id": "missing"})
+    assert r.status_code == 404
+
+
+def test_session_and_registry_are_exclusive():
+    sid = client.post("/v1/sessions", json={}).json()["session_id"]
+    r = client.post("/v1/anonymize", json={
+        "text": "hi",
+        "session_id": sid,
+        "registry": {"<<PERSON_1>>": "Alice"},
+    })
+    assert r.status_code == 400
+
+
+def test_deanonymize_stream_restores_across_chunks():
+    with client.websocket_connect("/v1/deanonymize/stream") as ws:
+        ws.send_json({"registry": {"<<PERSON_1>>": "Alice"}})
+        ws.send_json({"chunk": "Hi <<PER"})
+        assert ws.receive_json() == {"text": "Hi "}
+        ws.send_json({"chunk": "SON_1>>, bye <<PERSON_2"})
+        assert ws.receive_json() == {"text": "Alice, bye "}
+        ws.send_json({"chunk": ">>", "final": True})
+        assert ws.receive_json() == {
+            "text": "<<PERSON_2>>",
+            "stats": {"replacements": 1, "missing_placeholders": ["<<PERSON_2>>"]},
+        }
+
+
+@pytest.mark.parametrize("messages, code, reason", [
+    (["[]"], 1008, "messages must be JSON objects"),
+    (['"x"'], 1008, "messages must be JSON objects"),
+    (["{not json"], 1003, "messages must be JSON text"),
+    (['{"registry": ["<<PERSON_1>>"]}'], 1008, "registry must map placeholders to strings"),
+    (['{"registry": {"<<PERSON_1>>": 1}}'], 1008, "registry must map placeholders to strings"),
+    (['{"session_id": 7}'], 1008, "session_id must be a string"),
+    (['{"session_id": "nope"}'], 1008, "unknown or expired session"),
+    (['{"registry": {}}', '{"chunk": 5}'], 1008, "chunk must be a string"),
+    (['{"registry": {}}', "null"], 1008, "messages must be JSON objects"),
+])
+def test_deanonymize_stream_closes_on_malformed_messages(messages, code, reason):
+    with client.websocket_connect("/v1/deanonymize/stream") as ws:
+        for message in messages:
+            ws.send_text(message)
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert (closed.value.code, closed.value.reason) == (code, reason)
+
+
+def test_whitelist_selects_recognizers_and_skips_ner():
+    import server
+
+    recognizers, asked, run_ner = server._recognizers_for("en", ["en"], ["EMAIL_ADDRESS", "CREDIT_CARD"])
+    assert not run_ner
+    assert set(asked) == {"EMAIL_ADDRESS", "CREDIT_CARD"}
+    assert {r.name for r in recognizers} == {"EmailRecognizer", "CreditCardRecognizer"}
+    assert server._recognizers_for("en", ["en"], ["PERSON"])[2] is True
+    # Subsets are resolved once per whitelist.
+    assert server._recognizers_for("en", ["en"], ["CREDIT_CARD", "EMAIL_ADDRESS"])[0] is recognizers
+
+
+def test_whitelist_pushdown_matches_post_filtering():
+    text = "Email Alice at alice@x.com, card 4111 1111 1111 1111, on Friday."
+    for whitelist in (["EMAIL_ADDRESS"], ["PERSON", "CREDIT_CARD"], ["DATE_TIME"]):
+        full = client.post("/v1/anonymize", json={"text": text, "registry": {}}).json()
+        pushed = client.post("/v1/anonymize", json={
+            "text": text, "registry": {}, "entity_types": whitelist,
+        }).json()
+        expected = [(e["type"], e["start"], e["end"]) for e in full["entities"] if e["type"] in whitelist]
+        got = [(e["type"], e["start"], e["end"]) for e in pushed["entities"]]
+        assert got == expected
+
+
+def test_fast_mode_masks_patterns_without_nlp(monkeypatch):
+    import server
+
+    def no_nlp(*args, **kwargs):
+        raise AssertionError("fast mode must not run a spaCy pipeline")
+
+    monkeypatch.setattr(server, "_nlp_batch", no_nlp)
+    r = client.post("/v1/anonymize", json={
+        "text": "Mail alice@x.com, card 4111 1111 1111 1111.",
+        "registry": {},
+        "options": {"mode": "fast"},
+    })
+    assert r.status_code == 200
+    body = r.json()
+    assert body["masked_text"] == "Mail <<EMAIL_ADDRESS_1>>, card <<CREDIT_CARD_1>>."
+    assert body["stats"]["mode"] == "fast"
+    assert body["stats"]["languages_run"] == []
+    assert {e["lang_used"] for e in body["entities"]} == {"en"}
+
+
+def test_fast_mode_masks_phone_numbers_in_every_format():
+    # PhoneRecognizer (phonenumbers) reads no NLP artifacts, so it runs in
+    # fast mode too; the regex recognizers alone miss or cut these.
+    r = client.post("/v1/anonymize", json={
+        "text": "Call +44 20 7946 0958 or (212) 555-0199 or 646.555.0142 today.",
+        "options": {"mode": "fast"},
+    })
+    assert r.status_code == 200
+    assert r.json()["masked_text"] == (
+        "Call <<PHONE_NUMBER_1>> or <<PHONE_NUMBER_2>> or <<PHONE_NUMBER_3>> today."
+    )
+
+
+def test_fast_mode_is_cached_separately():
+    text = "Ping bob@y.org about the launch."
+    fast = client.post("/v1/anonymize", json={"text": text, "options": {"mode": "fast"}}).json()
+    full = client.post("/v1/anonymize", json={"text": text}).json()
+    assert fast["stats"]["cached"] is False
+    assert full["stats"]["cached"] is False
+    assert full["stats"]["mode"] == "full"
+
+
+def test_fast_mode_rejects_unknown_mode():
+    r = client.post("/v1/anonymize", json={"text": "x", "options": {"mode": "turbo"}})
+    assert r.status_code == 422
+
+
+def test_dictionary_reload_invalidates_cached_spans(tmp_path, monkeypatch):
+    import os
+
+    import yaml
+
+    import dictionary_recognizer
+    import server
+
+    monkeypatch.setattr(dictionary_recognizer, "RELOAD_CHECK_S", 0)
+    (tmp_path / "codenames.txt").write_text("Bluebird\n", encoding="utf-8")
+    spec = {"name": "CodenameRecognizer", "type": "dictionary", "supported_entity": "CODENAME",
+            "supported_language": "en", "score": 0.9, "terms_file": "codenames.txt"}
+    (tmp_path / "codenames.yaml").write_text(yaml.safe_dump(spec), encoding="utf-8")
+    (recognizer,) = dictionary_recognizer.from_spec(tmp_path / "codenames.yaml", spec, ["en"])
+    registry = server.analyzer.registry
+    monkeypatch.setattr(registry, "recognizers", registry.recognizers + [recognizer])
+    monkeypatch.setattr(server, "DICTIONARIES", [recognizer.dictionary])
+    server._recognizer_subset.cache_clear()
+    server._matcher_subset.cache_clear()
+    try:
+        text = "Bluebird ships before Redwood."
+        for mode in ("full", "fast"):
+            body = client.post("/v1/anonymize", json={"text": text, "options": {"mode": mode}}).json()
+            assert body["masked_text"] == "<<CODENAME_1>> ships before Redwood."
+
+        (tmp_path / "codenames.txt").write_text("Bluebird\nRedwood\n", encoding="utf-8")
+        os.utime(tmp_path / "codenames.txt", ns=(1, 1))
+        body = client.post("/v1/anonymize", json={"text": text}).json()
+        assert body["stats"]["cached"] is False
+        assert body["masked_text"] == "<<CODENAME_1>> ships before <<CODENAME_2>>."
+    finally:
+        server._recognizer_subset.cache_clear()
+        server._matcher_subset.cache_clear()
+
+
+def test_anonymize_returns_429_when_saturated(monkeypatch):
+    import admission
+    import server
+
+    gate = admission.Admission(threads=1, max_in_flight=1)
+    gate._in_flight = 1  # one request already running
+    monkeypatch.setattr(server, "ADMISSION", gate)
+    r = client.post("/v1/anonymize", json={"text": "Mail a@b.com"})
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
+    # Health checks and restores do not go through admission.
+    assert client.get("/v1/health").status_code == 200
+    r = client.post("/v1/deanonymize", json={"text": "<<P_1>>", "registry": {"<<P_1>>": "x"}})
+    assert r.json()["restored_text"] == "x"
+    gate.shutdown()
+
+
+def test_metrics_group_requests_by_route():
+    client.get("/v1/health")
+    client.get("/v1/sessions/no-such-session")
+    r = client.get("/v1/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    assert 'privacy_requests_total{method="GET",route="/v1/health",status="200"}' in text
+    # Route templates, not concrete paths.
+    assert 'privacy_requests_total{method="GET",route="/v1/sessions/{session_id}",status="404"}' in text
+    assert "no-such-session" not in text
+    assert 'privacy_request_seconds_bucket{le="0.005",method="GET",route="/v1/health",status="200"}' in text
+    assert "privacy_admission_rejected" in text
+    assert "privacy_span_cache_hits" in text
+
+
+def test_profile_reports_where_the_time_went():
+    text = "Mail john@acme.com or call 415-555-0100."
+    client.post("/v1/anonymize", json={"text": text})
+    body = client.post("/v1/anonymize", json={"text": text, "options": {"profile": True}}).json()
+    profile = body["profile"]
+    # Profiled requests are analyzed even when the spans are cached.
+    assert body["stats"]["cached"] is False
+    assert set(profile["nlp_ms"]) == {"en"}
+    assert {"EmailRecognizer", "PhoneRecognizer"} <= set(profile["recognizers_ms"])
+    assert profile["spans"]["recognized"] >= profile["spans"]["detected"] >= profile["spans"]["kept_after_merge"]
+    assert profile["spans"]["kept_after_trim"] == len(body["entities"])
+    assert profile["registry_size"] == len(body["registry"])
+    assert "profile" not in client.post("/v1/anonymize", json={"text": text}).json()
@@ -0,0 +1,34 @@
+"""Session store: TTL expiry and the max_sessions bound."""
+from sessions import SessionStore
+
+
+def test_get_returns_stored_value():
+    store = SessionStore(ttl_s=60, max_sessions=10)
+    sid = store.create({"a": 1})
+    assert store.get(sid) == {"a": 1}
+    assert store.get("nope") is None
+
+
+def test_expired_session_is_unknown():
+    store = SessionStore(ttl_s=0, max_sessions=10)
+    sid = store.create("v")
+    assert store.get(sid) is None
+    assert len(store) == 0
+
+
+def test_least_recently_used_is_dropped_beyond_max():
+    store = SessionStore(ttl_s=60, max_sessions=2)
+    a = store.create("a")
+    b = store.create("b")
+    store.get(a)  # b is now the least recently used
+    store.create("c")
+    assert store.get(b) is None
+    assert store.get(a) == "a"
+    assert len(store) == 2
+
+
+def test_delete():
+    store = SessionStore(ttl_s=60, max_sessions=2)
+    sid = store.create("v")
+    assert store.delete(sid) is True
+    assert store.delete(sid) is False
@@ -0,0 +1,38 @@
+"""LRU span cache: eviction, hit accounting and key composition."""
+from span_cache import SpanCache, key
+
+
+def test_lru_evicts_least_recently_used():
+    cache = SpanCache(2)
+    cache.put(b"a", 1)
+    cache.put(b"b", 2)
+    assert cache.get(b"a") == 1  # a is now most recent
+    cache.put(b"c", 3)
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == 1 and cache.get(b"c") == 3
+
+
+def test_stats_report_hit_rate():
+    cache = SpanCache(4)
+    assert cache.stats()["hit_rate"] is None
+    cache.put(b"k", [])
+    cache.get(b"k")
+    cache.get(b"missing")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_zero_size_disables_cache():
+    cache = SpanCache(0)
+    cache.put(b"k", [])
+    assert cache.get(b"k") is None
+
+
+def test_key_depends_on_every_parameter():
+    base = key("hello", ["en"], 0.4, "v1")
+    assert base == key("hello", ["en"], 0.4, "v1")
+    assert base != key("hello!", ["en"], 0.4, "v1")
+    assert base != key("hello", ["en", "ja"], 0.4, "v1")
+    assert base != key("hello", ["en"], 0.5, "v1")
+    assert base != key("hello", ["en"], 0.4, "v2")